@@ -0,0 +1,340 @@
+# @version 0.3.10
+"""
+@title Reward Pool
+@author Curve Finance, Yearn Finance, mk
+@license MIT
+@notice
+    Distributes TOKEN received by the pool, the early exit penalties, to vlTOKEN
+    holders pro rata to their voting power at the start of each week.
+@dev
+    Derived from Curve's FeeDistributor. The total supply of a week is read once
+    from VoteLockToken and cached. Claims replay the point history of the holder
+    through `point_history` and `next_slope_change`, the scan of the slope change
+    bitmaps, so each settled week costs a few storage reads instead of a `balanceOf`.
+"""
+from vyper.interfaces import ERC20
+
+struct Point:
+    bias: int128
+    slope: int128  # - dweight / dt
+    ts: uint256
+    blk: uint256  # block
+
+struct LockedBalance:
+    amount: uint256
+    end: uint256
+
+interface VoteLock:
+    def token() -> ERC20: view
+    def epoch(user: address) -> uint256: view
+    def point_history(user: address, epoch: uint256) -> Point: view
+    def next_slope_change(user: address, ts: uint256, until: uint256) -> (uint256, int128): view
+    def find_epoch_by_timestamp(user: address, ts: uint256) -> uint256: view
+    def totalSupply(ts: uint256) -> uint256: view
+    def checkpoint(): nonpayable
+    def modify_lock(amount: uint256, unlock_time: uint256, user: address) -> LockedBalance: nonpayable
+
+event CheckpointToken:
+    time: uint256
+    tokens: uint256
+
+event RewardReceived:
+    sender: indexed(address)
+    amount: uint256
+
+event Claimed:
+    user: indexed(address)
+    amount: uint256
+    week_cursor: uint256
+    epoch: uint256
+
+VOTE_LOCK: immutable(VoteLock)
+TOKEN: immutable(ERC20)
+START_TIME: immutable(uint256)
+
+DAY: constant(uint256) = 86400
+WEEK: constant(uint256) = 7 * 86400
+TOKEN_CHECKPOINT_DEADLINE: constant(uint256) = DAY
+MAX_CHECKPOINT_WEEKS: constant(uint256) = 40  # weeks caught up per token or supply checkpoint
+MAX_CLAIM_STEPS: constant(uint256) = 64  # weeks settled plus lock changes passed per claim
+MAX_N_WEEKS: constant(uint256) = 209  # max lock is 4 years
+MAX_CLAIM_BATCH: constant(uint256) = 32
+
+last_token_time: public(uint256)
+token_last_balance: public(uint256)
+tokens_per_week: public(HashMap[uint256, uint256])  # week -> TOKEN distributed
+time_cursor: public(uint256)  # first week without a cached supply
+ve_supply: public(HashMap[uint256, uint256])  # week -> total voting power
+# claim cursor of each user, the next week to settle with the last point replayed
+time_cursor_of: public(HashMap[address, uint256])
+user_epoch_of: public(HashMap[address, uint256])
+user_point_of: public(HashMap[address, Point])
+
+
+@external
+def __init__(vote_lock: VoteLock, start_time: uint256):
+    """
+    @notice Contract constructor
+    @param vote_lock VoteLockToken address
+    @param start_time Time from which the rewards are distributed, rounded down to a week
+        and not before the first week start after the VoteLockToken deployment
+    """
+    # the total supply is unknown before the deployment, `totalSupply` would revert
+    deployed: uint256 = vote_lock.point_history(vote_lock.address, 0).ts
+    t: uint256 = max(start_time / WEEK * WEEK, (deployed + WEEK - 1) / WEEK * WEEK)
+    VOTE_LOCK = vote_lock
+    TOKEN = vote_lock.token()
+    START_TIME = t
+    self.last_token_time = t
+    self.time_cursor = t
+
+
+@internal
+def _checkpoint_token():
+    """
+    @notice Spread the TOKEN received since the last checkpoint over the weeks elapsed
+    """
+    token_balance: uint256 = TOKEN.balanceOf(self)
+    to_distribute: uint256 = token_balance - self.token_last_balance
+    self.token_last_balance = token_balance
+
+    t: uint256 = self.last_token_time
+    since_last: uint256 = block.timestamp - t
+    self.last_token_time = block.timestamp
+    this_week: uint256 = t / WEEK * WEEK
+    next_week: uint256 = 0
+
+    for i in range(MAX_CHECKPOINT_WEEKS):
+        next_week = this_week + WEEK
+        if block.timestamp < next_week:
+            if since_last == 0 and block.timestamp == t:
+                self.tokens_per_week[this_week] += to_distribute
+            else:
+                self.tokens_per_week[this_week] += to_distribute * (block.timestamp - t) / since_last
+            break
+        else:
+            if since_last == 0 and next_week == t:
+                self.tokens_per_week[this_week] += to_distribute
+            else:
+                self.tokens_per_week[this_week] += to_distribute * (next_week - t) / since_last
+        t = next_week
+        this_week = next_week
+
+    log CheckpointToken(block.timestamp, to_distribute)
+
+
+@external
+def checkpoint_token():
+    """
+    @notice Distribute the TOKEN received since the last checkpoint
+    """
+    self._checkpoint_token()
+
+
+@internal
+def _checkpoint_total_supply():
+    """
+    @notice Cache the total voting power of the weeks started since the last call
+    @dev The global checkpoint records weekly points, so each `totalSupply` is one read
+    """
+    t: uint256 = self.time_cursor
+    rounded_timestamp: uint256 = block.timestamp / WEEK * WEEK
+    VOTE_LOCK.checkpoint()
+
+    for i in range(MAX_CHECKPOINT_WEEKS):
+        if t > rounded_timestamp:
+            break
+        self.ve_supply[t] = VOTE_LOCK.totalSupply(t)
+        t += WEEK
+
+    self.time_cursor = t
+
+
+@external
+def checkpoint_total_supply():
+    """
+    @notice Cache the total voting power of the weeks started since the last call
+    """
+    self._checkpoint_total_supply()
+
+
+@view
+@internal
+def replay_slope_changes(user: address, point: Point, ts: uint256) -> Point:
+    """
+    @notice Move a point of `user` forward to `ts`
+    @dev
+        Same replay as VoteLockToken, the weeks with a slope change are found by its
+        `next_slope_change`. The returned point includes the slope change at `ts`,
+        the bias is not floored.
+    @param point Point including the slope changes up to its time
+    @param ts Time to replay to, not before the point
+    """
+    upoint: Point = point
+    t_i: uint256 = 0
+    slope_change: int128 = 0
+    for i in range(MAX_N_WEEKS + 1):
+        if upoint.ts >= ts:
+            break
+        t_i, slope_change = VOTE_LOCK.next_slope_change(user, upoint.ts, ts)
+        upoint.bias -= upoint.slope * convert(t_i - upoint.ts, int128)
+        upoint.slope += slope_change
+        upoint.ts = t_i
+
+    upoint.bias -= upoint.slope * convert(ts - upoint.ts, int128)
+    upoint.ts = ts
+    return upoint
+
+
+@internal
+def _claim(user: address, last_week: uint256) -> uint256:
+    """
+    @notice Settle the weeks of `user` before `last_week`, at most MAX_CLAIM_STEPS steps
+    @dev
+        Each step either moves to the next point of the user or settles a week. The
+        replayed point is kept with the cursor, a later claim resumes from it.
+    @return TOKEN amount owed to `user`
+    """
+    max_epoch: uint256 = VOTE_LOCK.epoch(user)
+    if max_epoch == 0:
+        return 0
+
+    week: uint256 = self.time_cursor_of[user]
+    epoch: uint256 = 0
+    point: Point = empty(Point)
+    if week == 0:
+        # first claim, from the first week start after the first lock
+        first_point: Point = VOTE_LOCK.point_history(user, 1)
+        week = max((first_point.ts + WEEK - 1) / WEEK * WEEK, START_TIME)
+        if week >= last_week:
+            return 0
+        epoch = VOTE_LOCK.find_epoch_by_timestamp(user, week)
+        point = VOTE_LOCK.point_history(user, epoch)
+    else:
+        if week >= last_week:
+            return 0
+        epoch = self.user_epoch_of[user]
+        point = self.user_point_of[user]
+
+    next_point: Point = empty(Point)
+    if epoch < max_epoch:
+        next_point = VOTE_LOCK.point_history(user, epoch + 1)
+
+    amount: uint256 = 0
+    for i in range(MAX_CLAIM_STEPS):
+        if week >= last_week:
+            break
+        if epoch < max_epoch and next_point.ts <= week:
+            epoch += 1
+            point = next_point
+            if epoch < max_epoch:
+                next_point = VOTE_LOCK.point_history(user, epoch + 1)
+        else:
+            point = self.replay_slope_changes(user, point, week)
+            if point.bias > 0:
+                amount += convert(point.bias, uint256) * self.tokens_per_week[week] / self.ve_supply[week]
+            elif point.slope == 0 and epoch == max_epoch:
+                # no lock left, nothing accrues until the next lock change
+                week = last_week
+                break
+            week += WEEK
+
+    self.time_cursor_of[user] = week
+    self.user_epoch_of[user] = epoch
+    self.user_point_of[user] = point
+
+    log Claimed(user, amount, week, epoch)
+    return amount
+
+
+@internal
+def _prepare_claim() -> uint256:
+    """
+    @return First week that can't be claimed yet
+    """
+    if block.timestamp >= self.time_cursor:
+        self._checkpoint_total_supply()
+    last_token_time: uint256 = self.last_token_time
+    if block.timestamp > last_token_time + TOKEN_CHECKPOINT_DEADLINE:
+        self._checkpoint_token()
+        last_token_time = block.timestamp
+    return min(last_token_time / WEEK * WEEK, self.time_cursor)
+
+
+@external
+@nonreentrant("lock")
+def claim(user: address = msg.sender, relock: bool = False) -> uint256:
+    """
+    @notice Claim the rewards of `user`
+    @dev
+        Settles at most MAX_CLAIM_STEPS weeks and lock changes, claim again to
+        settle the rest.
+    @param user Address to claim for
+    @param relock Add the rewards to the lock of `user` instead, only by `user`
+    @return TOKEN amount claimed
+    """
+    amount: uint256 = self._claim(user, self._prepare_claim())
+    if amount > 0:
+        self.token_last_balance -= amount
+        if relock and msg.sender == user:
+            assert TOKEN.approve(VOTE_LOCK.address, amount)
+            VOTE_LOCK.modify_lock(amount, 0, user)
+        else:
+            assert TOKEN.transfer(user, amount)
+    return amount
+
+
+@external
+@nonreentrant("lock")
+def claim_many(users: DynArray[address, MAX_CLAIM_BATCH]) -> uint256:
+    """
+    @notice Claim the rewards of many users at once
+    @dev The supply and token checkpoints are done once for the whole batch
+    @param users Addresses to claim for
+    @return Total TOKEN amount claimed
+    """
+    last_week: uint256 = self._prepare_claim()
+    total: uint256 = 0
+    for user in users:
+        amount: uint256 = self._claim(user, last_week)
+        if amount > 0:
+            assert TOKEN.transfer(user, amount)
+            total += amount
+    if total > 0:
+        self.token_last_balance -= total
+    return total
+
+
+@external
+def burn(amount: uint256 = max_value(uint256)) -> bool:
+    """
+    @notice Receive TOKEN to distribute from the sender
+    @param amount TOKEN amount, the whole allowance by default
+    """
+    _amount: uint256 = amount
+    if _amount == max_value(uint256):
+        _amount = TOKEN.allowance(msg.sender, self)
+    if _amount > 0:
+        assert TOKEN.transferFrom(msg.sender, self, _amount)
+        log RewardReceived(msg.sender, _amount)
+        if block.timestamp > self.last_token_time + TOKEN_CHECKPOINT_DEADLINE:
+            self._checkpoint_token()
+    return True
+
+
+@view
+@external
+def vote_lock() -> VoteLock:
+    return VOTE_LOCK
+
+
+@view
+@external
+def token() -> ERC20:
+    return TOKEN
+
+
+@view
+@external
+def start_time() -> uint256:
+    return START_TIME
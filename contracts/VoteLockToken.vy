@@ -23,6 +23,10 @@ struct LockedBalance:
     amount: uint256
     end: uint256
 
+struct PackedPoint:
+    bias_slope: uint256  # slope << 128 | bias
+    ts_blk: uint256  # blk << 64 | ts
+
 struct Kink:
     slope: int128
     ts: uint256
@@ -43,6 +47,11 @@ event Withdraw:
     amount: uint256
     ts: uint256
 
+event ExitPenalty:
+    user: indexed(address)
+    amount: uint256
+    ts: uint256
+
 event Penalty:
     user: indexed(address)
     amount: uint256
@@ -53,6 +62,12 @@ event Supply:
     new_supply: uint256
     ts: uint256
 
+event DelegateChanged:
+    delegator: indexed(address)
+    from_delegate: indexed(address)
+    to_delegate: indexed(address)
+    ts: uint256
+
 event Initialized:
     token: ERC20
     treasury: address
@@ -68,17 +83,35 @@ MAX_LOCK_DURATION: constant(uint256) = 1 * 365 * 86400 / WEEK * WEEK  # 1 year
 SCALE: constant(uint256) = 10 ** 18
 MAX_PENALTY_RATIO: constant(uint256) = SCALE * 3 / 4  # 75% for early exit of max lock
 MAX_N_WEEKS: constant(uint256) = 209 # max lock is 4 years
+MAX_CHECKPOINT_WEEKS: constant(uint256) = 255  # max weeks a global checkpoint can catch up
+# max weekly points recorded during a user action, the later weeks are left for `checkpoint`
+MAX_CATCHUP_WEEKS: constant(uint256) = 4
 FEE: constant(uint256) = 1
+MAX_BATCH_SIZE: constant(uint256) = 256
+MASK_64: constant(uint256) = 2**64 - 1
+MASK_128: constant(uint256) = 2**128 - 1
+MAX_INDEX_WORDS: constant(uint256) = 4  # words of 256 weeks scanned for the next slope change
 
 
 supply: public(uint256)
-locked: public(HashMap[address, LockedBalance])
+packed_locks: HashMap[address, uint256]  # end << 128 | amount
 # history
 epoch: public(HashMap[address, uint256])
-point_history: public(HashMap[address, HashMap[uint256, Point]])  # epoch -> unsigned point
+packed_points: HashMap[address, HashMap[uint256, PackedPoint]]  # epoch -> unsigned point
 slope_changes: public(HashMap[address, HashMap[uint256, int128]])  # time -> signed slope change
+slope_change_weeks: public(HashMap[address, HashMap[uint256, uint256]])  # week / 256 -> bitmap of weeks with a slope change
+week_epoch: public(HashMap[address, HashMap[uint256, uint256]])  # week -> epoch of the weekly point
+block_checkpoints: HashMap[uint256, uint256]  # index -> epoch << 128 | blk << 64 | ts of a real global checkpoint
+last_block_checkpoint: public(uint256)  # index of the last block checkpoint
 
 collector_active: public(bool)
+pending_fees: public(uint256)  # lock fees not added to the fee lock yet
+last_fee_flush: public(uint256)  # time the pending fees were last added to the fee lock
+pending_penalties: public(uint256)  # early exit penalties not sent to the treasury yet
+penalties: public(HashMap[uint256, uint256])  # week -> early exit penalties paid that week
+delegated: public(HashMap[address, address])  # delegator -> delegate, empty if not delegated
+recorded_week: public(uint256)  # every global weekly point up to this week is recorded
+week_points: public(HashMap[uint256, uint256])  # week -> slope << 128 | bias of a global week left behind by a user action
 
 @external
 def __init__(token: ERC20, treasury: address, collector: address):
@@ -93,8 +126,9 @@ def __init__(token: ERC20, treasury: address, collector: address):
     COLLECTOR = collector
     self.collector_active = True
 
-    self.point_history[self][0].blk = block.number
-    self.point_history[self][0].ts = block.timestamp
+    self.packed_points[self][0].ts_blk = (block.number << 64) | block.timestamp
+    self.block_checkpoints[0] = (block.number << 64) | block.timestamp
+    self.recorded_week = block.timestamp / WEEK * WEEK
 
     log Initialized(token, treasury, collector)
 
@@ -108,7 +142,34 @@ def get_last_user_point(addr: address) -> Point:
     @return Last recorded point
     """
     epoch: uint256 = self.epoch[addr]
-    return self.point_history[addr][epoch]
+    return self.load_point(addr, epoch)
+
+
+@view
+@external
+def point_history(user: address, epoch: uint256) -> Point:
+    """
+    @notice Get the point recorded for a user at an epoch
+    @dev
+        A weekly point of the global history has no block of its own, its `blk` is
+        the block of the last real checkpoint before it, not a block of its week.
+        Use `timestamp_at` to map block heights to time.
+    @param user Address of the user wallet, or this contract for the global history
+    @param epoch Epoch of the point
+    @return Recorded point
+    """
+    return self.load_point(user, epoch)
+
+
+@view
+@external
+def locked(user: address) -> LockedBalance:
+    """
+    @notice Get the lock of a user
+    @param user Address of the user wallet
+    @return Locked amount and end lock time
+    """
+    return self.load_lock(user)
 
 
 @pure
@@ -117,6 +178,86 @@ def round_to_week(ts: uint256) -> uint256:
     return ts / WEEK * WEEK
 
 
+@pure
+@internal
+def pack_point(point: Point) -> PackedPoint:
+    """
+    @dev Bias and slope are never negative and fit 128 bits, ts and blk fit 64 bits
+    """
+    assert point.ts <= MASK_64 and point.blk <= MASK_64  # dev: point overflow
+    return PackedPoint({
+        bias_slope: (convert(point.slope, uint256) << 128) | convert(point.bias, uint256),
+        ts_blk: (point.blk << 64) | point.ts,
+    })
+
+
+@pure
+@internal
+def unpack_point(packed: PackedPoint) -> Point:
+    return Point({
+        bias: convert(packed.bias_slope & MASK_128, int128),
+        slope: convert(packed.bias_slope >> 128, int128),
+        ts: packed.ts_blk & MASK_64,
+        blk: packed.ts_blk >> 64,
+    })
+
+
+@pure
+@internal
+def pack_lock(lock: LockedBalance) -> uint256:
+    assert lock.amount <= MASK_128 and lock.end <= MASK_128  # dev: lock overflow
+    return (lock.end << 128) | lock.amount
+
+
+@pure
+@internal
+def unpack_lock(packed: uint256) -> LockedBalance:
+    return LockedBalance({amount: packed & MASK_128, end: packed >> 128})
+
+
+@view
+@internal
+def load_point(user: address, epoch: uint256) -> Point:
+    return self.unpack_point(self.packed_points[user][epoch])
+
+
+@internal
+def store_point(user: address, epoch: uint256, point: Point):
+    self.packed_points[user][epoch] = self.pack_point(point)
+
+
+@internal
+def store_global_point(point: Point):
+    """
+    @notice Record the global point at the current epoch
+    @dev
+        A point at t=now is a real checkpoint, its block, timestamp and epoch are
+        indexed. Several checkpoints in one block keep the last epoch of the block.
+        The index costs a fresh slot and the update of `last_block_checkpoint` per
+        block with a checkpoint.
+    """
+    epoch: uint256 = self.epoch[self]
+    self.store_point(self, epoch, point)
+    if point.ts != block.timestamp:
+        return
+    index: uint256 = self.last_block_checkpoint
+    if (self.block_checkpoints[index] >> 64) & MASK_64 != block.number:
+        index += 1
+        self.last_block_checkpoint = index
+    self.block_checkpoints[index] = (epoch << 128) | (block.number << 64) | block.timestamp
+
+
+@view
+@internal
+def load_lock(user: address) -> LockedBalance:
+    return self.unpack_lock(self.packed_locks[user])
+
+
+@internal
+def store_lock(user: address, lock: LockedBalance):
+    self.packed_locks[user] = self.pack_lock(lock)
+
+
 @view
 @internal
 def lock_to_point(lock: LockedBalance) -> Point:
@@ -146,6 +287,32 @@ def lock_to_kink(lock: LockedBalance) -> Kink:
     return kink
 
 
+@internal
+def schedule_slope_change(user: address, ts: uint256, d_slope: int128):
+    """
+    @notice Schedule a slope change for `user` and the global history
+    @dev The week is indexed in a bitmap, so replays can jump between changes
+    @param ts Week aligned time of the change
+    """
+    self.slope_changes[self][ts] += d_slope
+    self.slope_changes[user][ts] += d_slope
+    week: uint256 = ts / WEEK
+    bit: uint256 = 1 << (week & 255)
+    self.slope_change_weeks[self][week >> 8] |= bit
+    self.slope_change_weeks[user][week >> 8] |= bit
+
+
+@internal
+def schedule_vote_slope_change(key: address, ts: uint256, d_slope: int128):
+    """
+    @notice Schedule a slope change of the vote history `key` only
+    @dev The delegated locks are already part of the global history
+    """
+    self.slope_changes[key][ts] += d_slope
+    week: uint256 = ts / WEEK
+    self.slope_change_weeks[key][week >> 8] |= 1 << (week & 255)
+
+
 @internal
 def _checkpoint_user(user: address, old_lock: LockedBalance, new_lock: LockedBalance) -> Point[2]:
     old_point: Point = self.lock_to_point(old_lock)
@@ -156,64 +323,140 @@ def _checkpoint_user(user: address, old_lock: LockedBalance, new_lock: LockedBal
 
     # schedule slope changes for the lock end
     if old_point.slope != 0 and old_lock.end > block.timestamp:
-        self.slope_changes[self][old_lock.end] += old_point.slope
-        self.slope_changes[user][old_lock.end] += old_point.slope
+        self.schedule_slope_change(user, old_lock.end, old_point.slope)
     if new_point.slope != 0 and new_lock.end > block.timestamp:
-        self.slope_changes[self][new_lock.end] -= new_point.slope
-        self.slope_changes[user][new_lock.end] -= new_point.slope
+        self.schedule_slope_change(user, new_lock.end, -new_point.slope)
 
     # schedule kinks for locks longer than max duration
     if old_kink.slope != 0:
-        self.slope_changes[self][old_kink.ts] -= old_kink.slope
-        self.slope_changes[user][old_kink.ts] -= old_kink.slope
-        self.slope_changes[self][old_lock.end] += old_kink.slope
-        self.slope_changes[user][old_lock.end] += old_kink.slope
+        self.schedule_slope_change(user, old_kink.ts, -old_kink.slope)
+        self.schedule_slope_change(user, old_lock.end, old_kink.slope)
     if new_kink.slope != 0:
-        self.slope_changes[self][new_kink.ts] += new_kink.slope
-        self.slope_changes[user][new_kink.ts] += new_kink.slope
-        self.slope_changes[self][new_lock.end] -= new_kink.slope
-        self.slope_changes[user][new_lock.end] -= new_kink.slope
+        self.schedule_slope_change(user, new_kink.ts, new_kink.slope)
+        self.schedule_slope_change(user, new_lock.end, -new_kink.slope)
 
     self.epoch[user] += 1
-    self.point_history[user][self.epoch[user]] = new_point
+    self.store_point(user, self.epoch[user], new_point)
     return [old_point, new_point]
 
 @internal
-def _checkpoint_global() -> Point:
+def _checkpoint_global(until: uint256, max_writes: uint256) -> Point:
+    """
+    @notice Apply weekly slope changes to the global point up to `until`
+    @dev
+        At most `max_writes` weekly points are recorded in the history. The remaining
+        weeks are still applied to the returned point, once the caller records it they
+        are left behind it. `recorded_week` stops at the last week recorded without a
+        gap, `checkpoint` and `checkpoint_partial` record the weeks after it first.
+        The returned point at `until` is not recorded, the caller is expected to do so.
+        The block of a weekly point is unknown, it keeps the block of the last point.
+        Block heights are resolved through the block checkpoints instead.
+    @param until Timestamp to fill the global history up to, week aligned or now
+    @param max_writes Maximum number of weekly points to record
+    @return Global point at `until`
+    """
     last_point: Point = Point({bias: 0, slope: 0, ts: block.timestamp, blk: block.number})
     epoch: uint256 = self.epoch[self]
+    recorded: uint256 = self.recorded_week
     if epoch > 0:
-        last_point = self.point_history[self][epoch]
+        last_point = self.load_point(self, epoch)
+    else:
+        # the history starts now, there is no week behind it to record
+        recorded = self.round_to_week(block.timestamp)
     last_checkpoint: uint256 = last_point.ts
-    # initial_last_point is used for extrapolation to calculate block number
-    initial_last_point: Point = last_point
-    block_slope: uint256 = 0  # dblock/dt
-    if block.timestamp > last_checkpoint:
-        block_slope = SCALE * (block.number - last_point.blk) / (block.timestamp - last_checkpoint)
-    
+
     # apply weekly slope changes and record weekly global snapshots
     t_i: uint256 = self.round_to_week(last_checkpoint)
-    for i in range(255):
-        t_i = min(t_i + WEEK, block.timestamp)
+    for i in range(MAX_CHECKPOINT_WEEKS):
+        t_i += WEEK
+        d_slope: int128 = 0
+        if t_i > until:
+            t_i = until
+        else:
+            d_slope = self.slope_changes[self][t_i]
         last_point.bias -= last_point.slope * convert(t_i - last_checkpoint, int128)
-        last_point.slope += self.slope_changes[self][t_i]  # will read 0 if not aligned to week
+        last_point.slope += d_slope
         last_point.bias = max(0, last_point.bias)  # this can happen
         last_point.slope = max(0, last_point.slope)  # this shouldn't happen
         last_checkpoint = t_i
         last_point.ts = t_i
-        last_point.blk = initial_last_point.blk + block_slope * (t_i - initial_last_point.ts) / SCALE
-        epoch += 1
-        if t_i < block.timestamp:
-            self.point_history[self][epoch] = last_point
-        # skip last week
-        else:
-            last_point.blk = block.number
+        if t_i == until:
+            # the point at the start of a week is its weekly point
+            if recorded + WEEK == t_i:
+                recorded = t_i
             break
-
-    self.epoch[self] = epoch
+        # weeks over the limit are applied, but left behind the returned point
+        if i < max_writes:
+            epoch += 1
+            self.store_point(self, epoch, last_point)
+            self.week_epoch[self][t_i] = epoch
+            if recorded + WEEK == t_i:
+                recorded = t_i
+
+    if until == block.timestamp:
+        last_point.blk = block.number
+    if recorded != self.recorded_week:
+        self.recorded_week = recorded
+
+    self.epoch[self] = epoch + 1
     return last_point
 
 
+@internal
+def record_weeks_behind(max_weeks: uint256) -> uint256:
+    """
+    @notice Record the weekly global points a user action left behind the last point
+    @dev
+        Walks the weeks after `recorded_week` up to the week of the last global point.
+        A week starting with a point of the history is already recorded, the others
+        get their point in `week_points`. Slope changes in the past can't change and
+        the points in between are the history itself, so each point is the value a
+        replay of the history gives.
+    @param max_weeks Maximum number of weeks to walk
+    @return Number of weeks walked
+    """
+    max_epoch: uint256 = self.epoch[self]
+    last_week: uint256 = self.round_to_week(self.packed_points[self][max_epoch].ts_blk & MASK_64)
+    week: uint256 = self.recorded_week
+    if week >= last_week:
+        return 0
+
+    # global point at the start of the last recorded week
+    epoch: uint256 = self._find_epoch_by_timestamp(self, week, max_epoch)
+    point: Point = self.load_point(self, epoch)
+    if point.ts < week:
+        packed: uint256 = self.week_points[week]
+        if packed != 0:
+            point.bias = convert(packed & MASK_128, int128)
+            point.slope = convert(packed >> 128, int128)
+        else:
+            point = self.replay_slope_changes(self, point, week)
+            point.slope += self.slope_changes[self][week]
+        point.ts = week
+
+    weeks: uint256 = 0
+    for i in range(MAX_CHECKPOINT_WEEKS):
+        if week == last_week or weeks == max_weeks:
+            break
+        week += WEEK
+        weeks += 1
+        # continue from the last point of the history in the week before
+        if epoch < max_epoch:
+            if self.packed_points[self][epoch + 1].ts_blk & MASK_64 <= week:
+                epoch = self._find_epoch_by_timestamp(self, week, max_epoch)
+                point = self.load_point(self, epoch)
+        if point.ts < week:
+            point.bias -= point.slope * convert(week - point.ts, int128)
+            point.slope += self.slope_changes[self][week]
+            point.bias = max(0, point.bias)
+            point.slope = max(0, point.slope)
+            point.ts = week
+            self.week_points[week] = self.pack_point(point).bias_slope
+
+    self.recorded_week = week
+    return weeks
+
+
 @internal
 def _checkpoint(user: address, old_lock: LockedBalance, new_lock: LockedBalance):
     """
@@ -227,53 +470,301 @@ def _checkpoint(user: address, old_lock: LockedBalance, new_lock: LockedBalance)
     if user != empty(address):
         user_points = self._checkpoint_user(user, old_lock, new_lock)
 
-    # fill point_history until t=now
-    last_point: Point = self._checkpoint_global()
+    # fill point_history until t=now, bounded to keep the gas of user actions predictable
+    last_point: Point = self._checkpoint_global(block.timestamp, MAX_CATCHUP_WEEKS)
     
     # only affects the last checkpoint at t=now
     if user != empty(address):
-        # If last point was in this block, the slope change has been applied already
-        # But in such case we have 0 slope(s)
-        last_point.slope += (user_points[1].slope - user_points[0].slope)
-        last_point.bias += (user_points[1].bias - user_points[0].bias)
-        last_point.slope = max(0, last_point.slope)
-        last_point.bias = max(0, last_point.bias)
+        last_point = self.apply_user_points(last_point, user_points)
 
     # Record the changed point into history
-    epoch: uint256 = self.epoch[self]
-    self.point_history[self][epoch] = last_point
+    self.store_global_point(last_point)
+
+
+@pure
+@internal
+def apply_user_points(last_point: Point, user_points: Point[2]) -> Point:
+    """
+    @notice Apply the change of a user point to the global point at t=now
+    @param last_point Global point at t=now
+    @param user_points Old and new point of the user
+    @return Updated global point
+    """
+    point: Point = last_point
+    # If last point was in this block, the slope change has been applied already
+    # But in such case we have 0 slope(s)
+    point.slope += (user_points[1].slope - user_points[0].slope)
+    point.bias += (user_points[1].bias - user_points[0].bias)
+    point.slope = max(0, point.slope)
+    point.bias = max(0, point.bias)
+    return point
+
+
+@pure
+@internal
+def _vote_key(account: address) -> address:
+    """
+    @notice Key of the vote history of `account` in the point and slope change maps
+    @dev Derived from the account, so it can't be the key of a lock history
+    """
+    data: bytes32 = keccak256(concat(convert(account, bytes20), b"votes"))
+    return convert(convert(data, uint256) >> 96, address)
+
+
+@internal
+def _checkpoint_votes(key: address, old_lock: LockedBalance, new_lock: LockedBalance):
+    """
+    @notice Apply the change of a lock counted in the vote history `key`
+    @dev
+        Schedules the slope changes of the lock like `_checkpoint_user`, the recorded
+        point is the sum of every lock counted, replayed to t=now like the global point.
+    """
+    old_point: Point = self.lock_to_point(old_lock)
+    new_point: Point = self.lock_to_point(new_lock)
+
+    old_kink: Kink = self.lock_to_kink(old_lock)
+    new_kink: Kink = self.lock_to_kink(new_lock)
+
+    # replay before scheduling, like a lock history the new lock starts at t=now
+    point: Point = Point({bias: 0, slope: 0, ts: block.timestamp, blk: block.number})
+    epoch: uint256 = self.epoch[key]
+    if epoch > 0:
+        last_point: Point = self.load_point(key, epoch)
+        point = self.replay_slope_changes(key, last_point, block.timestamp)
+        # a point at a week start includes the slope change of the week
+        if last_point.ts < block.timestamp and block.timestamp % WEEK == 0:
+            point.slope += self.slope_changes[key][block.timestamp]
+
+    if old_point.slope != 0 and old_lock.end > block.timestamp:
+        self.schedule_vote_slope_change(key, old_lock.end, old_point.slope)
+    if new_point.slope != 0 and new_lock.end > block.timestamp:
+        self.schedule_vote_slope_change(key, new_lock.end, -new_point.slope)
+
+    if old_kink.slope != 0:
+        self.schedule_vote_slope_change(key, old_kink.ts, -old_kink.slope)
+        self.schedule_vote_slope_change(key, old_lock.end, old_kink.slope)
+    if new_kink.slope != 0:
+        self.schedule_vote_slope_change(key, new_kink.ts, new_kink.slope)
+        self.schedule_vote_slope_change(key, new_lock.end, -new_kink.slope)
+
+    point = self.apply_user_points(point, [old_point, new_point])
+    point.ts = block.timestamp
+    point.blk = block.number
+
+    epoch += 1
+    self.epoch[key] = epoch
+    self.store_point(key, epoch, point)
+
+
+@internal
+def init_votes(account: address, key: address):
+    """
+    @notice Start the vote history of `account`, from its own lock if not delegated
+    """
+    if self.epoch[key] != 0:
+        return
+    lock: LockedBalance = empty(LockedBalance)
+    if self.delegated[account] == empty(address):
+        lock = self.load_lock(account)
+    self._checkpoint_votes(key, empty(LockedBalance), lock)
+
+
+@internal
+def _checkpoint_delegate(user: address, old_lock: LockedBalance, new_lock: LockedBalance):
+    """
+    @notice Apply a lock change of `user` to the vote history it is counted in
+    @dev Nothing to do while neither `user` nor its delegate take part in a delegation
+    """
+    account: address = self.delegated[user]
+    if account == empty(address):
+        account = user
+    key: address = self._vote_key(account)
+    if self.epoch[key] != 0:
+        self._checkpoint_votes(key, old_lock, new_lock)
+
+
+@internal
+def _flush_fees():
+    """
+    @notice Add the pending fees to the lock of the collector, or the treasury once removed
+    """
+    self.last_fee_flush = block.timestamp
+    fee: uint256 = self.pending_fees
+    if fee == 0:
+        return
+    self.pending_fees = 0
+
+    lock_fee_address: address = TREASURY
+
+    if self.collector_active:
+        lock_fee_address = COLLECTOR
+
+    old_lock_col: LockedBalance = self.load_lock(lock_fee_address)
+    new_lock_col: LockedBalance = old_lock_col
+    new_lock_col.amount += fee
+    # week aligned, slope changes are only applied on week boundaries
+    new_lock_col.end = self.round_to_week(block.timestamp + MAX_LOCK_DURATION / 4)
+
+    self.store_lock(lock_fee_address, new_lock_col)
+    self._checkpoint(lock_fee_address, old_lock_col, new_lock_col)
+    self._checkpoint_delegate(lock_fee_address, old_lock_col, new_lock_col)
+
+
+@internal
+def _charge_fee(fee: uint256):
+    """
+    @notice Accrue the lock fee, the pending fees are added to the fee lock once a week
+    @param fee TOKEN amount taken as fee
+    """
+    self.pending_fees += fee
+    if self.last_fee_flush < self.round_to_week(block.timestamp):
+        self._flush_fees()
+
+
+@external
+def flush_fees():
+    """
+    @notice Add the pending lock fees to the fee lock
+    @dev Permissionless, deposits only flush the fees on the first deposit of a week
+    """
+    self._flush_fees()
 
 
 @external
 def checkpoint():
     """
     @notice Record global data to checkpoint
+    @dev The weeks a user action left behind are recorded first
+    """
+    weeks: uint256 = self.record_weeks_behind(MAX_CHECKPOINT_WEEKS)
+    last_point: Point = self._checkpoint_global(block.timestamp, MAX_CHECKPOINT_WEEKS - weeks)
+    self.store_global_point(last_point)
+
+
+@external
+def checkpoint_partial(max_weeks: uint256) -> uint256:
     """
+    @notice Record global data to checkpoint, catching up at most `max_weeks` weeks
+    @dev
+        After a long idle period the weekly catch-up can be spread over several calls.
+        Each call first records the weeks a user action left behind the last global
+        point, then resumes from that point.
+    @param max_weeks Maximum number of weeks to catch up, at most MAX_CHECKPOINT_WEEKS
+    @return Timestamp the global history is filled up to, the last week recorded
+        while weeks left behind remain
+    """
+    assert max_weeks > 0  # dev: must catch up at least one week
+    weeks: uint256 = min(max_weeks, MAX_CHECKPOINT_WEEKS)
+    weeks -= self.record_weeks_behind(weeks)
+    if weeks == 0:
+        return self.recorded_week
+
+    until: uint256 = block.timestamp
+    epoch: uint256 = self.epoch[self]
+    if epoch > 0:
+        last_ts: uint256 = self.packed_points[self][epoch].ts_blk & MASK_64
+        until = min(self.round_to_week(last_ts) + weeks * WEEK, block.timestamp)
+
+    last_point: Point = self._checkpoint_global(until, weeks)
+    self.store_global_point(last_point)
+    # no more changes can happen at a week in the past
+    if until < block.timestamp:
+        self.week_epoch[self][until] = self.epoch[self]
+    return until
+
+
+@external
+def checkpoint_user(user: address) -> uint256:
+    """
+    @notice Record a week aligned point of `user` at the start of the current week
+    @dev
+        Permissionless. Lookups in the week of the point, or later, start from it
+        instead of replaying every slope change since the last lock change.
+        Nothing is recorded if `user` has a point in the current week already.
+    @param user User wallet address
+    @return Epoch of the last point of `user`
+    """
+    assert user != self  # dev: not a user
+    # index the block, so the timestamp of later heights is exact
     self._checkpoint(empty(address), empty(LockedBalance), empty(LockedBalance))
 
+    epoch: uint256 = self.epoch[user]
+    week: uint256 = self.round_to_week(block.timestamp)
+    if epoch == 0:
+        return 0
+    point: Point = self.load_point(user, epoch)
+    if point.ts >= week:
+        return epoch
+
+    point = self.replay_slope_changes(user, point, week)
+    # a weekly point includes the slope change of its week
+    point.slope += self.slope_changes[user][week]
+    point.ts = week
+    point.blk = block.number
+    epoch += 1
+    self.epoch[user] = epoch
+    self.store_point(user, epoch, point)
+    self.week_epoch[user][week] = epoch
+    return epoch
 
 
 @external
-def modify_lock(amount: uint256, unlock_time: uint256, user: address = msg.sender) -> LockedBalance:
+def delegate(to: address):
     """
-    @notice Create or modify a lock for a user. Support deposits on behalf of a user.
+    @notice Delegate the voting power of the sender's lock to `to`
     @dev
-        Minimum deposit to create a lock is 1 TOKEN.
-        You can lock for longer than 1 year, but less than 4 years, the max voting power is capped at 1 year.
-        You can only increase lock duration if it has less than 1 years remaining.
-        You can decrease lock duration if it has more than 1 years remaining.
-    @param amount TOKEN amount to add to a lock. 0 to not modify.
-    @param unlock_time Unix timestamp when the lock ends, must be in the future. 0 to not modify.
-    @param user A user to deposit to. If different from msg.sender, unlock_time has no effect
+        The power follows the lock, later changes of the lock move the delegated
+        power too. `getPriorVotes` of the delegate reads the sum of its delegated
+        locks from a single history, whatever the number of delegators.
+        Delegating to the sender or to the empty address removes the delegation.
+    @param to Delegate
+    """
+    assert to != self  # dev: can't delegate to the contract
+    old_account: address = self.delegated[msg.sender]
+    if old_account == empty(address):
+        old_account = msg.sender
+    new_account: address = to
+    if new_account == empty(address):
+        new_account = msg.sender
+    if new_account == old_account:
+        return
+
+    old_key: address = self._vote_key(old_account)
+    new_key: address = self._vote_key(new_account)
+    self.init_votes(old_account, old_key)
+    self.init_votes(new_account, new_key)
+
+    lock: LockedBalance = self.load_lock(msg.sender)
+    self._checkpoint_votes(old_key, lock, empty(LockedBalance))
+    if new_account == msg.sender:
+        self.delegated[msg.sender] = empty(address)
+    else:
+        self.delegated[msg.sender] = new_account
+    self._checkpoint_votes(new_key, empty(LockedBalance), lock)
+
+    log DelegateChanged(msg.sender, old_account, new_account, block.timestamp)
+
+
+@view
+@external
+def vote_key(account: address) -> address:
+    """
+    @notice Key of the vote history of `account`, for `epoch` and `point_history`
+    @dev The history only exists once `account` delegated or was delegated to
     """
-    old_lock: LockedBalance = self.locked[user]
+    return self._vote_key(account)
+
+
+@internal
+def _modify_lock(sender: address, amount: uint256, unlock_time: uint256, user: address) -> LockedBalance:
+    old_lock: LockedBalance = self.load_lock(user)
     new_lock: LockedBalance = old_lock
     amount_add: uint256 = amount * (100-FEE) /100
     new_lock.amount += amount_add
 
     unlock_week: uint256 = 0
     # only a user can modify their own unlock time
-    if msg.sender == user:
+    if sender == user:
         if unlock_time != 0:
             unlock_week = self.round_to_week(unlock_time)  # locktime is rounded down to weeks
             assert ((unlock_week - self.round_to_week(block.timestamp)) / WEEK) < MAX_N_WEEKS # lock can't exceed 4 years
@@ -286,7 +777,7 @@ def modify_lock(amount: uint256, unlock_time: uint256, user: address = msg.sende
 
     # create lock
     if old_lock.amount == 0 and old_lock.end == 0:
-        assert msg.sender == user  # dev: you can only create a lock for yourself
+        assert sender == user  # dev: you can only create a lock for yourself
         assert amount >= 10 ** 18  # dev: minimum amount is 1 TOKEN
         assert unlock_week != 0  # dev: must specify unlock time in the future
     # modify lock
@@ -295,34 +786,129 @@ def modify_lock(amount: uint256, unlock_time: uint256, user: address = msg.sende
 
     supply_before: uint256 = self.supply
     self.supply = supply_before + amount
-    self.locked[user] = new_lock
+    self.store_lock(user, new_lock)
     
     self._checkpoint(user, old_lock, new_lock)
+    self._checkpoint_delegate(user, old_lock, new_lock)
 
     if amount > 0:
-        assert TOKEN.transferFrom(msg.sender, self, amount)
-        
-        lock_fee_address: address = TREASURY
-
-        if self.collector_active:
-            look_fee_address = COLLECTOR
-    
-        old_lock_col: LockedBalance = self.locked[lock_fee_address]
-        new_lock_col: LockedBalance = old_lock_col
-        new_lock_col.amount += amount - amount_add
-        new_lock_col.end = block.timestamp + (MAX_LOCK_DURATION / 4)
-
-        self.locked[lock_fee_address] = new_lock_col
-        self._checkpoint(_look_fee_address, old_lock_col, new_lock_col)
+        assert TOKEN.transferFrom(sender, self, amount)
+        self._charge_fee(amount - amount_add)
 
     log Supply(supply_before, supply_before + amount, block.timestamp)
-    log ModifyLock(msg.sender, user, new_lock.amount, new_lock.end, block.timestamp)
+    log ModifyLock(sender, user, new_lock.amount, new_lock.end, block.timestamp)
 
     return new_lock
 
+
+@external
+def modify_lock(amount: uint256, unlock_time: uint256, user: address = msg.sender) -> LockedBalance:
+    """
+    @notice Create or modify a lock for a user. Support deposits on behalf of a user.
+    @dev
+        Minimum deposit to create a lock is 1 TOKEN.
+        You can lock for longer than 1 year, but less than 4 years, the max voting power is capped at 1 year.
+        You can only increase lock duration if it has less than 1 years remaining.
+        You can decrease lock duration if it has more than 1 years remaining.
+    @param amount TOKEN amount to add to a lock. 0 to not modify.
+    @param unlock_time Unix timestamp when the lock ends, must be in the future. 0 to not modify.
+    @param user A user to deposit to. If different from msg.sender, unlock_time has no effect
+    """
+    return self._modify_lock(msg.sender, amount, unlock_time, user)
+
+
+@external
+def modify_lock_with_permit(
+    amount: uint256,
+    unlock_time: uint256,
+    deadline: uint256,
+    v: uint8,
+    r: bytes32,
+    s: bytes32,
+    user: address = msg.sender,
+) -> LockedBalance:
+    """
+    @notice Approve with an EIP-2612 permit and create or modify a lock in one transaction
+    @dev
+        Same rules as `modify_lock`. A permit already used, e.g. front-run by someone
+        else, is accepted as long as the allowance covers `amount`.
+    @param amount TOKEN amount to add to a lock, the amount of the permit
+    @param unlock_time Unix timestamp when the lock ends, must be in the future. 0 to not modify.
+    @param deadline Deadline of the permit
+    @param v Signature of the permit by msg.sender
+    @param r Signature of the permit by msg.sender
+    @param s Signature of the permit by msg.sender
+    @param user A user to deposit to. If different from msg.sender, unlock_time has no effect
+    """
+    success: bool = raw_call(
+        TOKEN.address,
+        _abi_encode(
+            msg.sender, self, amount, deadline, v, r, s,
+            method_id=method_id("permit(address,address,uint256,uint256,uint8,bytes32,bytes32)"),
+        ),
+        revert_on_failure=False,
+    )
+    if not success:
+        assert TOKEN.allowance(msg.sender, self) >= amount  # dev: invalid permit
+    return self._modify_lock(msg.sender, amount, unlock_time, user)
+
+
+@external
+def modify_lock_many(users: DynArray[address, MAX_BATCH_SIZE], amounts: DynArray[uint256, MAX_BATCH_SIZE]):
+    """
+    @notice Deposit to the existing locks of many users at once
+    @dev
+        The tokens are pulled with a single transfer, the global history and the lock fee
+        are checkpointed once for the whole batch.
+        Unlock times are not modified.
+    @param users Users to deposit to, their locks must be active
+    @param amounts TOKEN amount to add to the lock of each user
+    """
+    assert len(users) == len(amounts)  # dev: length mismatch
+
+    # fill point_history until t=now, bounded to keep the gas of user actions predictable
+    last_point: Point = self._checkpoint_global(block.timestamp, MAX_CATCHUP_WEEKS)
+
+    total: uint256 = 0
+    fee: uint256 = 0
+    for i in range(MAX_BATCH_SIZE):
+        if i >= len(users):
+            break
+        user: address = users[i]
+        amount: uint256 = amounts[i]
+        assert amount > 0  # dev: nothing to deposit
+
+        old_lock: LockedBalance = self.load_lock(user)
+        assert old_lock.end > block.timestamp  # dev: lock expired
+        new_lock: LockedBalance = old_lock
+        amount_add: uint256 = amount * (100-FEE) /100
+        new_lock.amount += amount_add
+        self.store_lock(user, new_lock)
+
+        user_points: Point[2] = self._checkpoint_user(user, old_lock, new_lock)
+        last_point = self.apply_user_points(last_point, user_points)
+        self._checkpoint_delegate(user, old_lock, new_lock)
+
+        total += amount
+        fee += amount - amount_add
+        log ModifyLock(msg.sender, user, new_lock.amount, new_lock.end, block.timestamp)
+
+    self.store_global_point(last_point)
+
+    supply_before: uint256 = self.supply
+    self.supply = supply_before + total
+
+    assert TOKEN.transferFrom(msg.sender, self, total)
+    self._charge_fee(fee)
+
+    log Supply(supply_before, supply_before + total, block.timestamp)
+
 @external
 def removeCollector() -> bool:
     assert msg.sender == COLLECTOR
+    # fees charged until now belong to the collector
+    if self.collector_active:
+        self._flush_fees()
     self.collector_active = False
     return True
 
@@ -337,8 +923,10 @@ def withdraw() -> Withdrawn:
 
         for 1/2 MAXTIME vl token with MAX_PENALTY_RATIO = 75% the penalty is 50%
         starts with 75% on 1/4, hits 50% on 1/2, then 25% on 3/4, 0 at 4/4
+
+        The penalty stays in the contract until `sweep_penalties` is called.
     """
-    old_locked: LockedBalance = self.locked[msg.sender]
+    old_locked: LockedBalance = self.load_lock(msg.sender)
     assert old_locked.amount > 0  # dev: create a lock first to withdraw
     
     time_left: uint256 = 0
@@ -351,26 +939,44 @@ def withdraw() -> Withdrawn:
         penalty = old_locked.amount * penalty_ratio / SCALE
 
     zero_locked: LockedBalance = empty(LockedBalance)
-    self.locked[msg.sender] = zero_locked
+    self.store_lock(msg.sender, zero_locked)
 
     supply_before: uint256 = self.supply
     self.supply = supply_before - old_locked.amount
 
     self._checkpoint(msg.sender, old_locked, zero_locked)
+    self._checkpoint_delegate(msg.sender, old_locked, zero_locked)
 
     assert TOKEN.transfer(msg.sender, old_locked.amount - penalty)
-    
+
+    # sent to the treasury in bulk by `sweep_penalties`
     if penalty > 0:
-        assert TOKEN.approve(TREASURY, penalty)
-        assert TOKEN.transfer(TREASURY, penalty)
+        self.pending_penalties += penalty
+        self.penalties[self.round_to_week(block.timestamp)] += penalty
 
-        log Penalty(TREASURY, penalty, block.timestamp)
-    
     log Withdraw(msg.sender, old_locked.amount - penalty, block.timestamp)
+    if penalty > 0:
+        log ExitPenalty(msg.sender, penalty, block.timestamp)
     log Supply(supply_before, supply_before - old_locked.amount, block.timestamp)
 
     return Withdrawn({amount: old_locked.amount - penalty, penalty: penalty})
 
+
+@external
+def sweep_penalties() -> uint256:
+    """
+    @notice Send the accumulated early exit penalties to the treasury
+    @dev Permissionless, a single transfer for every withdrawal since the last sweep
+    @return TOKEN amount sent to the treasury
+    """
+    amount: uint256 = self.pending_penalties
+    if amount > 0:
+        self.pending_penalties = 0
+        assert TOKEN.transfer(TREASURY, amount)
+        log Penalty(TREASURY, amount, block.timestamp)
+    return amount
+
+
 @view
 @internal
 def find_epoch_by_block(user: address, height: uint256, max_epoch: uint256) -> uint256:
@@ -386,7 +992,7 @@ def find_epoch_by_block(user: address, height: uint256, max_epoch: uint256) -> u
         if _min >= _max:
             break
         _mid: uint256 = (_min + _max + 1) / 2
-        if self.point_history[user][_mid].blk <= height:
+        if (self.packed_points[user][_mid].ts_blk >> 64) <= height:
             _min = _mid
         else:
             _max = _mid - 1
@@ -398,6 +1004,25 @@ def find_epoch_by_block(user: address, height: uint256, max_epoch: uint256) -> u
 def find_epoch_by_timestamp(user: address, ts: uint256) -> uint256:
     return self._find_epoch_by_timestamp(user, ts, self.epoch[user])
 
+
+@view
+@internal
+def find_week_epoch(user: address, ts: uint256, height: uint256, max_epoch: uint256) -> uint256:
+    """
+    @notice Epoch of the weekly point of the week of `ts`, if it is the last point of
+        `user` at or before both `ts` and block `height`
+    @dev Only the next point has to be read, the lock can change later in the week
+    @return The epoch, 0 if there is no such weekly point
+    """
+    epoch: uint256 = self.week_epoch[user][self.round_to_week(ts)]
+    if epoch == 0 or (self.packed_points[user][epoch].ts_blk >> 64) > height:
+        return 0
+    if epoch < max_epoch:
+        next_point: uint256 = self.packed_points[user][epoch + 1].ts_blk
+        if next_point & MASK_64 <= ts and next_point >> 64 <= height:
+            return 0
+    return epoch
+
 @view
 @internal
 def _find_epoch_by_timestamp(user: address, ts: uint256, max_epoch: uint256) -> uint256:
@@ -413,36 +1038,87 @@ def _find_epoch_by_timestamp(user: address, ts: uint256, max_epoch: uint256) ->
         if _min >= _max:
             break
         _mid: uint256 = (_min + _max + 1) / 2
-        if self.point_history[user][_mid].ts <= ts:
+        if (self.packed_points[user][_mid].ts_blk & MASK_64) <= ts:
             _min = _mid
         else:
             _max = _mid - 1
     return _min
 
 
+@pure
+@internal
+def lowest_bit(word: uint256) -> uint256:
+    """
+    @notice Index of the lowest set bit of a non zero `word`
+    """
+    x: uint256 = word
+    index: uint256 = 0
+    for bits_shift in [128, 64, 32, 16, 8, 4, 2, 1]:
+        if x & ((1 << bits_shift) - 1) == 0:
+            x = x >> bits_shift
+            index += bits_shift
+    return index
+
+
+@view
+@internal
+def _next_slope_change(user: address, ts: uint256, until: uint256) -> uint256:
+    """
+    @notice Find the first week after the week of `ts` with a slope change of `user`
+    @dev
+        Slope changes are scheduled at most MAX_N_WEEKS weeks after a checkpoint,
+        so no change can be found further than MAX_INDEX_WORDS words from a point.
+    @param ts Time to search after
+    @param until Time to stop the search at
+    @return Time of the slope change, or `until` if there is none before it
+    """
+    week: uint256 = ts / WEEK + 1
+    for i in range(MAX_INDEX_WORDS):
+        if week * WEEK >= until:
+            break
+        bits: uint256 = self.slope_change_weeks[user][week >> 8] >> (week & 255)
+        if bits != 0:
+            week += self.lowest_bit(bits)
+            return min(week * WEEK, until)
+        week = (week | 255) + 1
+    return until
+
+
+@view
+@external
+def next_slope_change(user: address, ts: uint256, until: uint256) -> (uint256, int128):
+    """
+    @notice Find the first slope change of `user` after the week of `ts`
+    @dev RewardPool replays the points of the holders with this scan of the bitmaps
+    @param ts Time to search after
+    @param until Time to stop the search at
+    @return Time of the slope change, or `until` if there is none before it, and the
+        slope change at that time
+    """
+    t_i: uint256 = self._next_slope_change(user, ts, until)
+    week: uint256 = t_i / WEEK
+    if t_i % WEEK != 0 or (self.slope_change_weeks[user][week >> 8] >> (week & 255)) & 1 == 0:
+        return t_i, 0
+    return t_i, self.slope_changes[user][t_i]
+
+
 @view
 @internal
 def replay_slope_changes(user: address, point: Point, ts: uint256) -> Point:
     """
     @dev
-        If the `ts` is higher than MAX_N_WEEKS weeks ago, this function will return the 
-        balance at exactly MAX_N_WEEKS weeks instead of `ts`. 
-        MAX_N_WEEKS weeks is considered sufficient to cover the `MAX_LOCK_DURATION` period.
+        Jumps between the weeks indexed with a slope change, the cost grows with the
+        number of changes between the point and `ts` instead of the number of weeks.
     """
     upoint: Point = point
     t_i: uint256 = self.round_to_week(upoint.ts)
 
-    for i in range(MAX_N_WEEKS):
-        t_i += WEEK
-        d_slope: int128 = 0
-        if t_i > ts:
-            t_i = ts
-        else:
-            d_slope = self.slope_changes[user][t_i]
+    for i in range(MAX_N_WEEKS + 1):
+        t_i = self._next_slope_change(user, t_i, ts)
         upoint.bias -= upoint.slope * convert(t_i - upoint.ts, int128)
         if t_i == ts:
             break
-        upoint.slope += d_slope
+        upoint.slope += self.slope_changes[user][t_i]
         upoint.ts = t_i
     
     upoint.bias = max(0, upoint.bias)
@@ -461,8 +1137,12 @@ def _balanceOf(user: address, ts: uint256 = block.timestamp) -> uint256:
     if epoch == 0:
         return 0
     if ts != block.timestamp:
-        epoch = self._find_epoch_by_timestamp(user, ts, epoch)
-    upoint: Point = self.point_history[user][epoch]
+        week_epoch: uint256 = self.find_week_epoch(user, ts, block.number, epoch)
+        if week_epoch != 0:
+            epoch = week_epoch
+        else:
+            epoch = self._find_epoch_by_timestamp(user, ts, epoch)
+    upoint: Point = self.load_point(user, epoch)
     
     upoint = self.replay_slope_changes(user, upoint, ts)
 
@@ -481,6 +1161,120 @@ def balanceOf(user: address, ts: uint256 = block.timestamp) -> uint256:
     return self._balanceOf(user, ts)
 
 
+@view
+@external
+def balanceOfMany(users: DynArray[address, MAX_BATCH_SIZE], ts: uint256 = block.timestamp) -> DynArray[uint256, MAX_BATCH_SIZE]:
+    """
+    @notice Get the voting power for many users at once
+    @param users User wallet addresses
+    @param ts Epoch time to return voting power at
+    @return Voting power of each user
+    """
+    balances: DynArray[uint256, MAX_BATCH_SIZE] = []
+    for user in users:
+        balances.append(self._balanceOf(user, ts))
+    return balances
+
+
+@view
+@internal
+def find_block_checkpoint(height: uint256) -> uint256:
+    """
+    @notice Binary search for the last real checkpoint at or before block `height`
+    @param height Block to find
+    @return Index of the block checkpoint
+    """
+    _min: uint256 = 0
+    _max: uint256 = self.last_block_checkpoint
+    for i in range(128):  # Will be always enough for 128-bit numbers
+        if _min >= _max:
+            break
+        _mid: uint256 = (_min + _max + 1) / 2
+        if (self.block_checkpoints[_mid] >> 64) & MASK_64 <= height:
+            _min = _mid
+        else:
+            _max = _mid - 1
+    return _min
+
+
+@view
+@internal
+def _block_time(index: uint256, height: uint256) -> uint256:
+    """
+    @notice Timestamp of block `height`, interpolated between the checkpoints around it
+    @param index Index of the last block checkpoint at or before `height`
+    @param height Block to get the timestamp of
+    @return Timestamp, exact at a checkpointed block
+    """
+    checkpoint: uint256 = self.block_checkpoints[index]
+    blk_0: uint256 = (checkpoint >> 64) & MASK_64
+    ts_0: uint256 = checkpoint & MASK_64
+    blk_1: uint256 = block.number
+    ts_1: uint256 = block.timestamp
+    if index < self.last_block_checkpoint:
+        checkpoint = self.block_checkpoints[index + 1]
+        blk_1 = (checkpoint >> 64) & MASK_64
+        ts_1 = checkpoint & MASK_64
+    if blk_1 == blk_0:
+        return ts_0
+    return ts_0 + (ts_1 - ts_0) * (height - blk_0) / (blk_1 - blk_0)
+
+
+@view
+@external
+def timestamp_at(height: uint256) -> uint256:
+    """
+    @notice Timestamp of a past block as used by `getPriorVotes` and `totalSupplyAt`
+    @param height Block to get the timestamp of
+    @return Timestamp, exact at blocks with a checkpoint, interpolated in between
+    """
+    assert height <= block.number
+    return self._block_time(self.find_block_checkpoint(height), height)
+
+
+@view
+@internal
+def supply_at(index: uint256, ts: uint256) -> uint256:
+    """
+    @notice Total voting power at `ts`, between the block checkpoint `index` and the next
+    @dev A weekly point recorded after the checkpoint is looked up by its week
+    """
+    epoch: uint256 = self.block_checkpoints[index] >> 128
+    week_epoch: uint256 = self.week_epoch[self][self.round_to_week(ts)]
+    if week_epoch > epoch:
+        if ts % WEEK == 0:
+            return self.week_supply(ts)
+        epoch = week_epoch
+    point: Point = self.load_point(self, epoch)
+    point = self.replay_slope_changes(self, point, ts)
+    return convert(point.bias, uint256)
+
+
+@view
+@internal
+def _getPriorVotes(user: address, height: uint256, index: uint256, block_time: uint256) -> uint256:
+    """
+    @param index Index of the last block checkpoint at or before `height`
+    @param block_time Timestamp of block `height`
+    """
+    if user == self:
+        return self.supply_at(index, block_time)
+    # the vote history replaces the lock history from its start
+    key: address = self._vote_key(user)
+    if self.epoch[key] == 0 or (self.packed_points[key][1].ts_blk >> 64) > height:
+        key = user
+    uepoch: uint256 = self.epoch[key]
+    week_epoch: uint256 = self.find_week_epoch(key, block_time, height, uepoch)
+    if week_epoch != 0:
+        uepoch = week_epoch
+    else:
+        uepoch = self.find_epoch_by_block(key, height, uepoch)
+    upoint: Point = self.load_point(key, uepoch)
+
+    upoint = self.replay_slope_changes(key, upoint, block_time)
+    return convert(upoint.bias, uint256)
+
+
 @view
 @external
 def getPriorVotes(user: address, height: uint256) -> uint256:
@@ -489,34 +1283,63 @@ def getPriorVotes(user: address, height: uint256) -> uint256:
     @dev 
         Compatible with GovernorAlpha. 
         `user`can be self to get total supply at height.
+        Includes the locks delegated to `user`, excludes its own lock once delegated.
+        The time of `height` is one binary search over the block checkpoints. Unless
+        `user` has a weekly point for that week, a second binary search over the
+        history of `user` finds its point, only the total supply is a single lookup.
     @param user User's wallet address
     @param height Block to calculate the voting power at
     @return Voting power
     """
     assert height <= block.number
+    index: uint256 = self.find_block_checkpoint(height)
+    return self._getPriorVotes(user, height, index, self._block_time(index, height))
 
-    uepoch: uint256 = self.epoch[user]
-    uepoch = self.find_epoch_by_block(user, height, uepoch)
-    upoint: Point = self.point_history[user][uepoch]
 
-    max_epoch: uint256 = self.epoch[self]
-    epoch: uint256 = self.find_epoch_by_block(self, height, max_epoch)
-    point_0: Point = self.point_history[self][epoch]
-    d_block: uint256 = 0
-    d_t: uint256 = 0
-    if epoch < max_epoch:
-        point_1: Point = self.point_history[self][epoch + 1]
-        d_block = point_1.blk - point_0.blk
-        d_t = point_1.ts - point_0.ts
-    else:
-        d_block = block.number - point_0.blk
-        d_t = block.timestamp - point_0.ts
-    block_time: uint256 = point_0.ts
-    if d_block != 0:
-        block_time += d_t * (height - point_0.blk) / d_block
+@view
+@external
+def getPriorVotesMany(users: DynArray[address, MAX_BATCH_SIZE], height: uint256) -> DynArray[uint256, MAX_BATCH_SIZE]:
+    """
+    @notice Measure voting power of many users at block height `height`
+    @dev The timestamp of `height` is resolved once for the whole batch
+    @param users User wallet addresses
+    @param height Block to calculate the voting power at
+    @return Voting power of each user
+    """
+    assert height <= block.number
+    index: uint256 = self.find_block_checkpoint(height)
+    block_time: uint256 = self._block_time(index, height)
+    votes: DynArray[uint256, MAX_BATCH_SIZE] = []
+    for user in users:
+        votes.append(self._getPriorVotes(user, height, index, block_time))
+    return votes
+
+
+@view
+@internal
+def week_supply(week: uint256) -> uint256:
+    """
+    @notice Read the total voting power recorded for a past week
+    @dev The week must have a recorded weekly point
+    """
+    epoch: uint256 = self.week_epoch[self][week]
+    # the bias is never negative
+    return self.packed_points[self][epoch].bias_slope & MASK_128
+
+
+@view
+@internal
+def _totalSupply(ts: uint256) -> uint256:
+    # weekly points recorded during checkpoints answer past weeks directly
+    if ts % WEEK == 0:
+        if self.week_epoch[self][ts] != 0:
+            return self.week_supply(ts)
+        packed: uint256 = self.week_points[ts]
+        if packed != 0:
+            return packed & MASK_128
+    return self._balanceOf(self, ts)
+
 
-    upoint = self.replay_slope_changes(user, upoint, block_time)
-    return convert(upoint.bias, uint256)
 @view
 @external
 def totalSupply(ts: uint256 = block.timestamp) -> uint256:
@@ -526,7 +1349,7 @@ def totalSupply(ts: uint256 = block.timestamp) -> uint256:
     @param ts Epoch time to return voting power at
     @return Total voting power
     """
-    return self._balanceOf(self, ts)
+    return self._totalSupply(ts)
 
 
 @view
@@ -534,26 +1357,13 @@ def totalSupply(ts: uint256 = block.timestamp) -> uint256:
 def totalSupplyAt(height: uint256) -> uint256:
     """
     @notice Calculate total voting power at some point in the past
+    @dev One binary search over the block checkpoints and one lookup of the epoch
     @param height Block to calculate the total voting power at
     @return Total voting power at `height`
     """
     assert height <= block.number
-    epoch: uint256 = self.epoch[self]
-    target_epoch: uint256 = self.find_epoch_by_block(self, height, epoch)
-
-    point: Point = self.point_history[self][target_epoch]
-    dt: uint256 = 0
-    if target_epoch < epoch:
-        point_next: Point = self.point_history[self][target_epoch + 1]
-        if point.blk != point_next.blk:
-            dt = (height - point.blk) * (point_next.ts - point.ts) / (point_next.blk - point.blk)
-    else:
-        if point.blk != block.number:
-            dt = (height - point.blk) * (block.timestamp - point.ts) / (block.number - point.blk)
-
-    # Now dt contains info on how far are we beyond point
-    point = self.replay_slope_changes(self, point, point.ts + dt)
-    return convert(point.bias, uint256)
+    index: uint256 = self.find_block_checkpoint(height)
+    return self.supply_at(index, self._block_time(index, height))
 
 
 @view
@@ -17,4 +17,23 @@ interface IVoteLockTocken is IERC20 {
         uint256 _unlock_time,
         address _user
     ) external;
+
+    function modify_lock_with_permit(
+        uint256 _amount,
+        uint256 _unlock_time,
+        uint256 _deadline,
+        uint8 _v,
+        bytes32 _r,
+        bytes32 _s,
+        address _user
+    ) external;
+
+    function delegate(address _to) external;
+
+    function delegated(address _user) external view returns (address);
+
+    function getPriorVotes(address _user, uint256 _height)
+        external
+        view
+        returns (uint256);
 }
@@ -0,0 +1,42 @@
+# @version 0.3.10
+"""
+@title Storage layout benchmark
+@notice
+    Stores the points and locks of VoteLockToken one field per slot, as before
+    they were packed, and packed as VoteLockToken stores them, so the gas of
+    both layouts can be compared on the same writes.
+"""
+
+struct Point:
+    bias: int128
+    slope: int128
+    ts: uint256
+    blk: uint256
+
+struct LockedBalance:
+    amount: uint256
+    end: uint256
+
+struct PackedPoint:
+    bias_slope: uint256  # slope << 128 | bias
+    ts_blk: uint256  # blk << 64 | ts
+
+points: HashMap[address, HashMap[uint256, Point]]
+locks: HashMap[address, LockedBalance]
+packed_points: HashMap[address, HashMap[uint256, PackedPoint]]
+packed_locks: HashMap[address, uint256]  # end << 128 | amount
+
+
+@external
+def store(user: address, epoch: uint256, point: Point, lock: LockedBalance):
+    self.points[user][epoch] = point
+    self.locks[user] = lock
+
+
+@external
+def store_packed(user: address, epoch: uint256, point: Point, lock: LockedBalance):
+    self.packed_points[user][epoch] = PackedPoint({
+        bias_slope: (convert(point.slope, uint256) << 128) | convert(point.bias, uint256),
+        ts_blk: (point.blk << 64) | point.ts,
+    })
+    self.packed_locks[user] = (lock.end << 128) | lock.amount
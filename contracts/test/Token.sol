@@ -2,9 +2,12 @@
 pragma solidity 0.8.15;
 
 import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+// pre-final path of ERC20Permit in OpenZeppelin 4.8.1, it becomes
+// extensions/ERC20Permit.sol when the dependency is bumped to 4.9 or later
+import "@openzeppelin/contracts/token/ERC20/extensions/draft-ERC20Permit.sol";
 
-contract Token is ERC20 {
-    constructor(string memory _name) ERC20(_name, _name) {}
+contract Token is ERC20Permit {
+    constructor(string memory _name) ERC20(_name, _name) ERC20Permit(_name) {}
 
     function mint(address _to, uint256 _amount) external {
         _mint(_to, _amount);
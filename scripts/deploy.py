@@ -1,7 +1,10 @@
 from pathlib import Path
 from readline import append_history_file
 
+import asyncio
+import csv
 import os
+import random
 import click
 from ape import accounts, project, chain, networks
 from ape.cli import NetworkBoundCommand, network_option, account_option
@@ -9,6 +12,9 @@ from eth._utils.address import generate_contract_address
 from eth_utils import to_checksum_address, to_canonical_address
 from datetime import datetime
 
+from vltoken.artifacts import container
+from vltoken.model import LockedBalance, Point
+
 ARBITRUM_BASE_TOKEN_ADDRESS = os.getenv('ARBITRUM_BASE_TOKEN_ADDRESS')
 ARBITRUM_TREASURY_ADDRESS = os.getenv('ARBITRUM_TREASURY_ADDRESS')
 ARBITRUM_COLLECTOR_ADDRESS = os.getenv('ARBITRUM_COLLECTOR_ADDRESS')
@@ -32,11 +38,30 @@ def deploy_vl_token(network, account):
 
     # vl_token = project.VoteLockToken.deploy(ARBITRUM_BASE_TOKEN_ADDRESS, ARBITRUM_TREASURY_ADDRESS, ARBITRUM_COLLECTOR_ADDRESS, sender=account)
 
-    vl_token = account.deploy(project.VoteLockToken, ARBITRUM_BASE_TOKEN_ADDRESS, ARBITRUM_TREASURY_ADDRESS, ARBITRUM_COLLECTOR_ADDRESS, publish=True)
+    vl_token = account.deploy(
+        container("VoteLockToken"),
+        ARBITRUM_BASE_TOKEN_ADDRESS,
+        ARBITRUM_TREASURY_ADDRESS,
+        ARBITRUM_COLLECTOR_ADDRESS,
+        publish=True,
+    )
 
     print(vl_token.ABI)
 
 
+@cli.command(cls=NetworkBoundCommand)
+@account_option()
+@click.argument("vl_token")
+@click.option("--start-time", type=int, default=None, help="First week of rewards")
+def deploy_reward_pool(network, account, vl_token, start_time):
+    if start_time is None:
+        start_time = chain.pending_timestamp
+    reward_pool = account.deploy(
+        container("RewardPool"), vl_token, start_time, publish=True
+    )
+    print(f"RewardPool {reward_pool.address}, rewards from {reward_pool.start_time()}")
+
+
 @cli.command(cls=NetworkBoundCommand)
 #@network_option()
 @account_option()
@@ -45,4 +70,134 @@ def publish(network, account):
     print(network)
 
 
-    networks.provider.network.explorer.publish_contract("0x829F71920a42678C3A5d19aF52EeB4A4c181b7Ca")
\ No newline at end of file
+    networks.provider.network.explorer.publish_contract("0x829F71920a42678C3A5d19aF52EeB4A4c181b7Ca")
+
+
+@cli.command(cls=NetworkBoundCommand)
+@click.argument("address")
+@click.argument("height", type=int)
+@click.option("--db", default="vl_token.sqlite", help="SQLite database of the indexer")
+@click.option("--start-block", default=0, help="First block to index")
+@click.option("--out", default="snapshot", help="Output path, without extension")
+@click.option("--workers", default=os.cpu_count(), help="Processes computing the power")
+@click.option("--verify", default=256, help="Holders checked against getPriorVotes")
+def export_snapshot(network, address, height, db, start_block, out, workers, verify):
+    from vltoken.indexer import Indexer
+    from vltoken.snapshot import voting_power, write_snapshot
+
+    vl_token = container("VoteLockToken").at(address)
+    indexer = Indexer(vl_token, db, start_block)
+    if indexer.last_block is None or indexer.last_block < height:
+        indexer.sync(height)
+    histories = indexer.lock_events(height)
+
+    # the fee locks emit no event and delegated votes aren't the own lock,
+    # their power is read from the contract
+    on_chain_holders = indexer.fee_accounts()
+    on_chain_holders += indexer.delegation_accounts(height)
+    indexer.close()
+    on_chain_holders = list(dict.fromkeys(on_chain_holders))
+    for holder in on_chain_holders:
+        histories.pop(holder, None)
+
+    block_time = vl_token.timestamp_at(height)
+    power = voting_power(histories, height, block_time, workers)
+    for i in range(0, len(on_chain_holders), 256):
+        holders = on_chain_holders[i : i + 256]
+        power.update(zip(holders, vl_token.getPriorVotesMany(holders, height)))
+
+    sample = random.sample(list(power), min(verify, len(power)))
+    for i in range(0, len(sample), 256):
+        users = sample[i : i + 256]
+        on_chain = vl_token.getPriorVotesMany(users, height)
+        mismatches = [u for u, votes in zip(users, on_chain) if power[u] != votes]
+        if mismatches:
+            raise click.ClickException(f"power differs on-chain for {mismatches}")
+
+    root = write_snapshot(out, height, block_time, power)
+    print(f"{len(power)} holders at block {height}, merkle root 0x{root.hex()}")
+
+
+@cli.command(cls=NetworkBoundCommand)
+@click.argument("address")
+@click.argument("user")
+@click.option("--out", default="history", help="Output path, without extension")
+@click.option("--block", type=int, default=None, help="Block read, latest by default")
+def export_history(network, address, user, out, block):
+    """
+    Stream the points and slope changes of USER, or of the contract itself when
+    USER is ADDRESS, from storage to <out>_points.csv and <out>_slope_changes.csv
+    """
+    from vltoken.multicall import VoteLockClient
+    from vltoken.storage import StorageReader
+
+    async def export():
+        async with VoteLockClient(networks.provider.uri, address) as client:
+            reader = StorageReader(client)
+            pinned = await reader.pin(block)
+            with open(f"{out}_points.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["epoch", "bias", "slope", "ts", "blk"])
+                epoch = 0
+                async for p in reader.points(user, block=pinned):
+                    writer.writerow([epoch, p.bias, p.slope, p.ts, p.blk])
+                    epoch += 1
+            with open(f"{out}_slope_changes.csv", "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["ts", "slope_change"])
+                async for change in reader.slope_changes(user, block=pinned):
+                    writer.writerow(change)
+            return epoch, client.round_trips
+
+    n_points, round_trips = asyncio.run(export())
+    print(f"{n_points} points of {user} read in {round_trips} requests")
+
+
+@cli.command(cls=NetworkBoundCommand)
+@click.argument("address")
+@click.option("--db", default="vl_token.sqlite", help="SQLite database of the indexer")
+@click.option("--start-block", default=0, help="First block to index")
+@click.option("--weeks", default=52, help="Number of weeks to project")
+@click.option("--out", default=None, help="CSV file to write, printed otherwise")
+def export_curves(network, address, db, start_block, weeks, out):
+    """
+    Project the total supply, the weekly unlocks and the early exit penalties
+    """
+    from vltoken.analytics import SupplyProjection
+    from vltoken.indexer import Indexer
+    from vltoken.multicall import VoteLockClient
+    from vltoken.storage import StorageReader
+
+    vl_token = container("VoteLockToken").at(address)
+    head = chain.blocks.head
+    indexer = Indexer(vl_token, db, start_block)
+    indexer.sync(head.number)
+    locks = {
+        user: LockedBalance(amount, end)
+        for user, amount, end in indexer.active_locks(head.timestamp)
+    }
+    for holder in indexer.fee_accounts():
+        locks[holder] = LockedBalance(*vl_token.locked(holder))
+    indexer.close()
+
+    async def read_slope_changes():
+        async with VoteLockClient(networks.provider.uri, address) as client:
+            reader = StorageReader(client)
+            changes = reader.slope_changes(address, block=head.number)
+            return dict([change async for change in changes])
+
+    point = Point(*vl_token.point_history(vl_token, vl_token.epoch(vl_token)))
+    projection = SupplyProjection(point, asyncio.run(read_slope_changes()), locks)
+    curves = projection.curves(head.timestamp, weeks)
+
+    header = ["week", "supply", "unlocks", "penalties"]
+    if out is None:
+        print("{:>10} {:>28} {:>28} {:>28}".format(*header))
+        for week, supply, unlocks, penalties in curves.rows():
+            date = datetime.utcfromtimestamp(week).strftime("%Y-%m-%d")
+            print(f"{date:>10} {supply:>28} {unlocks:>28} {penalties:>28}")
+        return
+    with open(out, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(curves.rows())
@@ -0,0 +1,61 @@
+import click
+from ape import chain
+from ape.cli import NetworkBoundCommand, network_option
+
+from vltoken.artifacts import container
+from vltoken.indexer import Indexer
+from vltoken.model import WEEK
+
+
+@click.group(short_help="Index VoteLockToken events into SQLite")
+def cli():
+    pass
+
+
+def open_indexer(address, db, start_block):
+    return Indexer(container("VoteLockToken").at(address), db, start_block)
+
+
+@cli.command(cls=NetworkBoundCommand)
+@network_option()
+@click.argument("address")
+@click.option("--db", default="vl_token.sqlite", help="SQLite database path")
+@click.option("--start-block", default=0, help="First block to index")
+@click.option("--chunk-size", default=2000, help="Blocks per request")
+@click.option("--confirmations", default=0, help="Blocks to stay behind the head")
+def sync(network, address, db, start_block, chunk_size, confirmations):
+    indexer = open_indexer(address, db, start_block)
+    to_block = chain.blocks.head.number - confirmations
+    n_events = indexer.sync(to_block, chunk_size)
+    print(f"indexed {n_events} events up to block {indexer.last_block}")
+
+
+@cli.command(cls=NetworkBoundCommand)
+@network_option()
+@click.argument("address")
+@click.option("--db", default="vl_token.sqlite", help="SQLite database path")
+def active(network, address, db):
+    indexer = open_indexer(address, db, 0)
+    for user, amount, end in indexer.active_locks(chain.blocks.head.timestamp):
+        print(user, amount, end)
+
+
+@cli.command(cls=NetworkBoundCommand)
+@network_option()
+@click.argument("address")
+@click.argument("week", type=int)
+@click.option("--db", default="vl_token.sqlite", help="SQLite database path")
+def expiring(network, address, week, db):
+    indexer = open_indexer(address, db, 0)
+    for user, amount, end in indexer.locks_expiring(week):
+        print(user, amount, end)
+
+
+@cli.command(cls=NetworkBoundCommand)
+@network_option()
+@click.argument("address")
+@click.option("--db", default="vl_token.sqlite", help="SQLite database path")
+def penalties(network, address, db):
+    indexer = open_indexer(address, db, 0)
+    for week, amount in indexer.penalties_per_week().items():
+        print(week, amount)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import random
+
+import click
+from ape import accounts, chain, networks
+from ape.cli import NetworkBoundCommand, account_option
+
+from vltoken.artifacts import container
+from vltoken.keeper import (
+    Keeper,
+    Policy,
+    Receipt,
+    anvil_jump,
+    anvil_set_base_fee,
+    rpc_submitter,
+    serve_metrics,
+)
+from vltoken.model import DAY
+from vltoken.multicall import VoteLockClient
+
+GWEI = 10**9
+
+
+@click.group(short_help="Checkpoint the global history when gas is cheap")
+def cli():
+    pass
+
+
+def policy_options(f):
+    f = click.option(
+        "--max-base-fee", default=20.0, help="Base fee in gwei to catch up any backlog"
+    )(f)
+    f = click.option(
+        "--urgent-weeks", default=4, help="Backlog caught up at any base fee"
+    )(f)
+    f = click.option(
+        "--max-weeks-per-tx", default=52, help="Weeks caught up per transaction"
+    )(f)
+    return f
+
+
+def ape_submitter(vl_token, account):
+    """
+    Signs with an ape account, the blocking call runs in a thread so the
+    metrics keep being served.
+    """
+
+    def send(max_weeks):
+        if max_weeks == 0:
+            receipt = vl_token.checkpoint(sender=account)
+        else:
+            receipt = vl_token.checkpoint_partial(max_weeks, sender=account)
+        return Receipt(
+            receipt.block_number,
+            chain.blocks[receipt.block_number].timestamp,
+            receipt.gas_used,
+            receipt.gas_price,
+        )
+
+    async def submit(max_weeks):
+        return await asyncio.to_thread(send, max_weeks)
+
+    return submit
+
+
+@cli.command(cls=NetworkBoundCommand)
+@account_option()
+@click.argument("address")
+@policy_options
+@click.option("--interval", default=60.0, help="Seconds between polls")
+@click.option("--metrics-port", default=9108, help="Port of GET /metrics")
+def run(
+    network,
+    account,
+    address,
+    max_base_fee,
+    urgent_weeks,
+    max_weeks_per_tx,
+    interval,
+    metrics_port,
+):
+    """
+    Watch the VoteLockToken at ADDRESS and checkpoint it until interrupted
+    """
+    logging.basicConfig(level=logging.INFO)
+    vl_token = container("VoteLockToken").at(address)
+    policy = Policy(int(max_base_fee * GWEI), urgent_weeks, max_weeks_per_tx)
+
+    async def main():
+        async with VoteLockClient(networks.provider.uri, address) as client:
+            keeper = Keeper(client, ape_submitter(vl_token, account), policy, interval)
+            runner = await serve_metrics(keeper.metrics, metrics_port)
+            try:
+                await keeper.run()
+            finally:
+                await runner.cleanup()
+
+    asyncio.run(main())
+
+
+@cli.command(cls=NetworkBoundCommand)
+@click.argument("address")
+@policy_options
+@click.option("--days", default=365, help="Days of simulated idle time")
+@click.option("--seed", default=0, help="Seed of the simulated base fees")
+def simulate(
+    network, address, max_base_fee, urgent_weeks, max_weeks_per_tx, days, seed
+):
+    """
+    Run the keeper against a local anvil, one poll per simulated day with a
+    random base fee, and print its metrics
+    """
+    rng = random.Random(seed)
+    policy = Policy(int(max_base_fee * GWEI), urgent_weeks, max_weeks_per_tx)
+    # the accounts of a local anvil are unlocked on the node
+    sender = accounts.test_accounts[0].address
+
+    async def main():
+        async with VoteLockClient(networks.provider.uri, address) as client:
+            keeper = Keeper(client, rpc_submitter(client, sender), policy)
+            for _ in range(days):
+                await anvil_jump(client, DAY, 24)
+                await anvil_set_base_fee(client, int(rng.lognormvariate(3, 0.8) * GWEI))
+                await keeper.step()
+            print(keeper.metrics.to_prometheus(), end="")
+
+    asyncio.run(main())
@@ -0,0 +1,7 @@
+from vltoken.artifacts import CONTRACTS, source_hash, warm
+
+
+def main():
+    print(f"sources {source_hash()}")
+    for name, path in zip(CONTRACTS, warm()):
+        print(f"{name}: {path}")
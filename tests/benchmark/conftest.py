@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+class GasReport:
+    """
+    Collects the gas of every benchmark and compares it with the baseline.
+    A benchmark missing from the baseline fails, unless the baseline is updated
+    with --gas-update.
+    """
+
+    def __init__(self, baseline, threshold, update=False):
+        self.baseline = baseline
+        self.threshold = threshold
+        self.update = update
+        self.results = {}
+
+    def record(self, name, gas):
+        self.results[name] = gas
+        if self.update:
+            return
+        expected = self.baseline.get(name)
+        if expected is None:
+            pytest.fail(f"{name} has no baseline")
+        if gas > expected * (1 + self.threshold):
+            pytest.fail(f"{name} regressed: {gas} gas, baseline {expected} gas")
+
+
+@pytest.fixture(scope="session")
+def gas_report(request):
+    path = Path(request.config.getoption("--gas-baseline"))
+    update = request.config.getoption("--gas-update")
+    recorded = json.loads(path.read_text()) if path.exists() else {}
+
+    report = GasReport(recorded, request.config.getoption("--gas-threshold"), update)
+    yield report
+
+    if update:
+        recorded.update(report.results)
+        path.write_text(json.dumps(recorded, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture
+def scenario(accounts, token, vl_token):
+    """
+    Builds a history of `holders` locks ending on distinct weeks, `history`
+    top-ups of the first holder one day apart and `idle_weeks` without any
+    checkpoint, and returns the holders.
+    """
+
+    def build(holders=1, history=1, idle_weeks=0):
+        users = accounts[1 : holders + 1]
+        now = chain.blocks.head.timestamp
+        for i, user in enumerate(users):
+            token.mint(user, AMOUNT * (history + 10), sender=user)
+            token.approve(vl_token.address, AMOUNT * (history + 10), sender=user)
+            vl_token.modify_lock(AMOUNT, now + 2 * MAXTIME + i * WEEK, sender=user)
+
+        for _ in range(history - 1):
+            chain.pending_timestamp += DAY
+            vl_token.modify_lock(AMOUNT, 0, sender=users[0])
+
+        chain.pending_timestamp += idle_weeks * WEEK
+        chain.mine()
+        return users
+
+    yield build
@@ -0,0 +1,33 @@
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+N_HOLDERS = 8
+
+
+def test_modify_lock_many_gas(accounts, token, vl_token, gas_report):
+    holders = accounts[1 : N_HOLDERS + 1]
+    distributor = accounts[0]
+    now = chain.blocks.head.timestamp
+    for holder in holders:
+        token.mint(holder, AMOUNT, sender=holder)
+        token.approve(vl_token.address, AMOUNT, sender=holder)
+        vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=holder)
+    token.mint(distributor, AMOUNT * 2 * N_HOLDERS, sender=distributor)
+    token.approve(vl_token.address, AMOUNT * 2 * N_HOLDERS, sender=distributor)
+    chain.pending_timestamp += DAY
+
+    single = sum(
+        vl_token.modify_lock(AMOUNT, 0, holder, sender=distributor).gas_used
+        for holder in holders
+    )
+    batch = vl_token.modify_lock_many(
+        holders, [AMOUNT] * N_HOLDERS, sender=distributor
+    ).gas_used
+
+    gas_report.record("modify_lock.per_deposit", single // N_HOLDERS)
+    gas_report.record("modify_lock_many.per_deposit", batch // N_HOLDERS)
+    assert batch < single
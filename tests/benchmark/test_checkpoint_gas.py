@@ -0,0 +1,113 @@
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+AMOUNT = 10**18
+IDLE_WEEKS = [0, 1, 4, 16, 52, 104]
+
+
+def idle_gas(accounts, token, vl_token, weeks, action):
+    alice = accounts[0]
+    token.mint(alice, AMOUNT * 20, sender=alice)
+    token.approve(vl_token.address, AMOUNT * 20, sender=alice)
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + 200 * WEEK, sender=alice)
+
+    chain.pending_timestamp += weeks * WEEK
+    chain.mine()
+    return action(alice).gas_used
+
+
+@pytest.mark.parametrize("weeks", IDLE_WEEKS)
+def test_modify_lock_gas_vs_idle_weeks(accounts, token, vl_token, gas_report, weeks):
+    gas = idle_gas(
+        accounts,
+        token,
+        vl_token,
+        weeks,
+        lambda alice: vl_token.modify_lock(AMOUNT, 0, sender=alice),
+    )
+    gas_report.record(f"modify_lock.idle[weeks={weeks}]", gas)
+
+
+@pytest.mark.parametrize("weeks", IDLE_WEEKS)
+def test_checkpoint_gas_vs_idle_weeks(accounts, token, vl_token, gas_report, weeks):
+    gas = idle_gas(
+        accounts,
+        token,
+        vl_token,
+        weeks,
+        lambda alice: vl_token.checkpoint(sender=alice),
+    )
+    gas_report.record(f"checkpoint.idle[weeks={weeks}]", gas)
+
+
+def gas_per_week(accounts, token, vl_token, action, first, last):
+    """
+    @return Marginal gas of one more idle week between `first` and `last` idle weeks
+    """
+    gas = []
+    for weeks in [first, last]:
+        snapshot = chain.snapshot()
+        gas.append(idle_gas(accounts, token, vl_token, weeks, action))
+        chain.restore(snapshot)
+    return (gas[1] - gas[0]) // (last - first)
+
+
+def test_checkpoint_gas_per_week(accounts, token, vl_token, gas_report):
+    """
+    Every idle week caught up by a checkpoint is recorded.
+    """
+    per_week = gas_per_week(
+        accounts,
+        token,
+        vl_token,
+        lambda alice: vl_token.checkpoint(sender=alice),
+        4,
+        52,
+    )
+    gas_report.record("checkpoint.per_idle_week", per_week)
+
+
+def test_user_gas_is_bounded(accounts, token, vl_token, gas_report):
+    """
+    Weeks over the catch-up limit are left behind for the next checkpoint,
+    the user action only applies their slope changes.
+    """
+    per_week = gas_per_week(
+        accounts,
+        token,
+        vl_token,
+        lambda alice: vl_token.modify_lock(AMOUNT, 0, sender=alice),
+        16,
+        104,
+    )
+    gas_report.record("modify_lock.per_week_left_behind", per_week)
+
+
+def test_block_index_lookup(accounts, token, vl_token, gas_report):
+    """
+    Heights are resolved by a binary search over the block checkpoints, one per
+    real checkpoint, instead of the global history, which also holds a point per
+    week.
+    """
+    alice = accounts[0]
+    token.mint(alice, AMOUNT, sender=alice)
+    token.approve(vl_token.address, AMOUNT, sender=alice)
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + 200 * WEEK, sender=alice)
+    heights = []
+    for _ in range(4):
+        chain.pending_timestamp += 26 * WEEK
+        heights.append(vl_token.checkpoint(sender=alice).block_number)
+
+    ts = chain.blocks[heights[1]].timestamp
+    # estimate_gas_cost is the gas limit on local networks, send the views instead
+    indexed = vl_token.timestamp_at.transact(heights[1], sender=alice).gas_used
+    searched = vl_token.find_epoch_by_timestamp.transact(
+        vl_token, ts, sender=alice
+    ).gas_used
+    gas_report.record("block_index.lookup", indexed)
+    gas_report.record("block_index.global_search", searched)
+    assert indexed < searched
@@ -0,0 +1,152 @@
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+SCENARIOS = [
+    dict(holders=1, history=1, idle_weeks=0),
+    dict(holders=8, history=1, idle_weeks=0),
+    dict(holders=1, history=50, idle_weeks=0),
+    dict(holders=1, history=1, idle_weeks=4),
+    dict(holders=1, history=1, idle_weeks=52),
+    dict(holders=8, history=10, idle_weeks=52),
+]
+
+
+def scenario_id(params):
+    return "holders={holders},history={history},idle={idle_weeks}".format(**params)
+
+
+def measure(gas_report, name, action):
+    """Records the gas of a transaction without keeping its state changes."""
+    snapshot = chain.snapshot()
+    gas_report.record(name, action().gas_used)
+    chain.restore(snapshot)
+
+
+@pytest.mark.parametrize("params", SCENARIOS, ids=scenario_id)
+def test_modify_lock_gas(accounts, token, vl_token, gas_report, scenario, params):
+    holder = scenario(**params)[0]
+    newcomer = accounts[9]
+    funder = accounts[0]
+    for sender in [newcomer, funder]:
+        token.mint(sender, AMOUNT, sender=sender)
+        token.approve(vl_token.address, AMOUNT, sender=sender)
+    now = chain.blocks.head.timestamp
+    end = vl_token.locked(holder).end
+    suffix = f"[{scenario_id(params)}]"
+
+    measure(
+        gas_report,
+        "modify_lock.create" + suffix,
+        lambda: vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=newcomer),
+    )
+    measure(
+        gas_report,
+        "modify_lock.extend" + suffix,
+        lambda: vl_token.modify_lock(0, end + WEEK, sender=holder),
+    )
+    measure(
+        gas_report,
+        "modify_lock.top_up" + suffix,
+        lambda: vl_token.modify_lock(AMOUNT, 0, sender=holder),
+    )
+    measure(
+        gas_report,
+        "modify_lock.top_up_for" + suffix,
+        lambda: vl_token.modify_lock(AMOUNT, 0, holder, sender=funder),
+    )
+
+    # once the fees of the week are flushed, deposits only accrue their fee
+    vl_token.flush_fees(sender=funder)
+    measure(
+        gas_report,
+        "modify_lock.top_up_pending_fee" + suffix,
+        lambda: vl_token.modify_lock(AMOUNT, 0, sender=holder),
+    )
+
+
+@pytest.mark.parametrize("params", SCENARIOS, ids=scenario_id)
+def test_withdraw_gas(accounts, token, vl_token, gas_report, scenario, params):
+    holder = scenario(**params)[0]
+    suffix = f"[{scenario_id(params)}]"
+
+    measure(
+        gas_report, "withdraw.early" + suffix, lambda: vl_token.withdraw(sender=holder)
+    )
+
+    expiring = accounts[9]
+    token.mint(expiring, AMOUNT, sender=expiring)
+    token.approve(vl_token.address, AMOUNT, sender=expiring)
+    end = chain.blocks.head.timestamp + 2 * WEEK
+    vl_token.modify_lock(AMOUNT, end, sender=expiring)
+    chain.pending_timestamp += 3 * WEEK
+    chain.mine()
+    measure(
+        gas_report,
+        "withdraw.expired" + suffix,
+        lambda: vl_token.withdraw(sender=expiring),
+    )
+
+
+@pytest.mark.parametrize("params", SCENARIOS, ids=scenario_id)
+def test_checkpoint_gas(accounts, vl_token, gas_report, scenario, params):
+    holder = scenario(**params)[0]
+
+    measure(
+        gas_report,
+        f"checkpoint[{scenario_id(params)}]",
+        lambda: vl_token.checkpoint(sender=accounts[0]),
+    )
+    measure(
+        gas_report,
+        f"checkpoint_user[{scenario_id(params)}]",
+        lambda: vl_token.checkpoint_user(holder, sender=accounts[0]),
+    )
+
+
+@pytest.mark.parametrize("params", SCENARIOS, ids=scenario_id)
+def test_view_gas(accounts, vl_token, gas_report, scenario, params):
+    start = chain.blocks.head.number
+    holder = scenario(**params)[0]
+    height = (start + chain.blocks.head.number) // 2
+    past = chain.blocks[height].timestamp
+    suffix = f"[{scenario_id(params)}]"
+
+    # estimate_gas_cost is the gas limit on local networks, send the views instead
+    views = {
+        "balanceOf": (vl_token.balanceOf, holder),
+        "balanceOf.past": (vl_token.balanceOf, holder, past),
+        "getPriorVotes": (vl_token.getPriorVotes, holder, height),
+        "totalSupply": (vl_token.totalSupply,),
+        "totalSupply.past": (vl_token.totalSupply, past),
+        "totalSupplyAt": (vl_token.totalSupplyAt, height),
+    }
+    for name, (view, *args) in views.items():
+        gas = view.transact(*args, sender=accounts[0]).gas_used
+        gas_report.record(name + suffix, gas)
+
+
+@pytest.mark.parametrize("delegators", [1, 8])
+def test_delegation_gas(vl_token, gas_report, scenario, delegators):
+    """
+    The votes of a delegate are one history, the lookup cost doesn't grow with
+    the number of its delegators.
+    """
+    users = scenario(holders=delegators + 1, history=1)
+    delegate = users[-1]
+    suffix = f"[delegators={delegators}]"
+
+    gas = [vl_token.delegate(delegate, sender=u).gas_used for u in users[:-1]]
+    chain.pending_timestamp += DAY
+    top_up = vl_token.modify_lock(AMOUNT, 0, sender=users[0])
+    chain.pending_timestamp += DAY
+    height = vl_token.checkpoint(sender=delegate).block_number
+
+    gas_report.record("delegate.first" + suffix, gas[0])
+    gas_report.record("delegate.next" + suffix, gas[-1])
+    gas_report.record("modify_lock.top_up_delegated" + suffix, top_up.gas_used)
+    lookup = vl_token.getPriorVotes.transact(delegate, height, sender=delegate)
+    gas_report.record("getPriorVotes.delegate" + suffix, lookup.gas_used)
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+from ape import chain
+
+from vltoken.model import LockedBalance
+from vltoken.multicall import VoteLockClient
+
+
+def test_multicall_reads(vl_token, multicall, scenario, record_property):
+    holders = [u.address for u in scenario(holders=8, history=5)]
+
+    start = time.perf_counter()
+    sequential = []
+    for user in holders:
+        sequential.append(
+            (vl_token.locked(user), vl_token.epoch(user), vl_token.balanceOf(user))
+        )
+    sequential_time = time.perf_counter() - start
+
+    async def read():
+        async with VoteLockClient(
+            chain.provider.uri, vl_token.address, multicall.address
+        ) as client:
+            locks, epochs, balances = await asyncio.gather(
+                client.locks(holders),
+                client.epochs(holders),
+                client.balances(holders),
+            )
+            return list(zip(locks, epochs, balances)), client.round_trips
+
+    start = time.perf_counter()
+    batched, round_trips = asyncio.run(read())
+    batched_time = time.perf_counter() - start
+
+    # wall clock time depends on the machine, it is reported but not asserted
+    record_property("sequential_time", sequential_time)
+    record_property("batched_time", batched_time)
+    assert batched == [(LockedBalance(*lock), e, b) for lock, e, b in sequential]
+    # ape makes one round trip per view, the client one per view name
+    assert round_trips == 3
+    assert round_trips < len(sequential) * 3
@@ -0,0 +1,56 @@
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+AMOUNT = 10**18
+CLAIM_WEEKS = [1, 4, 13]
+
+
+def distribute(accounts, token, reward_pool, weeks):
+    funder = accounts[0]
+    token.mint(funder, AMOUNT * weeks, sender=funder)
+    token.approve(reward_pool.address, AMOUNT * weeks, sender=funder)
+    for _ in range(weeks):
+        chain.pending_timestamp += WEEK
+        reward_pool.burn(AMOUNT, sender=funder)
+    chain.pending_timestamp += WEEK
+    reward_pool.checkpoint_token(sender=funder)
+    reward_pool.checkpoint_total_supply(sender=funder)
+
+
+@pytest.mark.parametrize("weeks", CLAIM_WEEKS)
+def test_claim_gas_vs_weeks(accounts, token, reward_pool, gas_report, scenario, weeks):
+    holders = scenario(holders=8, history=5)
+    distribute(accounts, token, reward_pool, weeks)
+
+    snapshot = chain.snapshot()
+    claim = reward_pool.claim(sender=holders[0]).gas_used
+    chain.restore(snapshot)
+    batch = reward_pool.claim_many(holders, sender=accounts[0]).gas_used
+
+    gas_report.record(f"reward_pool.claim[weeks={weeks}]", claim)
+    gas_report.record(
+        f"reward_pool.claim_many.per_user[weeks={weeks}]", batch // len(holders)
+    )
+    assert batch < claim * len(holders)
+
+
+def test_quarterly_claim_gas(accounts, token, reward_pool, gas_report, scenario):
+    """
+    Claiming a quarter at once costs less than claiming every week.
+    """
+    holder = scenario(holders=2, history=5)[0]
+    weekly = 0
+    snapshot = chain.snapshot()
+    for _ in range(13):
+        distribute(accounts, token, reward_pool, 1)
+        weekly += reward_pool.claim(sender=holder).gas_used
+    chain.restore(snapshot)
+
+    distribute(accounts, token, reward_pool, 13)
+    quarterly = reward_pool.claim(sender=holder).gas_used
+
+    gas_report.record("reward_pool.claim.weekly_for_13_weeks", weekly)
+    gas_report.record("reward_pool.claim.quarterly", quarterly)
+    assert quarterly < weekly // 2
@@ -0,0 +1,84 @@
+import pytest
+from ape import chain
+
+from vltoken.artifacts import container
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture()
+def alice(accounts, token, vl_token):
+    alice = accounts[0]
+    token.mint(alice, AMOUNT * 20, sender=alice)
+    token.approve(vl_token.address, AMOUNT * 20, sender=alice)
+    yield alice
+
+
+@pytest.fixture()
+def layout(accounts):
+    yield container("StorageLayout").deploy(sender=accounts[0])
+
+
+def test_packed_layout_is_cheaper(alice, layout, gas_report):
+    """
+    The same points and locks written one field per slot and packed.
+    """
+    now = chain.blocks.head.timestamp
+    height = chain.blocks.head.number
+    slope = AMOUNT // MAXTIME
+    # a first lock, then a top-up: a fresh point each time, the lock overwritten
+    writes = [
+        ("create", 1, (slope * MAXTIME, slope, now, height), (AMOUNT, now + MAXTIME)),
+        (
+            "top_up",
+            2,
+            (2 * slope * (MAXTIME - DAY), 2 * slope, now + DAY, height + 1),
+            (2 * AMOUNT, now + MAXTIME),
+        ),
+    ]
+    for name, epoch, point, lock in writes:
+        unpacked = layout.store(alice, epoch, point, lock, sender=alice).gas_used
+        packed = layout.store_packed(alice, epoch, point, lock, sender=alice).gas_used
+        gas_report.record(f"layout.{name}.unpacked", unpacked)
+        gas_report.record(f"layout.{name}.packed", packed)
+        assert packed < unpacked
+
+
+def test_lock_lifecycle_gas(alice, vl_token, gas_report):
+    now = chain.blocks.head.timestamp
+    create = vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=alice)
+    top_up = vl_token.modify_lock(AMOUNT, 0, sender=alice)
+    extend = vl_token.modify_lock(0, now + MAXTIME + WEEK, sender=alice)
+    withdraw = vl_token.withdraw(sender=alice)
+    sweep = vl_token.sweep_penalties(sender=alice)
+
+    gas_report.record("lifecycle.create", create.gas_used)
+    gas_report.record("lifecycle.top_up", top_up.gas_used)
+    gas_report.record("lifecycle.extend", extend.gas_used)
+    gas_report.record("lifecycle.withdraw_early", withdraw.gas_used)
+    gas_report.record("lifecycle.sweep_penalties", sweep.gas_used)
+
+
+def test_permit_onboarding_gas(accounts, token, vl_token, gas_report, sign_permit):
+    bob, carol, dave = accounts[1], accounts[2], accounts[3]
+    for user in [bob, carol, dave]:
+        token.mint(user, AMOUNT, sender=user)
+    now = chain.blocks.head.timestamp
+    # the first lock of the week flushes the fees, keep it out of the comparison
+    token.approve(vl_token.address, AMOUNT, sender=dave)
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=dave)
+
+    approve = token.approve(vl_token.address, AMOUNT, sender=bob)
+    create = vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=bob)
+    v, r, s = sign_permit(carol, token, vl_token, AMOUNT, now + DAY)
+    permit = vl_token.modify_lock_with_permit(
+        AMOUNT, now + MAXTIME, now + DAY, v, r, s, sender=carol
+    )
+
+    two_steps = approve.gas_used + create.gas_used
+    gas_report.record("onboarding.approve_and_create", two_steps)
+    gas_report.record("onboarding.create_with_permit", permit.gas_used)
+    assert permit.gas_used < two_steps
@@ -1,20 +1,101 @@
 import pytest
 from ape import convert, chain
 from eth._utils.address import generate_contract_address
+from eth_account import Account
+from eth_account.messages import encode_structured_data
 from eth_utils import to_checksum_address, to_canonical_address
 
+from vltoken.artifacts import container
+
 DAY = 86400
 WEEK = 7 * DAY
 
 
-@pytest.fixture
-def token(accounts, project):
+def pytest_runtest_setup(item):
+    # ape inserts its function snapshot at an index taken from the fixture registry,
+    # not from the fixtures of the test, so it can land before a session fixture.
+    # A deployment made after the snapshot would be rolled back after the first test
+    # that requests it, move the snapshot before the first function fixture instead.
+    # This runs after the hook of the ape plugin, registered later, and before the
+    # fixtures are set up by the pytest runner, registered first.
+    names = item.fixturenames
+    if "_function_isolation" not in names:
+        return
+    names.remove("_function_isolation")
+    defs = item._fixtureinfo.name2fixturedefs
+    scopes = [defs[name][-1].scope if name in defs else None for name in names]
+    index = scopes.index("function") if "function" in scopes else len(names)
+    names.insert(index, "_function_isolation")
+
+
+@pytest.fixture(scope="session")
+def jump(chain):
+    def jump(blocks, seconds):
+        """
+        Mines `blocks` blocks spread evenly over `seconds` in a single request.
+        """
+        interval = seconds // blocks
+        chain.provider._make_request("anvil_mine", [hex(blocks), hex(interval)])
+
+    yield jump
+
+
+@pytest.fixture(scope="session")
+def sign_permit(chain):
+    def sign_permit(owner, token, spender, amount, deadline, nonce=None):
+        """
+        Signs an EIP-2612 permit of `owner`, returns its (v, r, s).
+        """
+        permit = {
+            "types": {
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+                "Permit": [
+                    {"name": "owner", "type": "address"},
+                    {"name": "spender", "type": "address"},
+                    {"name": "value", "type": "uint256"},
+                    {"name": "nonce", "type": "uint256"},
+                    {"name": "deadline", "type": "uint256"},
+                ],
+            },
+            "primaryType": "Permit",
+            "domain": {
+                "name": token.name(),
+                "version": "1",
+                "chainId": chain.chain_id,
+                "verifyingContract": token.address,
+            },
+            "message": {
+                "owner": owner.address,
+                "spender": spender.address,
+                "value": amount,
+                "nonce": token.nonces(owner) if nonce is None else nonce,
+                "deadline": deadline,
+            },
+        }
+        signed = Account.sign_message(encode_structured_data(permit), owner.private_key)
+        return signed.v, signed.r.to_bytes(32, "big"), signed.s.to_bytes(32, "big")
+
+    yield sign_permit
+
+
+@pytest.fixture(scope="session")
+def token(accounts):
     dev = accounts[0]
-    yield project.Token.deploy("TOKEN", sender=dev)
+    yield container("Token").deploy("TOKEN", sender=dev)
+
+
+@pytest.fixture(scope="session")
+def multicall(accounts):
+    yield container("Multicall3").deploy(sender=accounts[0])
 
 
-@pytest.fixture
-def vl_token_and_treasury(accounts, project, token):
+@pytest.fixture(scope="session")
+def vl_token_and_treasury(accounts, token):
     # calculate the treasury address to pass to vl_token
     collector = accounts[2]
     treasury_address = to_checksum_address(
@@ -22,22 +103,53 @@ def vl_token_and_treasury(accounts, project, token):
             to_canonical_address(str(accounts[0])), accounts[0].nonce + 1
         )
     )
-    vl_token = project.VoteLockToken.deploy(token, treasury_address, collector, sender=accounts[0])
+    vl_token = container("VoteLockToken").deploy(
+        token, treasury_address, collector, sender=accounts[0]
+    )
     start_time = (
         chain.pending_timestamp + 7 * 3600 * 24
     )  # MUST offset by a week otherwise token distributed are lost since no lock has been made yet.
     yield vl_token, treasury_address, collector
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def vl_token(vl_token_and_treasury):
     yield vl_token_and_treasury[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def reward_pool(accounts, vl_token):
+    # rewards are distributed from the week of the deployment
+    yield container("RewardPool").deploy(
+        vl_token, chain.pending_timestamp, sender=accounts[0]
+    )
+
+
+@pytest.fixture(scope="session")
 def treasury(vl_token_and_treasury):
     yield vl_token_and_treasury[1]
 
-@pytest.fixture
+
+@pytest.fixture(scope="session")
 def collector(vl_token_and_treasury):
-    yield vl_token_and_treasury[2]
\ No newline at end of file
+    yield vl_token_and_treasury[2]
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("gas", "gas benchmarks")
+    group.addoption(
+        "--gas-baseline",
+        default="tests/benchmark/gas_baseline.json",
+        help="JSON file with the recorded gas of every benchmark",
+    )
+    group.addoption(
+        "--gas-update",
+        action="store_true",
+        help="write the measured gas to the baseline instead of comparing",
+    )
+    group.addoption(
+        "--gas-threshold",
+        type=float,
+        default=0.01,
+        help="fail when gas exceeds the baseline by more than this fraction",
+    )
@@ -1,55 +1,57 @@
 import pytest
 
+from vltoken.artifacts import container
+
 DAY = 86400
 WEEK = 7 * DAY
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def gov(accounts):
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def whale(accounts):
     a = accounts[1]
     yield a
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def shark(accounts):
     a = accounts[2]
     yield a
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def fish(accounts):
     a = accounts[3]
     yield a
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def panda(accounts):
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def doggie(accounts):
     yield accounts[5]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def bunny(accounts):
     yield accounts[6]
 
 
-@pytest.fixture
-def token(project, gov):
-    yield gov.deploy(project.Token, "TOKEN")
+@pytest.fixture(scope="session")
+def token(gov):
+    yield gov.deploy(container("Token"), "TOKEN")
 
 
-@pytest.fixture
-def create_token(project, gov):
+@pytest.fixture(scope="session")
+def create_token(gov):
     def create_token(name):
-        return gov.deploy(project.Token, name)
+        return gov.deploy(container("Token"), name)
 
     yield create_token
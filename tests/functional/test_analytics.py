@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+from ape import chain
+
+from vltoken.analytics import SupplyProjection, penalty_ratio
+from vltoken.indexer import Indexer
+from vltoken.model import SCALE, LockedBalance, Point
+from vltoken.multicall import VoteLockClient
+from vltoken.storage import StorageReader
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token):
+    users = accounts[3:7]
+    now = chain.blocks.head.timestamp
+    durations = [MAXTIME // 8, MAXTIME // 2, MAXTIME + 6 * WEEK, 3 * MAXTIME]
+    for i, (user, duration) in enumerate(zip(users, durations)):
+        token.mint(user, AMOUNT * 100, sender=user)
+        token.approve(vl_token.address, AMOUNT * 100, sender=user)
+        vl_token.modify_lock(AMOUNT * (i + 1), now + duration, sender=user)
+    yield users
+
+
+def projection_from_chain(vl_token, holders):
+    async def read_slope_changes():
+        async with VoteLockClient(chain.provider.uri, vl_token.address) as client:
+            reader = StorageReader(client)
+            return dict([c async for c in reader.slope_changes(vl_token.address)])
+
+    point = Point(*vl_token.point_history(vl_token, vl_token.epoch(vl_token)))
+    locks = {user: LockedBalance(*vl_token.locked(user)) for user in holders}
+    return SupplyProjection(point, asyncio.run(read_slope_changes()), locks)
+
+
+def check_curves(vl_token, projection, holders):
+    now = chain.blocks.head.timestamp
+    curves = projection.curves(now, 60)
+    weeks = curves.weeks.tolist()
+    locks = [vl_token.locked(user) for user in holders]
+
+    assert weeks[0] == now // WEEK * WEEK + WEEK
+    assert curves.supply.tolist() == [vl_token.totalSupply(w) for w in weeks]
+    assert curves.unlocks.tolist() == [
+        sum(lock.amount for lock in locks if lock.end == w) for w in weeks
+    ]
+    for week, penalty in zip(weeks, curves.penalties.tolist()):
+        exact = sum(
+            lock.amount * penalty_ratio(lock.end - week) // SCALE
+            for lock in locks
+            if lock.end > week
+        )
+        # rounded once per week of unlock instead of once per lock
+        assert exact <= penalty <= exact + len(locks)
+    return curves
+
+
+def test_curves_match_contract(vl_token, users, collector, treasury):
+    holders = [u.address for u in users] + [collector.address, treasury]
+    projection = projection_from_chain(vl_token, holders)
+
+    curves = check_curves(vl_token, projection, holders)
+    assert curves.supply[0] > curves.supply[-1] > 0
+    assert sum(curves.unlocks.tolist()) > 0
+    assert curves.penalties[0] > curves.penalties[-1] > 0
+
+
+def test_curves_follow_new_events(vl_token, users, collector, treasury, tmp_path):
+    holders = [u.address for u in users] + [collector.address, treasury]
+    projection = projection_from_chain(vl_token, holders)
+    start_block = chain.blocks.head.number + 1
+    indexer = Indexer(vl_token, str(tmp_path / "index.sqlite"), start_block)
+
+    # lock changes of the same week, the fees stay pending
+    chain.pending_timestamp += 2 * DAY
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=users[0])
+    vl_token.modify_lock(2 * AMOUNT, 0, users[3], sender=users[1])
+    vl_token.withdraw(sender=users[2])
+    chain.mine()
+
+    indexer.sync(chain.blocks.head.number)
+    projection.apply_events(indexer.lock_events(chain.blocks.head.number))
+    indexer.close()
+
+    assert projection.locks.keys() == {
+        u for u in holders if vl_token.locked(u).amount > 0
+    }
+    check_curves(vl_token, projection, holders)
@@ -0,0 +1,56 @@
+import shutil
+
+from vltoken import artifacts
+from vltoken.artifacts import ROOT, container, load_contract_type, source_hash
+
+
+def copy_sources(tmp_path):
+    shutil.copytree(ROOT / "contracts", tmp_path / "contracts")
+    shutil.copy(ROOT / "ape-config.yaml", tmp_path / "ape-config.yaml")
+    return tmp_path
+
+
+def test_source_hash_follows_sources(tmp_path):
+    root = copy_sources(tmp_path)
+    key = source_hash(root)
+    assert key == source_hash(ROOT)
+
+    path = root / "contracts" / "VoteLockToken.vy"
+    path.write_text(path.read_text() + "\n")
+    assert source_hash(root) != key
+
+
+def test_cached_container(vl_token, tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "CACHE_DIR", tmp_path)
+    key = source_hash()
+    assert load_contract_type("VoteLockToken", key) is None
+
+    compiled = container("VoteLockToken", key)
+    cached = load_contract_type("VoteLockToken", key)
+    # the AST does not survive a JSON round trip of ethpm_types, the ABI and code do
+    assert cached.abi == compiled.contract_type.abi
+    assert cached.runtime_bytecode == compiled.contract_type.runtime_bytecode
+    assert cached.deployment_bytecode == vl_token.contract_type.deployment_bytecode
+
+    # artifacts are only found under the key of the sources they were built from
+    assert load_contract_type("VoteLockToken", "0" * 64) is None
+    loaded = container("VoteLockToken", key).at(vl_token.address)
+    assert loaded.token() == vl_token.token()
+
+
+def test_source_hash_follows_compilers_and_dependencies(tmp_path, monkeypatch):
+    root = copy_sources(tmp_path)
+    (root / "ape-config.yaml").write_text(
+        "dependencies:\n  - name: openzeppelin\n    local: ./lib/openzeppelin\n"
+    )
+    library = root / "lib" / "openzeppelin"
+    library.mkdir(parents=True)
+    (library / "ERC20.sol").write_text("contract ERC20 {}\n")
+    key = source_hash(root)
+
+    (library / "ERC20.sol").write_text("contract ERC20 { }\n")
+    assert source_hash(root) != key
+    key = source_hash(root)
+
+    monkeypatch.setattr(artifacts, "compiler_versions", lambda: ["vyper==0.3.9"])
+    assert source_hash(root) != key
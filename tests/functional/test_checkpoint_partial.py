@@ -0,0 +1,139 @@
+import ape
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+MAX_CATCHUP_WEEKS = 4
+MASK_128 = 2**128 - 1
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def alice(accounts, token, vl_token):
+    alice = accounts[0]
+    token.mint(alice, AMOUNT * 20, sender=alice)
+    token.approve(vl_token.address, AMOUNT * 20, sender=alice)
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=alice)
+    yield alice
+
+
+def last_global_point(vl_token):
+    return vl_token.point_history(vl_token, vl_token.epoch(vl_token))
+
+
+def test_checkpoint_partial_is_resumable(alice, vl_token):
+    chain.pending_timestamp += 10 * WEEK
+    chain.mine()
+    start = last_global_point(vl_token).ts
+    epoch = vl_token.epoch(vl_token)
+
+    vl_token.checkpoint_partial(3, sender=alice)
+    assert vl_token.epoch(vl_token) == epoch + 3
+    assert last_global_point(vl_token).ts == start // WEEK * WEEK + 3 * WEEK
+
+    vl_token.checkpoint_partial(3, sender=alice)
+    assert vl_token.epoch(vl_token) == epoch + 6
+    assert last_global_point(vl_token).ts == start // WEEK * WEEK + 6 * WEEK
+
+    # the last call stops at now
+    vl_token.checkpoint_partial(100, sender=alice)
+    assert last_global_point(vl_token).ts == chain.blocks.head.timestamp
+    assert vl_token.totalSupply() == vl_token.balanceOf(alice) + vl_token.balanceOf(
+        vl_token.collector()
+    )
+
+
+def test_checkpoint_partial_matches_full_checkpoint(alice, vl_token):
+    chain.pending_timestamp += 10 * WEEK
+    chain.mine()
+    weeks = [chain.blocks.head.timestamp // WEEK * WEEK - i * WEEK for i in range(8)]
+    expected = [vl_token.totalSupply(t) for t in weeks]
+
+    for _ in range(4):
+        vl_token.checkpoint_partial(3, sender=alice)
+
+    assert [vl_token.totalSupply(t) for t in weeks] == expected
+
+
+def test_checkpoint_partial_requires_progress(alice, vl_token):
+    with ape.reverts():
+        vl_token.checkpoint_partial(0, sender=alice)
+
+
+def test_user_action_records_bounded_weeks(alice, vl_token):
+    chain.pending_timestamp += 20 * WEEK
+    chain.mine()
+    total_supply = vl_token.totalSupply()
+    epoch = vl_token.epoch(vl_token)
+
+    vl_token.modify_lock(AMOUNT, 0, sender=alice)
+
+    # weekly points over the limit are skipped, plus the points at now for alice and
+    # the fee recipient
+    assert vl_token.epoch(vl_token) == epoch + MAX_CATCHUP_WEEKS + 2
+    assert vl_token.totalSupply() > total_supply
+    assert vl_token.totalSupply() == vl_token.balanceOf(alice) + vl_token.balanceOf(
+        vl_token.collector()
+    )
+
+
+def test_weeks_left_behind_are_recorded_later(alice, vl_token):
+    """
+    Weeks over the catch-up of a user action are recorded by the next checkpoints,
+    reads of them stay exact in between.
+    """
+    chain.pending_timestamp += 20 * WEEK
+    chain.mine()
+    first_week = last_global_point(vl_token).ts // WEEK * WEEK + WEEK
+    weeks = [first_week + i * WEEK for i in range(20)]
+    expected = [vl_token.totalSupply(t) for t in weeks]
+
+    vl_token.modify_lock(AMOUNT, 0, sender=alice)
+    assert vl_token.recorded_week() == weeks[MAX_CATCHUP_WEEKS - 1]
+    assert [vl_token.totalSupply(t) for t in weeks] == expected
+
+    vl_token.checkpoint_partial(10, sender=alice)
+    assert vl_token.recorded_week() == weeks[MAX_CATCHUP_WEEKS + 9]
+    vl_token.checkpoint(sender=alice)
+    assert vl_token.recorded_week() == weeks[-1]
+
+    behind = [vl_token.week_points(t) & MASK_128 for t in weeks[MAX_CATCHUP_WEEKS:]]
+    assert behind == expected[MAX_CATCHUP_WEEKS:]
+    assert [vl_token.totalSupply(t) for t in weeks] == expected
+
+
+def test_checkpoint_partial_clamps_max_weeks(alice, vl_token):
+    chain.pending_timestamp += 10 * WEEK
+    chain.mine()
+
+    vl_token.checkpoint_partial(2**256 - 1, sender=alice)
+    assert last_global_point(vl_token).ts == chain.blocks.head.timestamp
+
+
+def test_week_supply_cache(alice, vl_token):
+    chain.pending_timestamp += 6 * WEEK
+    chain.mine()
+    weeks = [chain.blocks.head.timestamp // WEEK * WEEK - i * WEEK for i in range(5)]
+    expected = [vl_token.totalSupply(t) for t in weeks]
+    assert all(vl_token.week_epoch(vl_token, t) == 0 for t in weeks)
+
+    vl_token.checkpoint(sender=alice)
+
+    for t, supply in zip(weeks, expected):
+        epoch = vl_token.week_epoch(vl_token, t)
+        assert epoch != 0
+        point = vl_token.point_history(vl_token, epoch)
+        assert point.ts == t
+        assert point.bias == supply
+        assert vl_token.totalSupply(t) == supply
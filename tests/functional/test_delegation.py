@@ -0,0 +1,160 @@
+import ape
+import pytest
+from ape import chain
+from ape.utils import ZERO_ADDRESS
+
+from vltoken.storage import vote_key
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def holders(accounts, token, vl_token):
+    holders = accounts[3:8]
+    now = chain.blocks.head.timestamp
+    # the last lock is longer than the max duration, its slope starts later
+    durations = [MAXTIME // 4, MAXTIME // 2, MAXTIME, MAXTIME, MAXTIME + 10 * WEEK]
+    for i, (holder, duration) in enumerate(zip(holders, durations)):
+        token.mint(holder, AMOUNT * 100, sender=holder)
+        token.approve(vl_token.address, AMOUNT * 100, sender=holder)
+        vl_token.modify_lock(AMOUNT * (i + 1), now + duration, sender=holder)
+    yield holders
+
+
+def checkpoint(vl_token, sender):
+    """
+    @return Height of a global checkpoint, its block time is exact
+    """
+    return vl_token.checkpoint(sender=sender).block_number
+
+
+def expected_votes(vl_token, delegators, height):
+    ts = chain.blocks[height].timestamp
+    return sum(vl_token.balanceOf(user, ts) for user in delegators)
+
+
+def test_delegate_moves_votes(vl_token, holders):
+    alice, bob = holders[:2]
+    before = checkpoint(vl_token, alice)
+
+    tx = vl_token.delegate(bob, sender=alice)
+    chain.pending_timestamp += DAY
+    after = checkpoint(vl_token, alice)
+
+    assert vl_token.delegated(alice) == bob
+    event = tx.events.filter(vl_token.DelegateChanged)[0]
+    assert event.delegator == alice
+    assert event.from_delegate == alice
+    assert event.to_delegate == bob
+    assert vl_token.getPriorVotes(bob, after) == expected_votes(
+        vl_token, [alice, bob], after
+    )
+    assert vl_token.getPriorVotes(alice, after) == 0
+    # the past is untouched
+    assert vl_token.getPriorVotes(alice, before) == expected_votes(
+        vl_token, [alice], before
+    )
+    assert vl_token.getPriorVotes(bob, before) == expected_votes(
+        vl_token, [bob], before
+    )
+    # the own balance is the lock, not the votes
+    assert vl_token.balanceOf(alice) > 0
+
+
+def test_lock_changes_follow_delegation(vl_token, holders):
+    alice, bob, carol = holders[:3]
+    vl_token.delegate(carol, sender=alice)
+    vl_token.delegate(carol, sender=bob)
+
+    chain.pending_timestamp += 2 * WEEK
+    vl_token.modify_lock(AMOUNT * 5, 0, sender=alice)
+    topped_up = checkpoint(vl_token, alice)
+    chain.pending_timestamp += 3 * DAY
+    vl_token.withdraw(sender=bob)
+    withdrawn = checkpoint(vl_token, alice)
+    # past the end of the lock of alice
+    chain.pending_timestamp += MAXTIME // 4
+    expired = checkpoint(vl_token, alice)
+
+    delegators = [alice, bob, carol]
+    for height in [topped_up, withdrawn, expired]:
+        assert vl_token.getPriorVotes(carol, height) == expected_votes(
+            vl_token, delegators, height
+        )
+    assert vl_token.getPriorVotes(carol, expired) == expected_votes(
+        vl_token, [carol], expired
+    )
+
+
+def test_redelegate_and_undelegate(vl_token, holders):
+    alice, bob, carol = holders[:3]
+    vl_token.delegate(bob, sender=alice)
+    chain.pending_timestamp += WEEK
+    vl_token.delegate(carol, sender=alice)
+    to_carol = checkpoint(vl_token, alice)
+    chain.pending_timestamp += WEEK
+    tx = vl_token.delegate(ZERO_ADDRESS, sender=alice)
+    back = checkpoint(vl_token, alice)
+
+    assert vl_token.getPriorVotes(bob, to_carol) == expected_votes(
+        vl_token, [bob], to_carol
+    )
+    assert vl_token.getPriorVotes(carol, to_carol) == expected_votes(
+        vl_token, [alice, carol], to_carol
+    )
+    assert vl_token.delegated(alice) == ZERO_ADDRESS
+    assert tx.events.filter(vl_token.DelegateChanged)[0].to_delegate == alice
+    for user in [alice, carol]:
+        assert vl_token.getPriorVotes(user, back) == expected_votes(
+            vl_token, [user], back
+        )
+
+
+def test_delegate_to_self_is_noop(vl_token, holders):
+    alice = holders[0]
+    epoch = vl_token.epoch(vl_token.vote_key(alice))
+
+    tx = vl_token.delegate(alice, sender=alice)
+
+    assert len(tx.events.filter(vl_token.DelegateChanged)) == 0
+    assert vl_token.epoch(vl_token.vote_key(alice)) == epoch == 0
+    with ape.reverts():
+        vl_token.delegate(vl_token, sender=alice)
+
+
+def test_votes_history_lookup(vl_token, holders, jump):
+    """
+    The votes of a delegate are a single history, a lookup is a binary search
+    over its points whatever the number of delegators.
+    """
+    delegate = holders[-1]
+    heights = []
+    for holder in holders[:-1]:
+        vl_token.delegate(delegate, sender=holder)
+        jump(12, 2 * DAY)
+        vl_token.modify_lock(AMOUNT, 0, sender=holder)
+        heights.append(checkpoint(vl_token, holder))
+
+    for i, height in enumerate(heights):
+        delegators = holders[: i + 1] + [delegate]
+        assert vl_token.getPriorVotes(delegate, height) == expected_votes(
+            vl_token, delegators, height
+        )
+    votes = vl_token.getPriorVotesMany(holders, heights[-1])
+    assert votes[:-1] == [0] * (len(holders) - 1)
+
+
+def test_vote_key(vl_token, holders):
+    for holder in holders:
+        assert vl_token.vote_key(holder).lower() == vote_key(holder.address)
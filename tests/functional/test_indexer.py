@@ -0,0 +1,103 @@
+import sqlite3
+
+import pytest
+from ape import chain
+
+from vltoken.indexer import Indexer
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token):
+    users = accounts[3:6]
+    for user in users:
+        token.mint(user, AMOUNT * 10, sender=user)
+        token.approve(vl_token.address, AMOUNT * 10, sender=user)
+    yield users
+
+
+@pytest.fixture()
+def indexer(vl_token, tmp_path):
+    start_block = chain.blocks.head.number
+    indexer = Indexer(vl_token, str(tmp_path / "index.sqlite"), start_block)
+    yield indexer
+    indexer.close()
+
+
+def test_indexer_rebuilds_locks(vl_token, users, indexer, tmp_path):
+    alice, bob, carol = users
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME // 2, sender=alice)
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=bob)
+    vl_token.modify_lock(AMOUNT, now + MAXTIME // 2, sender=carol)
+
+    assert indexer.sync(chain.blocks.head.number, chunk_size=2) == 3 * 2
+    first_sync = indexer.last_block
+    assert first_sync == chain.blocks.head.number
+
+    chain.pending_timestamp += WEEK
+    vl_token.modify_lock(AMOUNT, 0, sender=alice)
+    vl_token.withdraw(sender=carol)
+    vl_token.sweep_penalties(sender=carol)
+
+    # resumes after the last indexed block
+    assert indexer.sync(chain.blocks.head.number) == 2 + 4
+    assert indexer.last_block > first_sync
+    assert indexer.holders() == [alice.address, bob.address, carol.address]
+
+    active = indexer.active_locks(chain.blocks.head.timestamp)
+    assert active == [
+        (alice.address, vl_token.locked(alice).amount, vl_token.locked(alice).end),
+        (bob.address, vl_token.locked(bob).amount, vl_token.locked(bob).end),
+    ]
+    assert indexer.locks_expiring(vl_token.locked(bob).end) == [active[1]]
+    assert indexer.locks_expiring(vl_token.locked(bob).end + WEEK) == []
+    # the fee of the first deposit of the week went to a fee lock, not indexed
+    fee_accounts = indexer.fee_accounts()
+    assert fee_accounts == [vl_token.collector(), vl_token.treasury()]
+    assert sum(vl_token.locked(holder).amount for holder in fee_accounts) > 0
+    assert not set(fee_accounts) & {user for user, _, _ in active}
+
+    week = chain.blocks.head.timestamp // WEEK * WEEK
+    assert indexer.penalties_per_week() == {week: vl_token.penalties(week)}
+    assert indexer.sweeps_per_week() == {week: vl_token.penalties(week)}
+
+    # a new store on the same file continues from the saved block
+    reopened = Indexer(vl_token, str(tmp_path / "index.sqlite"))
+    assert reopened.last_block == indexer.last_block
+    assert reopened.sync(chain.blocks.head.number) == 0
+    reopened.close()
+
+
+def test_store_of_another_schema_is_rebuilt(vl_token, users, tmp_path):
+    alice = users[0]
+    start_block = chain.blocks.head.number
+    vl_token.modify_lock(AMOUNT, chain.blocks.head.timestamp + MAXTIME, sender=alice)
+
+    # a store of before the schema version was kept
+    path = str(tmp_path / "index.sqlite")
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        "CREATE TABLE withdraw (block INTEGER, user TEXT, amount TEXT, ts INTEGER);"
+        "INSERT INTO meta (key, value) VALUES ('last_block', 1000000);"
+    )
+    db.close()
+
+    indexer = Indexer(vl_token, path, start_block)
+    assert indexer.last_block is None
+    assert indexer.sync(chain.blocks.head.number) == 2
+    assert indexer.holders() == [alice.address]
+    indexer.close()
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+from ape import chain
+
+from vltoken.keeper import (
+    Keeper,
+    Metrics,
+    Policy,
+    anvil_jump,
+    anvil_set_base_fee,
+    rpc_submitter,
+)
+from vltoken.model import MAX_CATCHUP_WEEKS
+from vltoken.multicall import VoteLockClient
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+GWEI = 10**9
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def holder(accounts, token, vl_token):
+    holder = accounts[3]
+    token.mint(holder, AMOUNT, sender=holder)
+    token.approve(vl_token.address, AMOUNT, sender=holder)
+    vl_token.modify_lock(AMOUNT, chain.blocks.head.timestamp + MAXTIME, sender=holder)
+    yield holder
+
+
+@pytest.fixture()
+def run_keeper(accounts, vl_token):
+    def run_keeper(policy, script):
+        """
+        Runs `script(client, keeper)` against the test chain, the keeper sends
+        its checkpoints from an account unlocked on anvil.
+        """
+
+        async def run():
+            async with VoteLockClient(chain.provider.uri, vl_token.address) as client:
+                submit = rpc_submitter(client, accounts[0].address, poll_interval=0.1)
+                keeper = Keeper(client, submit, policy)
+                await script(client, keeper)
+                return keeper.metrics
+
+        return asyncio.run(run())
+
+    yield run_keeper
+
+
+def last_checkpoint(vl_token):
+    return vl_token.point_history(vl_token, vl_token.epoch(vl_token)).ts
+
+
+def test_policy():
+    policy = Policy(max_base_fee=10 * GWEI, urgent_weeks=4, max_weeks_per_tx=8)
+
+    assert policy.weeks_to_checkpoint(0, 0) == 0
+    assert policy.weeks_to_checkpoint(1, 10 * GWEI) == 1
+    assert policy.weeks_to_checkpoint(3, 11 * GWEI) == 0
+    assert policy.weeks_to_checkpoint(4, 100 * GWEI) == 4
+    assert policy.weeks_to_checkpoint(20, GWEI) == 8
+
+
+def test_catch_up_at_low_base_fee(vl_token, holder, run_keeper):
+    async def script(client, keeper):
+        await anvil_jump(client, 3 * WEEK + DAY, 48)
+        await anvil_set_base_fee(client, GWEI)
+        receipt = await keeper.step()
+        assert receipt is not None
+        # nothing left to catch up
+        assert await keeper.step() is None
+
+    metrics = run_keeper(Policy(max_base_fee=5 * GWEI), script)
+
+    head = chain.blocks.head
+    assert last_checkpoint(vl_token) == head.timestamp
+    assert metrics.checkpoints == 1
+    assert metrics.weeks_caught_up == 3
+    assert metrics.backlog_weeks == 0
+    assert metrics.deferred_polls == 0
+    assert metrics.gas_used > 0
+    assert metrics.fees_paid >= metrics.gas_used
+    assert WEEK * 2 < metrics.backlog_latency < WEEK * 3
+
+
+def test_defer_until_urgent(vl_token, holder, run_keeper):
+    async def script(client, keeper):
+        for _ in range(4):
+            await anvil_jump(client, WEEK, 7)
+            # empty blocks lower the base fee, set it right before the poll
+            await anvil_set_base_fee(client, 50 * GWEI)
+            assert await keeper.step() is None
+        # the next user action would leave weeks behind
+        await anvil_jump(client, WEEK, 7)
+        await anvil_set_base_fee(client, 50 * GWEI)
+        assert await keeper.step() is not None
+
+    metrics = run_keeper(Policy(max_base_fee=5 * GWEI, urgent_weeks=5), script)
+
+    assert metrics.deferred_polls == 4
+    assert metrics.checkpoints == 1
+    assert metrics.weeks_caught_up == 5
+    assert last_checkpoint(vl_token) == chain.blocks.head.timestamp
+
+
+def test_weeks_left_behind_by_a_user_action(vl_token, holder, jump, run_keeper):
+    jump(10, 10 * WEEK)
+    vl_token.checkpoint_user(holder, sender=holder)
+    week = chain.blocks.head.timestamp // WEEK * WEEK
+    assert vl_token.recorded_week() == week - (10 - MAX_CATCHUP_WEEKS) * WEEK
+
+    async def script(client, keeper):
+        await anvil_set_base_fee(client, GWEI)
+        assert await keeper.step() is not None
+        assert await keeper.step() is None
+
+    metrics = run_keeper(Policy(max_base_fee=5 * GWEI), script)
+
+    assert metrics.weeks_caught_up == 10 - MAX_CATCHUP_WEEKS
+    assert vl_token.recorded_week() == week
+
+
+def test_long_backlog_in_partial_checkpoints(
+    vl_token, holder, collector, treasury, run_keeper
+):
+    async def script(client, keeper):
+        await anvil_jump(client, 12 * WEEK, 12)
+        await anvil_set_base_fee(client, GWEI)
+        while await keeper.step() is not None:
+            pass
+
+    metrics = run_keeper(Policy(max_base_fee=5 * GWEI, max_weeks_per_tx=5), script)
+
+    # 5, 5 and the last 2 weeks with checkpoint()
+    assert metrics.checkpoints == 3
+    assert metrics.weeks_caught_up == 12
+    assert last_checkpoint(vl_token) == chain.blocks.head.timestamp
+    # the weekly points recorded over the calls add up to the locks
+    holders = [holder, collector, treasury]
+    for weeks in [0, 3, 7, 11]:
+        week = chain.blocks.head.timestamp // WEEK * WEEK - weeks * WEEK
+        assert vl_token.totalSupply(week) == sum(vl_token.balanceOfMany(holders, week))
+
+
+def test_metrics_export():
+    metrics = Metrics(backlog_weeks=2, checkpoints=1, gas_used=50_000)
+
+    text = metrics.to_prometheus()
+
+    assert "# TYPE vltoken_keeper_backlog_weeks gauge\n" in text
+    assert "vltoken_keeper_backlog_weeks 2\n" in text
+    assert "# TYPE vltoken_keeper_checkpoints_total counter\n" in text
+    assert "vltoken_keeper_gas_used_total 50000\n" in text
+    assert text.endswith("vltoken_keeper_tx_latency 0.0\n")
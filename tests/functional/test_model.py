@@ -0,0 +1,144 @@
+from dataclasses import astuple
+
+import pytest
+from ape import chain
+
+from vltoken.model import Block, VoteLockModel
+from vltoken.vectorized import model_voting_power
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+ZERO = "0x0000000000000000000000000000000000000000"
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+def mined_block(tx):
+    return Block(tx.block_number, chain.blocks[tx.block_number].timestamp)
+
+
+def head_block():
+    head = chain.blocks.head
+    return Block(head.number, head.timestamp)
+
+
+@pytest.fixture()
+def model(vl_token, treasury, collector):
+    deployed = vl_token.point_history(vl_token, 0)
+    yield VoteLockModel(
+        vl_token.address, treasury, collector.address, Block(deployed.blk, deployed.ts)
+    )
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token):
+    users = accounts[3:8]
+    for user in users:
+        token.mint(user, AMOUNT * 100, sender=user)
+        token.approve(vl_token.address, AMOUNT * 100, sender=user)
+    yield users
+
+
+def run_history(vl_token, model, users):
+    now = chain.blocks.head.timestamp
+    for i, user in enumerate(users):
+        unlock_time = now + (i + 1) * MAXTIME // 3
+        tx = vl_token.modify_lock(AMOUNT * (i + 1), unlock_time, sender=user)
+        model.modify_lock(user.address, AMOUNT * (i + 1), unlock_time, mined_block(tx))
+
+    chain.pending_timestamp += 3 * WEEK + DAY
+    tx = vl_token.modify_lock(AMOUNT, 0, users[0], sender=users[1])
+    model.modify_lock(users[1].address, AMOUNT, 0, mined_block(tx), users[0].address)
+
+    chain.pending_timestamp += 2 * DAY
+    tx = vl_token.withdraw(sender=users[2])
+    model.withdraw(users[2].address, mined_block(tx))
+
+    chain.pending_timestamp += 9 * WEEK
+    tx = vl_token.checkpoint_partial(2, sender=users[0])
+    model.checkpoint_partial(2, mined_block(tx))
+
+    chain.pending_timestamp += WEEK
+    holders = [users[0], users[3]]
+    tx = vl_token.modify_lock_many(holders, [AMOUNT, 2 * AMOUNT], sender=users[4])
+    model.modify_lock_many(
+        users[4].address,
+        [h.address for h in holders],
+        [AMOUNT, 2 * AMOUNT],
+        mined_block(tx),
+    )
+
+    chain.pending_timestamp += WEEK
+    unlock_time = chain.pending_timestamp + MAXTIME + 10 * WEEK
+    tx = vl_token.modify_lock(0, unlock_time, sender=users[3])
+    model.modify_lock(users[3].address, 0, unlock_time, mined_block(tx))
+
+    chain.pending_timestamp += 2 * WEEK
+    tx = vl_token.checkpoint(sender=users[0])
+    model.checkpoint(mined_block(tx))
+    chain.mine()
+
+
+def test_model_matches_contract(vl_token, model, users, collector):
+    start = chain.blocks.head
+    run_history(vl_token, model, users)
+    block = head_block()
+
+    holders = [u.address for u in users] + [collector.address]
+    for holder in holders + [vl_token.address]:
+        assert vl_token.epoch(holder) == model.epoch[holder]
+        for epoch in range(vl_token.epoch(holder) + 1):
+            assert tuple(vl_token.point_history(holder, epoch)) == astuple(
+                model.point_history(holder, epoch)
+            )
+    # the weeks modify_lock_many left behind are recorded by the last checkpoint
+    assert vl_token.recorded_week() == model.recorded_week
+    assert model.week_points
+    for week, point in model.week_points.items():
+        assert vl_token.week_points(week) == point.slope << 128 | point.bias
+
+    timestamps = list(range(start.timestamp, block.timestamp, DAY))
+    for ts in timestamps:
+        assert vl_token.totalSupply(ts) == model.totalSupply(block, ts)
+        assert vl_token.balanceOfMany(holders, ts) == model.balanceOfMany(
+            holders, block, ts
+        )
+    for height in range(start.number, block.number + 1):
+        assert vl_token.timestamp_at(height) == model.timestamp_at(height, block)
+        assert vl_token.totalSupplyAt(height) == model.totalSupplyAt(height, block)
+        assert vl_token.getPriorVotesMany(holders, height) == model.getPriorVotesMany(
+            holders, height, block
+        )
+
+
+def test_vectorized_matches_contract(vl_token, model, users, collector):
+    start = chain.blocks.head.timestamp
+    run_history(vl_token, model, users)
+
+    holders = [u.address for u in users] + [collector.address]
+    timestamps = list(range(start, chain.blocks.head.timestamp, DAY))
+    power = model_voting_power(model, holders, timestamps)
+
+    assert power.shape == (len(holders), len(timestamps))
+    for j, ts in enumerate(timestamps):
+        assert list(power[:, j]) == vl_token.balanceOfMany(holders, ts)
+
+
+def test_slope_change_search_is_limited_like_the_contract():
+    model = VoteLockModel(ZERO, ZERO, ZERO, Block(0, 0))
+    user = "0x0000000000000000000000000000000000000001"
+    until = 2000 * WEEK
+
+    # only MAX_INDEX_WORDS words of 256 weeks are scanned
+    model.slope_changes[user][1100 * WEEK] = -1
+    assert model.next_slope_change(user, 0, until) == until
+    model.slope_changes[user][3 * WEEK] = -1
+    assert model.next_slope_change(user, 0, until) == 3 * WEEK
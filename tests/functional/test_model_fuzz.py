@@ -0,0 +1,263 @@
+import ape
+from ape import chain
+from ape.utils import ZERO_ADDRESS
+from hypothesis import HealthCheck, settings
+from hypothesis import strategies as st
+from hypothesis.stateful import (
+    RuleBasedStateMachine,
+    initialize,
+    invariant,
+    rule,
+    run_state_machine_as_test,
+)
+
+from vltoken.model import MAX_N_WEEKS, Block, Revert, VoteLockModel
+
+DAY = 86400
+WEEK = 7 * DAY
+AMOUNT = 10**18
+N_USERS = 6
+GAS_LIMIT = 10_000_000  # skip estimation so reverts are mined at the chosen time
+
+amounts = st.integers(min_value=0, max_value=100 * AMOUNT)
+lock_weeks = st.integers(min_value=0, max_value=MAX_N_WEEKS + 1)
+
+
+def head_block():
+    head = chain.blocks.head
+    return Block(head.number, head.timestamp)
+
+
+class VoteLockMachine(RuleBasedStateMachine):
+    """
+    Drives random histories of actions through the contract and the model and
+    compares every view after each step. Each example starts from the same
+    chain snapshot, so Hypothesis can replay and shrink failing histories.
+    """
+
+    vl_token = None
+    users = []
+    collector = None
+    treasury = None
+    jump = None
+
+    def __init__(self):
+        super().__init__()
+        self.snapshot = chain.snapshot()
+        deployed = self.vl_token.point_history(self.vl_token, 0)
+        self.model = VoteLockModel(
+            self.vl_token.address,
+            self.treasury,
+            self.collector.address,
+            Block(deployed.blk, deployed.ts),
+        )
+        self.start = head_block()
+        self.holders = [u.address for u in self.users] + [
+            self.collector.address,
+            self.treasury,
+        ]
+
+    def teardown(self):
+        chain.restore(self.snapshot)
+
+    def execute(self, action, mirror):
+        """
+        Mines `action` one second after the head and checks that it reverts
+        exactly when `mirror` raises in the model.
+        """
+        block = Block(chain.blocks.head.number + 1, chain.blocks.head.timestamp + 1)
+        chain.pending_timestamp = block.timestamp
+        try:
+            mirror(block)
+        except Revert:
+            with ape.reverts():
+                action()
+        else:
+            tx = action()
+            assert tx.block_number == block.number
+
+    @initialize()
+    def start_history(self):
+        assert self.vl_token.totalSupply() == 0
+
+    @rule(user=st.integers(0, N_USERS - 1), amount=amounts, weeks=lock_weeks)
+    def modify_lock(self, user, amount, weeks):
+        sender = self.users[user]
+        unlock_time = 0 if weeks == 0 else chain.blocks.head.timestamp + weeks * WEEK
+        self.execute(
+            lambda: self.vl_token.modify_lock(
+                amount, unlock_time, sender=sender, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.modify_lock(
+                sender.address, amount, unlock_time, block
+            ),
+        )
+
+    @rule(
+        sender=st.integers(0, N_USERS - 1),
+        user=st.integers(0, N_USERS - 1),
+        amount=amounts,
+    )
+    def top_up_for(self, sender, user, amount):
+        sender, user = self.users[sender], self.users[user]
+        self.execute(
+            lambda: self.vl_token.modify_lock(
+                amount, 0, user, sender=sender, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.modify_lock(
+                sender.address, amount, 0, block, user.address
+            ),
+        )
+
+    @rule(
+        sender=st.integers(0, N_USERS - 1),
+        deposits=st.dictionaries(
+            st.integers(0, N_USERS - 1), amounts, min_size=1, max_size=N_USERS
+        ),
+    )
+    def modify_lock_many(self, sender, deposits):
+        sender = self.users[sender]
+        users = [self.users[i] for i in deposits]
+        values = list(deposits.values())
+        self.execute(
+            lambda: self.vl_token.modify_lock_many(
+                users, values, sender=sender, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.modify_lock_many(
+                sender.address, [u.address for u in users], values, block
+            ),
+        )
+
+    @rule(user=st.integers(0, N_USERS - 1))
+    def withdraw(self, user):
+        sender = self.users[user]
+        self.execute(
+            lambda: self.vl_token.withdraw(sender=sender, gas_limit=GAS_LIMIT),
+            lambda block: self.model.withdraw(sender.address, block),
+        )
+
+    @rule()
+    def checkpoint(self):
+        sender = self.users[0]
+        self.execute(
+            lambda: self.vl_token.checkpoint(sender=sender, gas_limit=GAS_LIMIT),
+            lambda block: self.model.checkpoint(block),
+        )
+
+    @rule(max_weeks=st.integers(0, 8))
+    def checkpoint_partial(self, max_weeks):
+        sender = self.users[0]
+        self.execute(
+            lambda: self.vl_token.checkpoint_partial(
+                max_weeks, sender=sender, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.checkpoint_partial(max_weeks, block),
+        )
+
+    @rule(user=st.integers(0, N_USERS - 1))
+    def checkpoint_user(self, user):
+        keeper, user = self.users[0], self.users[user]
+        self.execute(
+            lambda: self.vl_token.checkpoint_user(
+                user, sender=keeper, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.checkpoint_user(user.address, block),
+        )
+
+    @rule()
+    def remove_collector(self):
+        self.execute(
+            lambda: self.vl_token.removeCollector(
+                sender=self.collector, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.removeCollector(self.collector.address, block),
+        )
+
+    @rule()
+    def flush_fees(self):
+        sender = self.users[0]
+        self.execute(
+            lambda: self.vl_token.flush_fees(sender=sender, gas_limit=GAS_LIMIT),
+            lambda block: self.model.flush_fees(block),
+        )
+
+    @rule()
+    def sweep_penalties(self):
+        sender = self.users[0]
+        self.execute(
+            lambda: self.vl_token.sweep_penalties(sender=sender, gas_limit=GAS_LIMIT),
+            lambda block: self.model.sweep_penalties(),
+        )
+
+    @rule(sender=st.integers(0, N_USERS - 1), to=st.integers(0, N_USERS))
+    def delegate(self, sender, to):
+        sender = self.users[sender]
+        # the last index undelegates through the empty address
+        to = self.users[to].address if to < N_USERS else None
+        self.execute(
+            lambda: self.vl_token.delegate(
+                to or ZERO_ADDRESS, sender=sender, gas_limit=GAS_LIMIT
+            ),
+            lambda block: self.model.delegate(sender.address, to, block),
+        )
+
+    @rule(blocks=st.integers(1, 20), seconds=st.integers(0, 20 * WEEK))
+    def advance(self, blocks, seconds):
+        self.jump(blocks, max(seconds, blocks))
+
+    @rule(ratio=st.fractions(0, 1))
+    def past_views(self, ratio):
+        block = head_block()
+        height = self.start.number + int((block.number - self.start.number) * ratio)
+        ts = self.start.timestamp
+        ts += int((block.timestamp - self.start.timestamp) * ratio)
+        model = self.model
+
+        assert self.vl_token.totalSupply(ts) == model.totalSupply(block, ts)
+        balances = self.vl_token.balanceOfMany(self.holders, ts)
+        assert balances == model.balanceOfMany(self.holders, block, ts)
+        supply = self.vl_token.totalSupplyAt(height)
+        assert supply == model.totalSupplyAt(height, block)
+        votes = self.vl_token.getPriorVotesMany(self.holders, height)
+        assert votes == model.getPriorVotesMany(self.holders, height, block)
+
+    @invariant()
+    def views_match_model(self):
+        block = head_block()
+        supply = self.vl_token.totalSupply()
+        balances = self.vl_token.balanceOfMany(self.holders)
+
+        assert supply == self.model.totalSupply(block)
+        assert self.vl_token.pending_fees() == self.model.pending_fees
+        assert self.vl_token.pending_penalties() == self.model.pending_penalties
+        week = block.timestamp // WEEK * WEEK
+        assert self.vl_token.penalties(week) == self.model.penalties[week]
+        assert self.vl_token.recorded_week() == self.model.recorded_week
+        assert balances == self.model.balanceOfMany(self.holders, block)
+        for user in self.users:
+            delegate = self.model.delegated.get(user.address, ZERO_ADDRESS)
+            assert self.vl_token.delegated(user) == delegate
+        assert supply == sum(balances)
+
+
+def test_contract_matches_model(accounts, token, vl_token, treasury, collector, jump):
+    users = accounts[3 : 3 + N_USERS]
+    for user in users:
+        token.mint(user, 10**6 * AMOUNT, sender=user)
+        token.approve(vl_token.address, 10**6 * AMOUNT, sender=user)
+
+    VoteLockMachine.vl_token = vl_token
+    VoteLockMachine.users = users
+    VoteLockMachine.collector = collector
+    VoteLockMachine.treasury = treasury
+    VoteLockMachine.jump = staticmethod(jump)
+
+    run_state_machine_as_test(
+        VoteLockMachine,
+        settings=settings(
+            max_examples=50,
+            stateful_step_count=40,
+            deadline=None,
+            suppress_health_check=[HealthCheck.too_slow],
+        ),
+    )
@@ -0,0 +1,85 @@
+import ape
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def holders(accounts, token, vl_token):
+    holders = accounts[3:7]
+    now = chain.blocks.head.timestamp
+    for i, holder in enumerate(holders):
+        token.mint(holder, AMOUNT, sender=holder)
+        token.approve(vl_token.address, AMOUNT, sender=holder)
+        vl_token.modify_lock(AMOUNT, now + (i + 1) * MAXTIME // 4, sender=holder)
+    yield holders
+
+
+@pytest.fixture()
+def distributor(accounts, token, vl_token):
+    distributor = accounts[0]
+    token.mint(distributor, AMOUNT * 100, sender=distributor)
+    token.approve(vl_token.address, AMOUNT * 100, sender=distributor)
+    yield distributor
+
+
+def test_modify_lock_many_matches_single_deposits(
+    distributor, holders, collector, token, vl_token
+):
+    amounts = [(i + 1) * AMOUNT for i in range(len(holders))]
+    chain.pending_timestamp += DAY
+    t = chain.pending_timestamp + WEEK
+    snapshot = chain.snapshot()
+
+    for holder, amount in zip(holders, amounts):
+        vl_token.modify_lock(amount, 0, holder, sender=distributor)
+    expected_locks = [vl_token.locked(holder) for holder in holders]
+    expected_balances = [vl_token.balanceOf(holder, t) for holder in holders]
+    expected_fee = vl_token.locked(collector).amount
+    expected_supply = vl_token.supply()
+
+    chain.restore(snapshot)
+    tx = vl_token.modify_lock_many(holders, amounts, sender=distributor)
+
+    assert [vl_token.locked(holder) for holder in holders] == expected_locks
+    assert [vl_token.balanceOf(holder, t) for holder in holders] == expected_balances
+    assert vl_token.locked(collector).amount == expected_fee
+    assert vl_token.supply() == expected_supply
+    assert token.balanceOf(vl_token) == expected_supply
+    assert vl_token.totalSupply(t) == sum(expected_balances) + vl_token.balanceOf(
+        collector, t
+    )
+
+    events = list(tx.decode_logs(vl_token.ModifyLock))
+    assert [e.user for e in events] == [holder.address for holder in holders]
+    assert [e.amount for e in events] == [lock.amount for lock in expected_locks]
+
+
+def test_modify_lock_many_requires_active_locks(
+    accounts, distributor, holders, vl_token
+):
+    with ape.reverts():
+        vl_token.modify_lock_many([accounts[8]], [AMOUNT], sender=distributor)
+
+    chain.pending_timestamp += MAXTIME // 4 + WEEK
+    chain.mine()
+    # the first lock has expired
+    with ape.reverts():
+        vl_token.modify_lock_many(holders, [AMOUNT] * len(holders), sender=distributor)
+
+
+def test_modify_lock_many_length_mismatch(distributor, holders, vl_token):
+    with ape.reverts():
+        vl_token.modify_lock_many(holders, [AMOUNT], sender=distributor)
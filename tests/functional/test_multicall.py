@@ -0,0 +1,98 @@
+import asyncio
+import re
+
+import pytest
+from ape import chain
+
+from vltoken.model import LockedBalance, Point
+from vltoken.multicall import CallError, VoteLockClient
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token):
+    users = accounts[3:7]
+    now = chain.blocks.head.timestamp
+    for i, user in enumerate(users):
+        token.mint(user, AMOUNT * 10, sender=user)
+        token.approve(vl_token.address, AMOUNT * 10, sender=user)
+        vl_token.modify_lock(AMOUNT * (i + 1), now + MAXTIME - i * WEEK, sender=user)
+    yield [u.address for u in users]
+
+
+def read(vl_token, multicall, calls_per_batch, read_views):
+    async def run():
+        async with VoteLockClient(
+            chain.provider.uri,
+            vl_token.address,
+            multicall.address,
+            calls_per_batch=calls_per_batch,
+        ) as client:
+            return await read_views(client), client.round_trips
+
+    return asyncio.run(run())
+
+
+def test_views_match_contract(vl_token, multicall, users):
+    height = chain.blocks.head.number
+    chain.pending_timestamp += WEEK
+    vl_token.modify_lock(AMOUNT, 0, sender=users[0])
+    chain.mine()
+    weeks = [vl_token.locked(u).end for u in users]
+
+    async def read_views(client):
+        return (
+            await client.locks(users),
+            await client.epochs(users),
+            await client.points(users, [1] * len(users)),
+            await client.slope_changes(users[0], weeks),
+            await client.balances(users),
+            await client.balances(users, height),
+            await client.prior_votes(users, height),
+        )
+
+    views, round_trips = read(vl_token, multicall, 500, read_views)
+    locks, epochs, points, changes, balances, past_balances, votes = views
+
+    assert round_trips == 7
+    assert locks == [LockedBalance(*vl_token.locked(u)) for u in users]
+    assert epochs == [vl_token.epoch(u) for u in users]
+    assert points == [Point(*vl_token.point_history(u, 1)) for u in users]
+    assert changes == [vl_token.slope_changes(users[0], week) for week in weeks]
+    assert balances == vl_token.balanceOfMany(users)
+    past = chain.blocks[height].timestamp
+    assert past_balances == vl_token.balanceOfMany(users, past)
+    assert votes == vl_token.getPriorVotesMany(users, height)
+
+
+def test_batches_share_one_request(vl_token, multicall, users):
+    # 4 eth_call of 3 calls each, sent in a single JSON-RPC batch
+    balances, round_trips = read(
+        vl_token, multicall, 3, lambda client: client.balances(users * 3)
+    )
+
+    assert round_trips == 1
+    assert balances == vl_token.balanceOfMany(users) * 3
+
+
+def test_failed_call_is_named(vl_token, multicall, users):
+    future = chain.blocks.head.number + 10
+
+    async def read_views(client):
+        call = f"getPriorVotes({users[1]}, {future})"
+        with pytest.raises(CallError, match=re.escape(call)):
+            await client.prior_votes(users[1:2], future)
+
+    read(vl_token, multicall, 500, read_views)
@@ -0,0 +1,91 @@
+import ape
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def alice(accounts, token):
+    # no approval, the permit is signed instead
+    alice = accounts[3]
+    token.mint(alice, AMOUNT * 10, sender=alice)
+    yield alice
+
+
+def test_create_lock_with_permit(alice, token, vl_token, sign_permit):
+    now = chain.blocks.head.timestamp
+    deadline = now + DAY
+    v, r, s = sign_permit(alice, token, vl_token, AMOUNT, deadline)
+
+    tx = vl_token.modify_lock_with_permit(
+        AMOUNT, now + MAXTIME, deadline, v, r, s, sender=alice
+    )
+
+    lock = vl_token.locked(alice)
+    assert lock.amount == AMOUNT * 99 // 100
+    assert lock.end == (now + MAXTIME) // WEEK * WEEK
+    assert token.allowance(alice, vl_token) == 0
+    assert token.nonces(alice) == 1
+    assert token.balanceOf(alice) == AMOUNT * 9
+    assert tx.events.filter(vl_token.ModifyLock)[0].sender == alice
+
+
+def test_permit_top_up_for_user(alice, accounts, token, vl_token, sign_permit):
+    bob = accounts[4]
+    token.mint(bob, AMOUNT, sender=bob)
+    token.approve(vl_token, AMOUNT, sender=bob)
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=bob)
+    lock = vl_token.locked(bob)
+
+    deadline = now + DAY
+    v, r, s = sign_permit(alice, token, vl_token, 2 * AMOUNT, deadline)
+    vl_token.modify_lock_with_permit(
+        2 * AMOUNT, now + 2 * MAXTIME, deadline, v, r, s, bob, sender=alice
+    )
+
+    # unlock time is only changed by the user
+    assert vl_token.locked(bob).amount == lock.amount + 2 * AMOUNT * 99 // 100
+    assert vl_token.locked(bob).end == lock.end
+
+
+def test_front_run_permit(alice, accounts, token, vl_token, sign_permit):
+    now = chain.blocks.head.timestamp
+    deadline = now + DAY
+    v, r, s = sign_permit(alice, token, vl_token, AMOUNT, deadline)
+    # someone submits the signed permit first
+    token.permit(alice, vl_token, AMOUNT, deadline, v, r, s, sender=accounts[5])
+
+    vl_token.modify_lock_with_permit(
+        AMOUNT, now + MAXTIME, deadline, v, r, s, sender=alice
+    )
+    assert vl_token.locked(alice).amount == AMOUNT * 99 // 100
+
+
+def test_invalid_permit(alice, accounts, token, vl_token, sign_permit):
+    now = chain.blocks.head.timestamp
+    deadline = now + DAY
+    # signed by someone else
+    v, r, s = sign_permit(accounts[5], token, vl_token, AMOUNT, deadline)
+    with ape.reverts():
+        vl_token.modify_lock_with_permit(
+            AMOUNT, now + MAXTIME, deadline, v, r, s, sender=alice
+        )
+
+    v, r, s = sign_permit(alice, token, vl_token, AMOUNT, now - 1)
+    with ape.reverts():
+        vl_token.modify_lock_with_permit(
+            AMOUNT, now + MAXTIME, now - 1, v, r, s, sender=alice
+        )
@@ -0,0 +1,150 @@
+import pytest
+from ape import chain
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+REWARD = 100 * AMOUNT
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def holders(accounts, token, vl_token, reward_pool):
+    holders = accounts[3:7]
+    now = chain.blocks.head.timestamp
+    # the last lock is longer than the max duration, its slope starts later
+    durations = [MAXTIME // 4, MAXTIME // 2, MAXTIME, MAXTIME + 20 * WEEK]
+    for i, (holder, duration) in enumerate(zip(holders, durations)):
+        token.mint(holder, AMOUNT * 100, sender=holder)
+        token.approve(vl_token.address, AMOUNT * 100, sender=holder)
+        vl_token.modify_lock(AMOUNT * (i + 1), now + duration, sender=holder)
+    yield holders
+
+
+@pytest.fixture()
+def distribute(accounts, token, reward_pool):
+    funder = accounts[0]
+
+    def distribute(weeks, on_week=None):
+        """
+        Sends REWARD to the pool every week for `weeks` weeks.
+        """
+        token.mint(funder, REWARD * weeks, sender=funder)
+        token.approve(reward_pool.address, REWARD * weeks, sender=funder)
+        for week in range(weeks):
+            chain.pending_timestamp += WEEK
+            reward_pool.burn(REWARD, sender=funder)
+            if on_week is not None:
+                on_week(week)
+        chain.pending_timestamp += WEEK
+        reward_pool.checkpoint_token(sender=funder)
+        reward_pool.checkpoint_total_supply(sender=funder)
+
+    yield distribute
+
+
+def expected_rewards(vl_token, reward_pool, user):
+    last_week = min(
+        reward_pool.last_token_time() // WEEK * WEEK, reward_pool.time_cursor()
+    )
+    return sum(
+        vl_token.balanceOf(user, week)
+        * reward_pool.tokens_per_week(week)
+        // reward_pool.ve_supply(week)
+        for week in range(reward_pool.start_time(), last_week, WEEK)
+        if reward_pool.ve_supply(week) > 0
+    )
+
+
+def test_claim_matches_balances(vl_token, reward_pool, token, holders, distribute):
+    def on_week(week):
+        now = chain.pending_timestamp
+        if week == 3:
+            vl_token.modify_lock(AMOUNT, 0, sender=holders[0])
+        if week == 5:
+            vl_token.modify_lock(0, now + MAXTIME, sender=holders[1])
+        if week == 7:
+            vl_token.withdraw(sender=holders[2])
+        if week == 9:
+            vl_token.checkpoint_user(holders[3], sender=holders[3])
+
+    distribute(13, on_week)
+
+    total = 0
+    for holder in holders:
+        expected = expected_rewards(vl_token, reward_pool, holder)
+        before = token.balanceOf(holder)
+        reward_pool.claim(sender=holder)
+        assert token.balanceOf(holder) - before == expected
+        assert expected > 0
+        total += expected
+
+    # claiming again settles nothing
+    before = token.balanceOf(holders[0])
+    reward_pool.claim(sender=holders[0])
+    assert token.balanceOf(holders[0]) == before
+    assert token.balanceOf(reward_pool) == reward_pool.token_last_balance()
+    assert total <= 13 * REWARD
+
+
+def test_claim_resumes_from_cursor(vl_token, reward_pool, token, holders, distribute):
+    locked = [0] * len(holders)
+
+    def top_up(week):
+        if week == 2:
+            vl_token.modify_lock(AMOUNT, 0, sender=holders[1])
+            locked[1] += AMOUNT
+
+    def received(i):
+        # the tokens locked by a top-up left the balance of the holder
+        return token.balanceOf(holders[i]) + locked[i] - initial[i]
+
+    initial = [token.balanceOf(holder) for holder in holders]
+    distribute(6, top_up)
+    for holder in holders:
+        reward_pool.claim(sender=holder)
+    first = [received(i) for i in range(len(holders))]
+
+    distribute(7, top_up)
+    for i, (holder, claimed) in enumerate(zip(holders, first)):
+        reward_pool.claim(sender=holder)
+        # the second claim starts where the first one stopped
+        total = received(i)
+        assert total == expected_rewards(vl_token, reward_pool, holder)
+        assert total > claimed > 0
+
+
+def test_claim_many_matches_claim(reward_pool, token, holders, distribute):
+    distribute(13)
+    snapshot = chain.snapshot()
+
+    for holder in holders:
+        reward_pool.claim(sender=holder)
+    expected = [token.balanceOf(holder) for holder in holders]
+
+    chain.restore(snapshot)
+    reward_pool.claim_many(holders, sender=holders[0])
+
+    assert [token.balanceOf(holder) for holder in holders] == expected
+    last_week = reward_pool.last_token_time() // WEEK * WEEK
+    assert [reward_pool.time_cursor_of(h) for h in holders] == [last_week] * 4
+
+
+def test_relock(vl_token, reward_pool, holders, distribute):
+    distribute(2)
+    holder = holders[3]
+    lock = vl_token.locked(holder)
+
+    reward_pool.claim(holder, True, sender=holder)
+
+    amount = vl_token.locked(holder).amount - lock.amount
+    assert amount > 0
+    assert vl_token.locked(holder).end == lock.end
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from ape import chain
+
+from vltoken.indexer import Indexer
+from vltoken.snapshot import leaf, merkle_root, voting_power, write_snapshot
+
+DAY = 86400
+WEEK = 7 * DAY
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token):
+    users = accounts[3:7]
+    for user in users:
+        token.mint(user, AMOUNT * 10, sender=user)
+        token.approve(vl_token.address, AMOUNT * 10, sender=user)
+    yield users
+
+
+@pytest.fixture()
+def indexer(vl_token, tmp_path):
+    start_block = chain.blocks.head.number
+    indexer = Indexer(vl_token, str(tmp_path / "index.sqlite"), start_block)
+    yield indexer
+    indexer.close()
+
+
+def test_snapshot_matches_prior_votes(vl_token, users, indexer, jump):
+    alice, bob, carol, dave = users
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=alice)
+    vl_token.modify_lock(2 * AMOUNT, now + MAXTIME // 2, sender=bob)
+    vl_token.modify_lock(AMOUNT, now + 3 * WEEK, sender=carol)
+    jump(24, DAY)
+    vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=dave)
+    vl_token.modify_lock(AMOUNT, 0, dave, sender=alice)
+    vl_token.modify_lock(AMOUNT, 0, bob, sender=alice)
+    jump(7 * 24, 5 * WEEK)
+    vl_token.withdraw(sender=carol)
+    vl_token.modify_lock(0, now + MAXTIME + 4 * WEEK, sender=alice)
+    jump(24, DAY)
+    vl_token.withdraw(sender=bob)
+    chain.mine()
+
+    head = chain.blocks.head.number
+    indexer.sync(head)
+    holders = [u.address for u in users]
+    for height in range(indexer.start_block, head + 1, 3):
+        histories = indexer.lock_events(height)
+        block_time = vl_token.timestamp_at(height)
+        power = voting_power(histories, height, block_time, workers=2)
+
+        assert set(power) == {u for u in holders if u in histories}
+        assert list(power.values()) == vl_token.getPriorVotesMany(list(power), height)
+
+
+def test_delegation_accounts_read_on_chain(vl_token, users, indexer):
+    alice, bob, carol, dave = users
+    now = chain.blocks.head.timestamp
+    for user in users:
+        vl_token.modify_lock(AMOUNT, now + MAXTIME, sender=user)
+    vl_token.delegate(bob, sender=alice)
+    delegated = chain.blocks.head.number
+    vl_token.delegate(dave, sender=carol)
+    chain.mine()
+
+    head = chain.blocks.head.number
+    indexer.sync(head)
+    assert set(indexer.delegation_accounts(delegated)) == {alice.address, bob.address}
+    accounts = indexer.delegation_accounts(head)
+    assert set(accounts) == {u.address for u in users}
+
+    # the lock history of a delegate is not its voting power
+    histories = indexer.lock_events(head)
+    power = voting_power(histories, head, vl_token.timestamp_at(head))
+    assert power[bob.address] != vl_token.getPriorVotes(bob, head)
+    for user in accounts:
+        histories.pop(user)
+    assert histories == {}
+
+
+def test_write_snapshot(users, tmp_path):
+    alice, bob, carol, _ = users
+    power = {alice.address: 3 * AMOUNT, bob.address: 0, carol.address: AMOUNT}
+
+    root = write_snapshot(str(tmp_path / "snapshot"), 42, 1234, power)
+    assert root == merkle_root({alice.address: 3 * AMOUNT, carol.address: AMOUNT})
+    assert root == merkle_root({carol.address: AMOUNT, alice.address: 3 * AMOUNT})
+    assert merkle_root({alice.address: AMOUNT}) == leaf(alice.address, AMOUNT)
+    assert merkle_root({}) == b""
+
+    snapshot = json.loads((tmp_path / "snapshot.json").read_text())
+    assert snapshot == {
+        "block": 42,
+        "timestamp": 1234,
+        "root": "0x" + root.hex(),
+        "power": {alice.address: str(3 * AMOUNT), carol.address: str(AMOUNT)},
+    }
+    rows = (tmp_path / "snapshot.csv").read_text().splitlines()
+    assert rows == [
+        "user,power",
+        f"{alice.address},{3 * AMOUNT}",
+        f"{carol.address},{AMOUNT}",
+    ]
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from ape import chain
+
+from vltoken.model import WEEK, LockedBalance, Point
+from vltoken.multicall import VoteLockClient
+from vltoken.storage import SLOTS, StorageReader
+
+DAY = 86400
+MAXTIME = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+AMOUNT = 10**18
+
+
+@pytest.fixture(autouse=True)
+def setup_time(chain):
+    chain.pending_timestamp += WEEK - (
+        chain.pending_timestamp - (chain.pending_timestamp // WEEK * WEEK)
+    )
+    chain.mine()
+
+
+@pytest.fixture()
+def users(accounts, token, vl_token, jump):
+    users = accounts[3:6]
+    now = chain.blocks.head.timestamp
+    for i, user in enumerate(users):
+        token.mint(user, AMOUNT * 10, sender=user)
+        token.approve(vl_token.address, AMOUNT * 10, sender=user)
+        vl_token.modify_lock(AMOUNT, now + MAXTIME - 5 * i * WEEK, sender=user)
+    for _ in range(4):
+        jump(24, 3 * DAY)
+        vl_token.modify_lock(AMOUNT, 0, sender=users[0])
+    vl_token.withdraw(sender=users[2])
+    jump(7 * 24, 10 * WEEK)
+    vl_token.checkpoint(sender=users[1])
+    yield [u.address for u in users]
+
+
+def read(vl_token, read_storage):
+    async def run():
+        async with VoteLockClient(chain.provider.uri, vl_token.address) as client:
+            return await read_storage(StorageReader(client, chunk_size=3))
+
+    return asyncio.run(run())
+
+
+def test_points_match_getters(vl_token, users):
+    holders = users + [vl_token.address]
+
+    async def read_storage(reader):
+        return [[p async for p in reader.points(user)] for user in holders]
+
+    histories = read(vl_token, read_storage)
+
+    for user, points in zip(holders, histories):
+        assert len(points) == vl_token.epoch(user) + 1
+        assert points == [
+            Point(*vl_token.point_history(user, i)) for i in range(len(points))
+        ]
+    # the global history spans the weekly points of the idle weeks
+    assert len(histories[-1]) > 10
+
+
+def test_slope_changes_match_getters(vl_token, users):
+    holders = users + [vl_token.address]
+
+    async def read_storage(reader):
+        return [[c async for c in reader.slope_changes(user)] for user in holders]
+
+    changes = read(vl_token, read_storage)
+
+    now = chain.blocks.head.timestamp // WEEK * WEEK
+    for user, user_changes in zip(holders, changes):
+        expected = []
+        for ts in range(now - 20 * WEEK, now + 2 * MAXTIME, WEEK):
+            change = vl_token.slope_changes(user, ts)
+            if change != 0:
+                expected.append((ts, change))
+        assert user_changes == expected
+    assert changes[0] != []
+
+
+def test_locks_and_variables(vl_token, users):
+    async def read_storage(reader):
+        block = await reader.pin(None)
+        words = await reader.read(
+            [
+                SLOTS["supply"],
+                SLOTS["last_block_checkpoint"],
+                SLOTS["collector_active"],
+            ],
+            block,
+        )
+        return await reader.locks(users, block), words
+
+    locks, words = read(vl_token, read_storage)
+
+    assert locks == [LockedBalance(*vl_token.locked(u)) for u in users]
+    assert words == [
+        vl_token.supply(),
+        vl_token.last_block_checkpoint(),
+        vl_token.collector_active(),
+    ]
@@ -93,6 +93,9 @@ def test_treasury_filled_after_early_withdraw(alice, bob, treasury, token, vl_to
     assert pytest.approx(alice_vl_token_balance, rel=0.01) == (AMOUNT / 2 * 99/100) 
 
     vl_token.withdraw(sender=alice)
+    # the penalty waits in the contract until it is swept
+    assert token.balanceOf(treasury) == 0
+    vl_token.sweep_penalties(sender=alice)
 
     treasury_token_balance = token.balanceOf(treasury)
 
@@ -114,6 +117,7 @@ def test_treasury_filled_after_early_withdraw(alice, bob, treasury, token, vl_to
     chain.mine()
 
     vl_token.withdraw(sender=bob)
+    vl_token.sweep_penalties(sender=bob)
 
     bob_vl_token_balance = vl_token.balanceOf(bob)
     assert pytest.approx(bob_vl_token_balance, rel=0.01) == 0
@@ -136,3 +140,64 @@ def test_treasury_filled_after_early_withdraw(alice, bob, treasury, token, vl_to
     assert vl_token.totalSupply() == 0
 
 
+def test_fees_flushed_weekly(alice, bob, collector, treasury, vl_token):
+    # the deposit of bob was the first of the week, its fee is in the fee lock
+    fee = 2 * AMOUNT // 100
+    fee_lock = vl_token.locked(collector)
+    assert fee_lock.amount == fee
+    assert vl_token.pending_fees() == 0
+
+    # later deposits of the week only accrue
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME // 2, sender=alice)
+    vl_token.modify_lock(AMOUNT, 0, sender=bob)
+    assert vl_token.pending_fees() == fee
+    assert vl_token.locked(collector) == fee_lock
+    holders = [alice, bob, collector]
+    assert vl_token.totalSupply() == sum(vl_token.balanceOf(u) for u in holders)
+
+    # anyone can flush them
+    vl_token.flush_fees(sender=alice)
+    assert vl_token.pending_fees() == 0
+    assert vl_token.locked(collector).amount == 2 * fee
+    assert vl_token.totalSupply() == sum(vl_token.balanceOf(u) for u in holders)
+
+    # the fees charged before the removal of the collector go to the collector
+    vl_token.modify_lock(AMOUNT, 0, sender=alice)
+    vl_token.removeCollector(sender=collector)
+    assert vl_token.locked(collector).amount == 2 * fee + fee // 2
+    assert vl_token.locked(treasury).amount == 0
+
+    chain.pending_timestamp += WEEK
+    vl_token.modify_lock(AMOUNT, 0, sender=alice)
+    assert vl_token.pending_fees() == 0
+    assert vl_token.locked(treasury).amount == AMOUNT // 100
+
+
+def test_penalties_swept_once(alice, bob, treasury, token, vl_token):
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(AMOUNT, now + MAXTIME // 2, sender=alice)
+
+    chain.pending_timestamp += 2 * WEEK
+    tx = vl_token.withdraw(sender=alice)
+    first = vl_token.pending_penalties()
+    assert [e.amount for e in tx.events.filter(vl_token.ExitPenalty)] == [first]
+    week = chain.blocks.head.timestamp // WEEK * WEEK
+    chain.pending_timestamp += DAY
+    vl_token.withdraw(sender=bob)
+    total = vl_token.pending_penalties()
+
+    assert total > first > 0
+    assert vl_token.penalties(week) + vl_token.penalties(week + WEEK) == total
+    assert token.balanceOf(vl_token) == vl_token.supply() + total
+    assert token.balanceOf(treasury) == 0
+
+    tx = vl_token.sweep_penalties(sender=bob)
+    assert token.balanceOf(treasury) == total
+    assert vl_token.pending_penalties() == 0
+    assert [e.amount for e in tx.events.filter(vl_token.Penalty)] == [total]
+    # the weekly accounting is kept after the sweep
+    assert vl_token.penalties(week) + vl_token.penalties(week + WEEK) == total
+
+    vl_token.sweep_penalties(sender=bob)
+    assert token.balanceOf(treasury) == total
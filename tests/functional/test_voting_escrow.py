@@ -51,6 +51,33 @@ def test_over_max_time(chain, accounts, token, vl_token):
     assert vl_token.totalSupply() == vl_token.balanceOf(alice)
 
 
+def test_packed_getters(chain, accounts, token, vl_token):
+    alice = accounts[0]
+    amount = 1000 * 10**18
+    token.mint(alice, amount, sender=alice)
+    token.approve(vl_token.address, amount, sender=alice)
+
+    now = chain.blocks.head.timestamp
+    unlock_time = now + MAXTIME // 2
+    vl_token.modify_lock(amount, unlock_time, sender=alice)
+    head = chain.blocks.head
+
+    lock = vl_token.locked(alice)
+    assert lock.amount == amount * 99 // 100
+    assert lock.end == unlock_time // WEEK * WEEK
+
+    point = vl_token.point_history(alice, 1)
+    assert point == vl_token.get_last_user_point(alice)
+    assert point.slope == lock.amount // MAXTIME
+    assert point.bias == point.slope * (lock.end - head.timestamp)
+    assert point.ts == head.timestamp
+    assert point.blk == head.number
+
+    point = vl_token.point_history(vl_token, vl_token.epoch(vl_token))
+    assert point.ts == head.timestamp
+    assert point.blk == head.number
+
+
 def test_lock_slightly_over_limit_is_rounded_down(chain, accounts, token, vl_token):
     alice = accounts[0]
     amount = 1000 * 10**18
@@ -80,7 +107,7 @@ def test_lock_slightly_over_limit_is_rounded_down(chain, accounts, token, vl_tok
     assert vl_token.balanceOf(alice) < (amount * 2) // MAXTIME * MAXTIME
 
 
-def test_get_prior_votes(chain, accounts, token, vl_token):
+def test_get_prior_votes(chain, accounts, token, vl_token, jump):
     alice = accounts[0]
     amount = 1000 * 10**18
     power = amount // MAXTIME * MAXTIME
@@ -91,9 +118,7 @@ def test_get_prior_votes(chain, accounts, token, vl_token):
     unlock_time = now + MAXTIME + WEEK + 4
     vl_token.modify_lock(amount, unlock_time, sender=alice)  # MAXTIME ++
 
-    for _ in range(5 * 7 * 24):
-        chain.pending_timestamp += H - 1
-        chain.mine()
+    jump(5 * 7 * 24, 5 * 7 * DAY)
 
     assert vl_token.getPriorVotes(alice, chain.blocks.head.number) < power
 
@@ -147,7 +172,7 @@ def test_multiple_lock_decay(accounts, token, vl_token):
     assert vl_token.totalSupply() == 0
 
 
-def test_voting_powers(chain, accounts, token, vl_token):
+def test_voting_powers(chain, accounts, token, vl_token, jump):
     """
     Test voting power in the following scenario.
     Alice:
@@ -214,9 +239,7 @@ def test_voting_powers(chain, accounts, token, vl_token):
     stages["alice_in_0"] = []
     stages["alice_in_0"].append((chain.blocks.head.number, chain.blocks.head.timestamp))
     for i in range(7):
-        for _ in range(24):
-            chain.pending_timestamp += H - 1
-            chain.mine()
+        jump(24, DAY)
         dt = chain.blocks.head.timestamp - t0
         assert approx(vl_token.totalSupply(), rel=TOL) == amount // MAXTIME * max(
             WEEK - 2 * H - dt, 0
@@ -271,9 +294,7 @@ def test_voting_powers(chain, accounts, token, vl_token):
     # Beginning of week: weight 3
     # End of week: weight 1
     for i in range(7):
-        for _ in range(24):
-            chain.pending_timestamp += H - 1
-            chain.mine()
+        jump(24, DAY)
         dt = chain.blocks.head.timestamp - t0
         w_total = vl_token.totalSupply()
         w_alice = vl_token.balanceOf(alice)
@@ -302,9 +323,7 @@ def test_voting_powers(chain, accounts, token, vl_token):
 
     stages["alice_in_2"] = []
     for i in range(7):
-        for _ in range(24):
-            chain.pending_timestamp += H - 1
-            chain.mine()
+        jump(24, DAY)
         dt = chain.blocks.head.timestamp - t0
         w_total = vl_token.totalSupply()
         w_alice = vl_token.balanceOf(alice)
@@ -480,3 +499,136 @@ def test_lock_cant_exceed_reply_range(chain, accounts, token, vl_token):
     unlock_time = now + MAX_N_WEEKS * WEEK
     with ape.reverts():
         vl_token.modify_lock(amount, unlock_time, sender=alice)
+
+
+def test_batch_voting_power(chain, accounts, token, vl_token):
+    users = accounts[:4]
+    amount = 1000 * 10**18
+    now = chain.blocks.head.timestamp
+    for i, user in enumerate(users):
+        token.mint(user, amount, sender=user)
+        token.approve(vl_token.address, amount, sender=user)
+        vl_token.modify_lock(amount, now + (i + 1) * MAXTIME // 4, sender=user)
+        chain.pending_timestamp += DAY
+        chain.mine()
+
+    height = chain.blocks.head.number
+    ts = chain.blocks.head.timestamp
+    chain.pending_timestamp += WEEK
+    chain.mine()
+
+    holders = [u.address for u in users] + [accounts[5].address]
+    assert vl_token.balanceOfMany(holders, ts) == [
+        vl_token.balanceOf(u, ts) for u in holders
+    ]
+    assert vl_token.balanceOfMany(holders) == [vl_token.balanceOf(u) for u in holders]
+    assert vl_token.getPriorVotesMany(holders, height) == [
+        vl_token.getPriorVotes(u, height) for u in holders
+    ]
+    assert vl_token.balanceOfMany([]) == []
+
+    with ape.reverts():
+        vl_token.getPriorVotesMany(holders, chain.blocks.head.number + 1)
+
+
+def test_slope_change_index(chain, accounts, token, vl_token):
+    alice = accounts[0]
+    amount = 1000 * 10**18
+    token.mint(alice, amount, sender=alice)
+    token.approve(vl_token.address, amount, sender=alice)
+
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(amount, now + MAXTIME + 10 * WEEK, sender=alice)
+    lock = vl_token.locked(alice)
+    kink = lock.end - MAXTIME
+
+    def indexed(ts):
+        week = ts // WEEK
+        return vl_token.slope_change_weeks(alice, week // 256) >> (week % 256) & 1
+
+    assert indexed(kink) and indexed(lock.end)
+    assert not indexed(kink + WEEK) and not indexed(lock.end - WEEK)
+
+    # the replay jumps over the weeks without change, past the old 209 weeks range
+    slope = lock.amount // MAXTIME  # the lock fee is taken from the amount
+    assert vl_token.balanceOf(alice, kink) == slope * MAXTIME
+    assert vl_token.balanceOf(alice, lock.end - WEEK) == slope * WEEK
+    assert vl_token.balanceOf(alice, now + (MAX_N_WEEKS + 10) * WEEK) == 0
+
+    # the scan shared with RewardPool returns the change found with it
+    changes = [vl_token.slope_changes(alice, ts) for ts in [kink, lock.end]]
+    assert vl_token.next_slope_change(alice, now, lock.end) == (kink, changes[0])
+    assert vl_token.next_slope_change(alice, kink, lock.end) == (lock.end, changes[1])
+    assert vl_token.next_slope_change(alice, kink, lock.end - WEEK) == (
+        lock.end - WEEK,
+        0,
+    )
+    assert vl_token.next_slope_change(alice, kink, kink + DAY) == (kink + DAY, 0)
+
+
+def test_timestamp_at_checkpoints(chain, accounts, token, vl_token, jump):
+    users = accounts[:3]
+    amount = 1000 * 10**18
+    checkpoints = []
+    for i, user in enumerate(users):
+        token.mint(user, amount, sender=user)
+        token.approve(vl_token.address, amount, sender=user)
+        # irregular block times between checkpoints
+        jump(3 + 10 * i, (i + 1) * DAY + 7 * H)
+        now = chain.blocks.head.timestamp
+        tx = vl_token.modify_lock(amount, now + (i + 1) * MAXTIME // 3, sender=user)
+        checkpoints.append(tx.block_number)
+    jump(20, 3 * WEEK)
+
+    for height in checkpoints:
+        ts = chain.blocks[height].timestamp
+        assert vl_token.timestamp_at(height) == ts
+        supply = vl_token.totalSupplyAt(height)
+        assert supply == vl_token.totalSupply(ts)
+        assert vl_token.getPriorVotes(vl_token, height) == supply
+
+    # in between checkpoints the timestamp is interpolated, never extrapolated
+    ts = vl_token.timestamp_at(checkpoints[1] - 1)
+    assert chain.blocks[checkpoints[0]].timestamp < ts
+    assert ts < chain.blocks[checkpoints[1]].timestamp
+
+
+def test_checkpoint_user(chain, accounts, token, vl_token, jump):
+    alice, keeper = accounts[0], accounts[1]
+    amount = 1000 * 10**18
+    token.mint(alice, amount, sender=alice)
+    token.approve(vl_token.address, amount, sender=alice)
+
+    now = chain.blocks.head.timestamp
+    vl_token.modify_lock(amount, now + MAXTIME + 10 * WEEK, sender=alice)
+    start = chain.blocks.head.number
+    jump(24, 15 * WEEK + 3 * DAY)
+    past = [now + i * DAY for i in range(0, 15 * 7, 5)]
+    balances = [vl_token.balanceOf(alice, ts) for ts in past]
+
+    vl_token.checkpoint_user(alice, sender=keeper)
+    assert vl_token.epoch(alice) == 2
+    week = chain.blocks.head.timestamp // WEEK * WEEK
+    point = vl_token.point_history(alice, 2)
+    assert (point.ts, point.blk) == (week, chain.blocks.head.number)
+    assert point.bias == vl_token.balanceOf(alice, week)
+    assert point.slope == vl_token.locked(alice).amount // MAXTIME  # past the kink
+    assert vl_token.week_epoch(alice, week) == 2
+    # nothing to record twice in a week, nor for users without a lock
+    vl_token.checkpoint_user(alice, sender=keeper)
+    vl_token.checkpoint_user(keeper, sender=keeper)
+    assert vl_token.epoch(alice) == 2
+    assert vl_token.epoch(keeper) == 0
+    with ape.reverts():
+        vl_token.checkpoint_user(vl_token, sender=keeper)
+
+    # lookups give the same voting power from the weekly point
+    jump(24, 2 * DAY)
+    head = chain.blocks.head
+    assert [vl_token.balanceOf(alice, ts) for ts in past] == balances
+    assert vl_token.balanceOf(alice, head.timestamp - DAY) == vl_token.balanceOf(
+        alice, week
+    ) - point.slope * (head.timestamp - DAY - week)
+    for height in range(start, head.number + 1, 4):
+        ts = vl_token.timestamp_at(height)
+        assert vl_token.getPriorVotes(alice, height) == vl_token.balanceOf(alice, ts)
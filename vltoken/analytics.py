@@ -0,0 +1,195 @@
+"""
+Weekly projections of the total supply, the unlocks and the early exit penalties.
+
+``SupplyProjection`` keeps the global point, the ``slope_changes`` schedule of
+the contract and the lock of every holder. Lock changes are applied one at a
+time, the same way the contract checkpoints them, so a long running consumer
+only pays for the new events. The curves are then evaluated over a window of
+weeks with cumulative sums::
+
+    supply(t) = bias - slope * (t - ts) - sum(d * (t - w))
+
+over the slope changes ``d`` at weeks ``w < t``, and the penalties from the
+amounts unlocking each week, weighted by the penalty ratio of ``withdraw``.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Tuple
+
+import numpy as np
+
+from vltoken.model import (
+    MAX_LOCK_DURATION,
+    MAX_PENALTY_RATIO,
+    SCALE,
+    WEEK,
+    Block,
+    LockedBalance,
+    Point,
+    VoteLockModel,
+    apply_user_points,
+    lock_slope_changes,
+    lock_to_point,
+    round_to_week,
+)
+
+LockEvent = Tuple[int, int, int, int]  # block, ts, amount, end
+
+
+def penalty_ratio(time_left: int) -> int:
+    """
+    Early exit penalty ratio of ``withdraw``, scaled by SCALE.
+    """
+    time_left = min(time_left, MAX_LOCK_DURATION)
+    return min(time_left * SCALE // MAX_LOCK_DURATION, MAX_PENALTY_RATIO)
+
+
+@dataclass
+class Curves:
+    """
+    Weekly curves, all indexed like ``weeks``.
+    """
+
+    weeks: np.ndarray  # int64 week start
+    supply: np.ndarray  # object, total voting power at the week start
+    unlocks: np.ndarray  # object, TOKEN amount of the locks ending at the week start
+    # object, penalties if every active lock exits at the week start, the penalty
+    # of the locks ending the same week is rounded once, not per lock
+    penalties: np.ndarray
+
+    def rows(self) -> Iterable[Tuple[int, int, int, int]]:
+        return zip(
+            self.weeks.tolist(),
+            self.supply.tolist(),
+            self.unlocks.tolist(),
+            self.penalties.tolist(),
+        )
+
+
+class SupplyProjection:
+    """
+    Global point, global slope change schedule and lock set of a deployment.
+
+    @param point Last global point, ``point_history(vl_token, epoch(vl_token))``
+    @param slope_changes ``slope_changes[vl_token]`` by week
+    @param locks Lock of every holder, the fee locks included
+    """
+
+    def __init__(
+        self,
+        point: Point,
+        slope_changes: Mapping[int, int],
+        locks: Mapping[str, LockedBalance],
+    ):
+        self.point = point
+        self.slope_changes: Dict[int, int] = defaultdict(int, slope_changes)
+        self.locks: Dict[str, LockedBalance] = {}
+        self.unlocks: Dict[int, int] = defaultdict(int)
+        for user, lock in locks.items():
+            self.set_lock(user, lock)
+
+    @classmethod
+    def from_model(cls, model: VoteLockModel) -> "SupplyProjection":
+        point = model.get_last_user_point(model.address)
+        return cls(point, model.slope_changes[model.address], model.locks)
+
+    def set_lock(self, user: str, lock: LockedBalance):
+        old_lock = self.locks.pop(user, LockedBalance())
+        self.unlocks[old_lock.end] -= old_lock.amount
+        if lock.amount > 0:
+            self.locks[user] = lock
+            self.unlocks[lock.end] += lock.amount
+
+    def advance(self, ts: int):
+        """
+        Move the global point to `ts`, like the weekly loop of ``_checkpoint_global``.
+        """
+        bias, slope, last_checkpoint = self.point.bias, self.point.slope, self.point.ts
+        t_i = round_to_week(last_checkpoint)
+        while last_checkpoint < ts:
+            t_i += WEEK
+            d_slope = 0
+            if t_i > ts:
+                t_i = ts
+            else:
+                d_slope = self.slope_changes.get(t_i, 0)
+            bias -= slope * (t_i - last_checkpoint)
+            slope += d_slope
+            bias = max(0, bias)
+            slope = max(0, slope)
+            last_checkpoint = t_i
+        self.point = Point(bias, slope, max(ts, self.point.ts), self.point.blk)
+
+    def apply(self, user: str, lock: LockedBalance, block: Block):
+        """
+        Apply a lock change of `user` mined in `block`, a withdrawal is an empty lock.
+        """
+        old_lock = self.locks.get(user, LockedBalance())
+        self.advance(block.timestamp)
+        for ts, d_slope in lock_slope_changes(old_lock, lock, block):
+            self.slope_changes[ts] += d_slope
+        user_points = [lock_to_point(old_lock, block), lock_to_point(lock, block)]
+        self.point = apply_user_points(self.point, user_points)
+        self.set_lock(user, lock)
+
+    def apply_events(self, histories: Mapping[str, Iterable[LockEvent]]):
+        """
+        Apply indexed lock changes, as returned by ``Indexer.lock_events``.
+        """
+        events = [
+            (block, ts, user, amount, end)
+            for user, user_events in histories.items()
+            for block, ts, amount, end in user_events
+        ]
+        for block, ts, user, amount, end in sorted(events, key=lambda e: e[:2]):
+            self.apply(user, LockedBalance(amount, end), Block(block, ts))
+
+    def curves(self, now: int, n_weeks: int = 52) -> Curves:
+        """
+        @param now Current time, the curves start at the next week
+        @param n_weeks Number of weeks to project
+        """
+        start = round_to_week(now) + WEEK
+        weeks = start + WEEK * np.arange(n_weeks, dtype=np.int64)
+
+        # slope changes strictly before each week, from the week after the point
+        first = round_to_week(self.point.ts) + WEEK
+        grid = np.arange(first, weeks[-1] + 1, WEEK, dtype=np.int64)
+        d_slope = np.array(
+            [self.slope_changes.get(w, 0) for w in grid.tolist()], dtype=object
+        )
+        d1 = np.concatenate([[0], np.cumsum(d_slope)]).astype(object)
+        d2 = np.concatenate([[0], np.cumsum(d_slope * grid.astype(object))]).astype(
+            object
+        )
+        before = np.searchsorted(grid, weeks, side="left")
+
+        t = weeks.astype(object)
+        supply = (
+            self.point.bias
+            - self.point.slope * (t - self.point.ts)
+            - (t * d1[before] - d2[before])
+        )
+        supply = np.maximum(supply, 0).astype(object)
+
+        # TOKEN unlocking each week up to the end of the longest lock
+        last_end = max([int(weeks[-1])] + [lock.end for lock in self.locks.values()])
+        horizon = np.arange(start, last_end + WEEK, WEEK, dtype=np.int64)
+        amounts = np.array(
+            [self.unlocks.get(w, 0) for w in horizon.tolist()], dtype=object
+        )
+        unlocks = amounts[:n_weeks]
+
+        # penalty of the locks ending m weeks later, the ratio is capped after m_cap
+        ratios = [penalty_ratio(m * WEEK) for m in range(MAX_LOCK_DURATION // WEEK + 1)]
+        m_cap = ratios.index(MAX_PENALTY_RATIO)
+        padded = np.concatenate([amounts, np.zeros(n_weeks + m_cap, dtype=object)])
+        cumulative = np.concatenate([[0], np.cumsum(padded)]).astype(object)
+        k = np.arange(n_weeks)
+        tail = cumulative[len(padded)] - cumulative[k + m_cap]
+        penalties = tail * MAX_PENALTY_RATIO
+        for m in range(1, m_cap):
+            penalties = penalties + padded[k + m] * ratios[m]
+        penalties = (penalties // SCALE).astype(object)
+
+        return Curves(weeks, supply, unlocks, penalties)
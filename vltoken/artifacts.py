@@ -0,0 +1,139 @@
+"""
+Content addressed cache of the compiled contract types.
+
+The cache key hashes every file under ``contracts/`` together with
+``ape-config.yaml``, the compiler pragmas and import remappings included, the
+versions of the compilers and the sources of the dependencies, so a cached
+artifact is only ever used with the exact inputs it was compiled from. A hit
+loads the ABI and bytecode from ``.cache/artifacts/<key>/<Name>.json`` without
+touching the ape project, which skips the dependency resolution and the
+compilation. A miss compiles through ``project`` once and stores the result.
+
+    ape run warm_cache
+
+fills the cache. The dependencies are not vendored, a machine that never fetched
+them into ``~/.ape/packages`` hashes to another key and compiles once.
+"""
+import hashlib
+import json
+import os
+from importlib import metadata
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import yaml
+from ape.contracts import ContractContainer
+from ethpm_types import ContractType
+
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / ".cache" / "artifacts"
+PACKAGES_DIR = Path.home() / ".ape" / "packages"  # dependencies fetched by ape
+CONTRACTS = ["VoteLockToken", "RewardPool", "Token", "Multicall3", "StorageLayout"]
+COMPILERS = ["vyper", "ape-vyper", "ape-solidity", "py-solc-x"]
+
+
+def compiler_versions() -> List[str]:
+    """
+    @return Versions of the compiler packages and of the installed solc binaries,
+        solc is picked among them from the pragmas
+    """
+    versions = []
+    for name in COMPILERS:
+        try:
+            versions.append(f"{name}=={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name} not installed")
+    try:
+        import solcx
+
+        versions += [f"solc=={v}" for v in sorted(solcx.get_installed_solc_versions())]
+    except ImportError:
+        pass
+    return versions
+
+
+def dependency_sources(root: Path = ROOT) -> List[bytes]:
+    """
+    @return Sources of the dependencies of ``ape-config.yaml``, the files of a local
+        one, the ``sources`` of the manifests of a fetched one, empty if not fetched
+    """
+    config = yaml.safe_load((root / "ape-config.yaml").read_text()) or {}
+    sources = []
+    for dependency in config.get("dependencies", []):
+        if "local" in dependency:
+            directory = root / dependency["local"]
+            paths = sorted(p for p in directory.rglob("*") if p.is_file())
+            sources += [p.relative_to(directory).as_posix().encode() for p in paths]
+            sources += [p.read_bytes() for p in paths]
+            continue
+        # the manifests also store the compiled contract types, only hash the sources
+        directory = PACKAGES_DIR / dependency["name"]
+        for path in sorted(directory.rglob("*.json")):
+            manifest = json.loads(path.read_text())
+            sources.append(json.dumps(manifest.get("sources"), sort_keys=True).encode())
+    return sources
+
+
+def source_hash(root: Path = ROOT) -> str:
+    """
+    @return sha256 of the contract sources, the project config, the compiler
+        versions and the dependency sources
+    """
+    digest = hashlib.sha256()
+    paths = sorted(p for p in (root / "contracts").rglob("*") if p.is_file())
+    for path in paths + [root / "ape-config.yaml"]:
+        digest.update(path.relative_to(root).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    for item in [v.encode() for v in compiler_versions()] + dependency_sources(root):
+        digest.update(item)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def artifact_path(name: str, key: Optional[str] = None) -> Path:
+    return CACHE_DIR / (key or source_hash()) / f"{name}.json"
+
+
+def load_contract_type(name: str, key: Optional[str] = None) -> Optional[ContractType]:
+    path = artifact_path(name, key)
+    if not path.exists():
+        return None
+    return ContractType.parse_raw(path.read_text())
+
+
+def store_contract_type(
+    name: str, contract_type: ContractType, key: Optional[str] = None
+):
+    path = artifact_path(name, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # write then rename, concurrent pytest-xdist workers may store the same key
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(contract_type.json())
+    tmp.replace(path)
+
+
+def container(name: str, key: Optional[str] = None) -> ContractContainer:
+    """
+    @return Container of the contract `name`, from the cache when the sources
+        did not change since it was stored
+    """
+    key = key or source_hash()
+    contract_type = load_contract_type(name, key)
+    if contract_type is None:
+        from ape import project
+
+        contract_type = project.get_contract(name).contract_type
+        store_contract_type(name, contract_type, key)
+    return ContractContainer(contract_type)
+
+
+def warm(names: Iterable[str] = CONTRACTS) -> List[Path]:
+    """
+    Store the artifacts of `names` for the current sources.
+    """
+    key = source_hash()
+    for name in names:
+        container(name, key)
+    return [artifact_path(name, key) for name in names]
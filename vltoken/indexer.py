@@ -0,0 +1,316 @@
+"""
+Index VoteLockToken events into SQLite and rebuild lock state from them.
+
+``ModifyLock``, ``Withdraw``, ``ExitPenalty``, ``Penalty``, ``Supply`` and
+``DelegateChanged`` logs are fetched in block range chunks. Each chunk is committed together with
+the last indexed block, so an interrupted sync resumes where it stopped.
+``Penalty`` is logged when the accumulated penalties are swept to the treasury,
+the penalty of each early exit is logged by its ``ExitPenalty``.
+
+Amounts are uint256 and are stored as decimal text, sums are taken in Python.
+The lock fee added to the collector or treasury lock emits no ``ModifyLock``,
+so those locks are not part of the rebuilt state, see ``Indexer.fee_accounts``.
+``DelegateChanged`` logs only tell which accounts take part in a delegation,
+their voting power is not the power of their own lock.
+
+The store keeps ``SCHEMA_VERSION`` in the SQLite ``user_version``. A store of
+another version, or of before the version was kept, is dropped and indexed
+again from ``start_block``: every row is derived from the logs on chain.
+"""
+import sqlite3
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from vltoken.model import WEEK
+
+SCHEMA_VERSION = 2  # bump on every change of SCHEMA
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS modify_lock (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    user TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    locktime INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS withdraw (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    user TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS exit_penalty (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    user TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS penalty (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    user TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS supply (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    old_supply TEXT NOT NULL,
+    new_supply TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS delegate_changed (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx TEXT NOT NULL,
+    delegator TEXT NOT NULL,
+    from_delegate TEXT NOT NULL,
+    to_delegate TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS locks (
+    user TEXT PRIMARY KEY,
+    amount TEXT NOT NULL,
+    end INTEGER NOT NULL,
+    block INTEGER NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS modify_lock_user ON modify_lock (user);
+CREATE INDEX IF NOT EXISTS modify_lock_ts ON modify_lock (ts);
+CREATE INDEX IF NOT EXISTS withdraw_user ON withdraw (user);
+CREATE INDEX IF NOT EXISTS withdraw_ts ON withdraw (ts);
+CREATE INDEX IF NOT EXISTS exit_penalty_ts ON exit_penalty (ts);
+CREATE INDEX IF NOT EXISTS penalty_user ON penalty (user);
+CREATE INDEX IF NOT EXISTS penalty_ts ON penalty (ts);
+CREATE INDEX IF NOT EXISTS supply_ts ON supply (ts);
+CREATE INDEX IF NOT EXISTS delegate_changed_block ON delegate_changed (block);
+CREATE INDEX IF NOT EXISTS locks_end ON locks (end);
+"""
+
+EVENTS = {
+    "ModifyLock": ("modify_lock", ["sender", "user", "amount", "locktime", "ts"]),
+    "Withdraw": ("withdraw", ["user", "amount", "ts"]),
+    "ExitPenalty": ("exit_penalty", ["user", "amount", "ts"]),
+    "Penalty": ("penalty", ["user", "amount", "ts"]),
+    "Supply": ("supply", ["old_supply", "new_supply", "ts"]),
+    "DelegateChanged": (
+        "delegate_changed",
+        ["delegator", "from_delegate", "to_delegate", "ts"],
+    ),
+}
+AMOUNT_FIELDS = {"amount", "old_supply", "new_supply"}
+
+
+class Indexer:
+    """
+    SQLite store of the events of one VoteLockToken contract.
+
+    @param vl_token ape contract instance of VoteLockToken
+    @param path SQLite database path, ":memory:" for a throwaway store
+    @param start_block First block to index, usually the deployment block
+    """
+
+    def __init__(self, vl_token, path: str, start_block: int = 0):
+        self.vl_token = vl_token
+        self.db = sqlite3.connect(path)
+        (version,) = self.db.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self._drop_tables()
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.start_block = start_block
+
+    def _drop_tables(self):
+        tables = self.db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+        with self.db:
+            for (table,) in tables:
+                self.db.execute(f"DROP TABLE {table}")
+
+    def close(self):
+        self.db.close()
+
+    @property
+    def last_block(self) -> Optional[int]:
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'last_block'"
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def sync(self, to_block: int, chunk_size: int = 2000) -> int:
+        """
+        Index events up to `to_block`, resuming after the last indexed block.
+
+        @return Number of events indexed
+        """
+        start = self.start_block if self.last_block is None else self.last_block + 1
+        n_events = 0
+        for chunk_start in range(start, to_block + 1, chunk_size):
+            chunk_stop = min(chunk_start + chunk_size - 1, to_block)
+            logs = sorted(
+                self._fetch(chunk_start, chunk_stop),
+                key=lambda log: (log.block_number, log.log_index),
+            )
+            with self.db:
+                for log in logs:
+                    self._insert(log)
+                self.db.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_block', ?)",
+                    (chunk_stop,),
+                )
+            n_events += len(logs)
+        return n_events
+
+    def _fetch(self, start: int, stop: int) -> Iterator:
+        for event_name in EVENTS:
+            # range() stops before its upper bound
+            yield from getattr(self.vl_token, event_name).range(start, stop + 1)
+
+    def _insert(self, log):
+        table, fields = EVENTS[log.event_name]
+        args = log.event_arguments
+        values = [str(args[f]) if f in AMOUNT_FIELDS else args[f] for f in fields]
+        columns = ", ".join(["block", "log_index", "tx"] + fields)
+        placeholders = ", ".join(["?"] * (len(fields) + 3))
+        self.db.execute(
+            f"INSERT OR IGNORE INTO {table} ({columns}) VALUES ({placeholders})",
+            [log.block_number, log.log_index, str(log.transaction_hash)] + values,
+        )
+
+        # replay the lock state in log order
+        if log.event_name == "ModifyLock":
+            self._set_lock(
+                args["user"],
+                args["amount"],
+                args["locktime"],
+                log.block_number,
+                args["ts"],
+            )
+        elif log.event_name == "Withdraw":
+            self._set_lock(args["user"], 0, 0, log.block_number, args["ts"])
+
+    def _set_lock(self, user: str, amount: int, end: int, block: int, ts: int):
+        self.db.execute(
+            "INSERT OR REPLACE INTO locks (user, amount, end, block, ts) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user, str(amount), end, block, ts),
+        )
+
+    # queries
+
+    def active_locks(self, ts: int) -> List[Tuple[str, int, int]]:
+        """
+        @return (user, amount, end) of every lock still active at `ts`
+        @dev
+            The fee locks of ``fee_accounts`` are missing, they change without a
+            ``ModifyLock``. Read them with ``VoteLockToken.locked``.
+        """
+        rows = self.db.execute(
+            "SELECT user, amount, end FROM locks "
+            "WHERE amount != '0' AND end > ? ORDER BY end, user",
+            (ts,),
+        )
+        return [(user, int(amount), end) for user, amount, end in rows]
+
+    def locks_expiring(self, week: int) -> List[Tuple[str, int, int]]:
+        """
+        @return (user, amount, end) of every lock ending in the week starting at `week`
+        """
+        week = week // WEEK * WEEK
+        rows = self.db.execute(
+            "SELECT user, amount, end FROM locks "
+            "WHERE amount != '0' AND end >= ? AND end < ? ORDER BY end, user",
+            (week, week + WEEK),
+        )
+        return [(user, int(amount), end) for user, amount, end in rows]
+
+    def penalties_per_week(self) -> Dict[int, int]:
+        """
+        @return Total early exit penalty paid per week start, as
+            ``VoteLockToken.penalties(week)``
+        """
+        return self._per_week("SELECT amount, ts FROM exit_penalty")
+
+    def sweeps_per_week(self) -> Dict[int, int]:
+        """
+        @return Total early exit penalty swept to the treasury per week start
+        """
+        return self._per_week("SELECT amount, ts FROM penalty")
+
+    def _per_week(self, query: str) -> Dict[int, int]:
+        totals: Dict[int, int] = defaultdict(int)
+        for amount, ts in self.db.execute(query):
+            totals[ts // WEEK * WEEK] += int(amount)
+        return dict(sorted(totals.items()))
+
+    def fee_accounts(self) -> List[str]:
+        """
+        @return Collector and treasury, whose fee locks are not indexed
+        @dev Their locks and power are read from the contract
+        """
+        return [self.vl_token.collector(), self.vl_token.treasury()]
+
+    def holders(self) -> List[str]:
+        """
+        @return Every address that ever had a lock, in order of first deposit
+        """
+        rows = self.db.execute(
+            "SELECT user FROM ("
+            "SELECT user, block, log_index, ROW_NUMBER() OVER ("
+            "PARTITION BY user ORDER BY block, log_index) AS deposit "
+            "FROM modify_lock) "
+            "WHERE deposit = 1 ORDER BY block, log_index"
+        )
+        return [user for (user,) in rows]
+
+    def delegation_accounts(self, to_block: int) -> List[str]:
+        """
+        @return Every delegator and delegate of a delegation up to `to_block`,
+            sorted. Their power is read from the contract, not from their lock.
+        """
+        rows = self.db.execute(
+            "SELECT delegator FROM delegate_changed WHERE block <= ? "
+            "UNION SELECT to_delegate FROM delegate_changed WHERE block <= ? "
+            "ORDER BY 1",
+            (to_block, to_block),
+        )
+        return [user for (user,) in rows]
+
+    def lock_events(self, to_block: int) -> Dict[str, List[Tuple[int, int, int, int]]]:
+        """
+        @return (block, ts, amount, end) of every lock change up to `to_block` per
+            user, in log order. A withdrawal is a change to an empty lock.
+        @dev The changes of the fee locks of ``fee_accounts`` are missing
+        """
+        rows = self.db.execute(
+            "SELECT block, log_index, user, ts, amount, locktime FROM modify_lock "
+            "WHERE block <= ? "
+            "UNION ALL "
+            "SELECT block, log_index, user, ts, '0', 0 FROM withdraw "
+            "WHERE block <= ? "
+            "ORDER BY block, log_index",
+            (to_block, to_block),
+        )
+        events: Dict[str, List[Tuple[int, int, int, int]]] = defaultdict(list)
+        for block, _, user, ts, amount, end in rows:
+            events[user].append((block, ts, int(amount), end))
+        return dict(events)
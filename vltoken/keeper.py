@@ -0,0 +1,295 @@
+"""
+Keeper paying the weekly catch-up of the global history at low gas prices.
+
+``_checkpoint_global`` records one point per week elapsed since the last
+global point, each one a fresh ``SSTORE``. Whoever calls the contract first
+after an idle period pays for the whole backlog, at most ``MAX_CATCHUP_WEEKS``
+weeks for a user action, the weeks over it are left behind the global point
+until a checkpoint records them. The keeper watches ``recorded_week()``, the
+last week every weekly point is recorded up to, and the base fee of the head
+block, and calls ``checkpoint()`` itself:
+
+- as soon as there is a backlog and the base fee is at most ``max_base_fee``,
+- at any base fee once the backlog reaches ``urgent_weeks``, before a user
+  action would leave weeks behind.
+
+A backlog longer than ``max_weeks_per_tx`` is caught up with
+``checkpoint_partial`` over several transactions, so no transaction hits the
+block gas limit.
+
+State is read from storage, see ``vltoken.storage``, and transactions are
+sent by a ``Submit`` coroutine. ``rpc_submitter`` sends them with
+``eth_sendTransaction`` from an account unlocked on the node, which is all a
+local anvil needs; ``anvil_jump`` and ``anvil_set_base_fee`` move its clock and
+base fee, so the keeper runs end to end against simulated idle weeks.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Optional
+
+from aiohttp import web
+from eth_abi import encode
+from eth_utils import function_signature_to_4byte_selector
+
+from vltoken.model import MAX_CATCHUP_WEEKS, WEEK, round_to_week
+from vltoken.multicall import VoteLockClient
+from vltoken.storage import StorageReader
+
+log = logging.getLogger(__name__)
+COUNTERS = {
+    "checkpoints",
+    "weeks_caught_up",
+    "gas_used",
+    "fees_paid",
+    "deferred_polls",
+    "failed_checkpoints",
+}
+
+
+@dataclass(frozen=True)
+class Receipt:
+    block_number: int
+    timestamp: int
+    gas_used: int
+    gas_price: int  # effective gas price, wei
+
+
+# max weeks caught up -> receipt of the mined transaction, 0 catches up everything
+Submit = Callable[[int], Awaitable[Receipt]]
+
+
+@dataclass(frozen=True)
+class Head:
+    number: int
+    timestamp: int
+    base_fee: int
+    recorded_week: int  # every global weekly point up to this week is recorded
+
+    @property
+    def backlog_weeks(self) -> int:
+        """
+        @return Weeks started since the last recorded week, each one a point to record
+        """
+        return (round_to_week(self.timestamp) - self.recorded_week) // WEEK
+
+
+@dataclass(frozen=True)
+class Policy:
+    """
+    @param max_base_fee Base fee, in wei, under which any backlog is caught up
+    @param urgent_weeks Backlog caught up whatever the base fee
+    @param max_weeks_per_tx Weeks caught up per transaction
+    """
+
+    max_base_fee: int
+    urgent_weeks: int = MAX_CATCHUP_WEEKS
+    max_weeks_per_tx: int = 52
+
+    def weeks_to_checkpoint(self, backlog_weeks: int, base_fee: int) -> int:
+        """
+        @return Weeks to catch up in the next transaction, 0 to wait
+        """
+        if backlog_weeks == 0:
+            return 0
+        if base_fee > self.max_base_fee and backlog_weeks < self.urgent_weeks:
+            return 0
+        return min(backlog_weeks, self.max_weeks_per_tx)
+
+
+@dataclass
+class Metrics:
+    """
+    Counters and gauges of the keeper, exported in the Prometheus text format.
+    """
+
+    backlog_weeks: int = 0
+    base_fee: int = 0
+    checkpoints: int = 0
+    weeks_caught_up: int = 0
+    gas_used: int = 0
+    fees_paid: int = 0
+    deferred_polls: int = 0  # polls with a backlog left for a lower base fee
+    failed_checkpoints: int = 0
+    # chain seconds from the start of the first unrecorded week to its checkpoint
+    backlog_latency: int = 0
+    # wall clock seconds from the submission of the last checkpoint to its receipt
+    tx_latency: float = 0.0
+
+    def to_prometheus(self, prefix: str = "vltoken_keeper") -> str:
+        lines = []
+        for key, value in asdict(self).items():
+            kind = "counter" if key in COUNTERS else "gauge"
+            name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+            lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class Keeper:
+    """
+    Polls the head of the chain and checkpoints the global history per `policy`.
+
+    @param client Client of the VoteLockToken contract
+    @param submit Sends a checkpoint and waits for its receipt
+    @param policy When to checkpoint
+    @param interval Seconds between polls
+    """
+
+    def __init__(
+        self,
+        client: VoteLockClient,
+        submit: Submit,
+        policy: Policy,
+        interval: float = 60.0,
+    ):
+        self.client = client
+        self.submit = submit
+        self.policy = policy
+        self.interval = interval
+        self.reader = StorageReader(client)
+        self.metrics = Metrics()
+
+    async def head(self) -> Head:
+        (block,) = await self.client.request(
+            [("eth_getBlockByNumber", ["latest", False])]
+        )
+        number = int(block["number"], 16)
+        return Head(
+            number,
+            int(block["timestamp"], 16),
+            int(block.get("baseFeePerGas", "0x0"), 16),
+            await self.reader.recorded_week(number),
+        )
+
+    async def step(self) -> Optional[Receipt]:
+        """
+        Poll once, checkpoint if the policy says so.
+
+        @return Receipt of the checkpoint, None if there was none
+        """
+        head = await self.head()
+        backlog = head.backlog_weeks
+        self.metrics.backlog_weeks = backlog
+        self.metrics.base_fee = head.base_fee
+        weeks = self.policy.weeks_to_checkpoint(backlog, head.base_fee)
+        if weeks == 0:
+            if backlog > 0:
+                self.metrics.deferred_polls += 1
+            return None
+
+        start = time.monotonic()
+        try:
+            receipt = await self.submit(0 if weeks == backlog else weeks)
+        except Exception:
+            self.metrics.failed_checkpoints += 1
+            raise
+        self.metrics.tx_latency = time.monotonic() - start
+
+        first_week = head.recorded_week + WEEK
+        self.metrics.checkpoints += 1
+        self.metrics.weeks_caught_up += weeks
+        self.metrics.gas_used += receipt.gas_used
+        self.metrics.fees_paid += receipt.gas_used * receipt.gas_price
+        self.metrics.backlog_latency = receipt.timestamp - first_week
+        self.metrics.backlog_weeks = backlog - weeks
+        return receipt
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """
+        Poll every `interval` seconds until `stop` is set. A failed poll is
+        counted and retried at the next one.
+        """
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                receipt = await self.step()
+            except Exception:
+                log.exception("poll failed")
+                receipt = None
+            # a partial catch-up continues right away
+            delay = 0 if receipt and self.metrics.backlog_weeks > 0 else self.interval
+            try:
+                await asyncio.wait_for(stop.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+def encode_checkpoint(max_weeks: int) -> bytes:
+    """
+    @return Calldata of ``checkpoint()``, or ``checkpoint_partial(max_weeks)``
+    """
+    if max_weeks == 0:
+        return function_signature_to_4byte_selector("checkpoint()")
+    selector = function_signature_to_4byte_selector("checkpoint_partial(uint256)")
+    return selector + encode(["uint256"], [max_weeks])
+
+
+def rpc_submitter(
+    client: VoteLockClient, sender: str, poll_interval: float = 1.0
+) -> Submit:
+    """
+    @param sender Account unlocked on the node, as the accounts of anvil
+    @return Submit sending the checkpoint with ``eth_sendTransaction``
+    """
+
+    async def submit(max_weeks: int) -> Receipt:
+        tx = {
+            "from": sender,
+            "to": client.vl_token,
+            "data": "0x" + encode_checkpoint(max_weeks).hex(),
+        }
+        (tx_hash,) = await client.request([("eth_sendTransaction", [tx])])
+        while True:
+            (receipt,) = await client.request(
+                [("eth_getTransactionReceipt", [tx_hash])]
+            )
+            if receipt is not None:
+                break
+            await asyncio.sleep(poll_interval)
+        if int(receipt["status"], 16) != 1:
+            raise RuntimeError(f"checkpoint {tx_hash} reverted")
+        (block,) = await client.request(
+            [("eth_getBlockByNumber", [receipt["blockNumber"], False])]
+        )
+        return Receipt(
+            int(receipt["blockNumber"], 16),
+            int(block["timestamp"], 16),
+            int(receipt["gasUsed"], 16),
+            int(receipt["effectiveGasPrice"], 16),
+        )
+
+    return submit
+
+
+async def anvil_jump(client: VoteLockClient, seconds: int, blocks: int = 1):
+    """
+    Mines `blocks` blocks spread over `seconds` on anvil.
+    """
+    await client.request([("anvil_mine", [hex(blocks), hex(seconds // blocks)])])
+
+
+async def anvil_set_base_fee(client: VoteLockClient, base_fee: int):
+    """
+    Sets the base fee of the next block on anvil and mines it.
+    """
+    await client.request([("anvil_setNextBlockBaseFeePerGas", [hex(base_fee)])])
+    await client.request([("evm_mine", [])])
+
+
+async def serve_metrics(metrics: Metrics, port: int) -> web.AppRunner:
+    """
+    Serves ``GET /metrics`` in the Prometheus text format on `port`.
+
+    @return Runner to ``cleanup()`` on exit
+    """
+
+    async def handle(request):
+        return web.Response(text=metrics.to_prometheus(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, port=port).start()
+    return runner
@@ -0,0 +1,714 @@
+"""
+Reference model of ``contracts/VoteLockToken.vy``.
+
+The model mirrors the checkpoint math of the contract with the same integer
+semantics, so its views return exactly what the contract returns for the same
+history of actions. Functions keep the names of their contract counterpart.
+
+Every action takes the ``Block`` it is mined in, views take the current block
+the same way an ``eth_call`` does.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DAY = 86400
+WEEK = 7 * DAY  # all future times are rounded by week
+MAX_LOCK_DURATION = 1 * 365 * 86400 // WEEK * WEEK  # 1 year
+SCALE = 10**18
+MAX_PENALTY_RATIO = SCALE * 3 // 4  # 75% for early exit of max lock
+MAX_N_WEEKS = 209
+MAX_CHECKPOINT_WEEKS = 255
+MAX_CATCHUP_WEEKS = 4
+MAX_BATCH_SIZE = 256
+MAX_INDEX_WORDS = 4  # words of 256 weeks scanned for the next slope change
+FEE = 1
+
+
+class Revert(Exception):
+    """
+    Raised where the contract reverts. The model state is left untouched.
+    """
+
+
+@dataclass(frozen=True)
+class Block:
+    number: int
+    timestamp: int
+
+
+@dataclass(frozen=True)
+class Point:
+    bias: int = 0
+    slope: int = 0  # - dweight / dt
+    ts: int = 0
+    blk: int = 0
+
+
+@dataclass(frozen=True)
+class LockedBalance:
+    amount: int = 0
+    end: int = 0
+
+
+@dataclass(frozen=True)
+class Kink:
+    slope: int = 0
+    ts: int = 0
+
+
+@dataclass(frozen=True)
+class Withdrawn:
+    amount: int
+    penalty: int
+
+
+def round_to_week(ts: int) -> int:
+    return ts // WEEK * WEEK
+
+
+def lock_to_point(lock: LockedBalance, block: Block) -> Point:
+    point = Point(ts=block.timestamp, blk=block.number)
+    if lock.amount > 0:
+        slope = lock.amount // MAX_LOCK_DURATION
+        # the lock is longer than the max duration
+        if lock.end > block.timestamp + MAX_LOCK_DURATION:
+            point = replace(point, slope=0, bias=slope * MAX_LOCK_DURATION)
+        # the lock ends in the future but shorter than max duration
+        elif lock.end > block.timestamp:
+            bias = slope * (lock.end - block.timestamp)
+            point = replace(point, slope=slope, bias=bias)
+    return point
+
+
+def lock_to_kink(lock: LockedBalance, block: Block) -> Kink:
+    # the lock is longer than the max duration
+    max_end = round_to_week(block.timestamp + MAX_LOCK_DURATION)
+    if lock.amount > 0 and lock.end > max_end:
+        return Kink(
+            slope=lock.amount // MAX_LOCK_DURATION,
+            ts=round_to_week(lock.end - MAX_LOCK_DURATION),
+        )
+    return Kink()
+
+
+def lock_slope_changes(
+    old_lock: LockedBalance, new_lock: LockedBalance, block: Block
+) -> List[Tuple[int, int]]:
+    """
+    (week, slope change) scheduled when a lock changes from `old_lock` to `new_lock`.
+    """
+    old_point = lock_to_point(old_lock, block)
+    new_point = lock_to_point(new_lock, block)
+
+    old_kink = lock_to_kink(old_lock, block)
+    new_kink = lock_to_kink(new_lock, block)
+
+    changes = []
+    # schedule slope changes for the lock end
+    if old_point.slope != 0 and old_lock.end > block.timestamp:
+        changes.append((old_lock.end, old_point.slope))
+    if new_point.slope != 0 and new_lock.end > block.timestamp:
+        changes.append((new_lock.end, -new_point.slope))
+
+    # schedule kinks for locks longer than max duration
+    if old_kink.slope != 0:
+        changes.append((old_kink.ts, -old_kink.slope))
+        changes.append((old_lock.end, old_kink.slope))
+    if new_kink.slope != 0:
+        changes.append((new_kink.ts, new_kink.slope))
+        changes.append((new_lock.end, -new_kink.slope))
+    return changes
+
+
+class VoteLockModel:
+    """
+    In-memory state of a VoteLockToken deployment.
+
+    ``address`` is the key of the global history, the address of the contract.
+    """
+
+    def __init__(self, address: str, treasury: str, collector: str, block: Block):
+        self.address = address
+        self.treasury = treasury
+        self.collector = collector
+        self.collector_active = True
+        self.pending_fees = 0
+        self.last_fee_flush = 0
+        self.pending_penalties = 0
+        self.penalties: Dict[int, int] = defaultdict(int)
+        self.delegated: Dict[str, str] = {}
+
+        self.supply = 0
+        self.locks: Dict[str, LockedBalance] = defaultdict(LockedBalance)
+        self.epoch: Dict[str, int] = defaultdict(int)
+        self.points: Dict[str, Dict[int, Point]] = defaultdict(dict)
+        self.slope_changes: Dict[str, Dict[int, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.week_epoch: Dict[str, Dict[int, int]] = defaultdict(dict)
+        # global weeks left behind by a user action, recorded by later checkpoints
+        self.recorded_week = round_to_week(block.timestamp)
+        self.week_points: Dict[int, Point] = {}
+        # (epoch, blk, ts) of the real global checkpoints, one per block
+        self.block_checkpoints: List[Tuple[int, int, int]] = [
+            (0, block.number, block.timestamp)
+        ]
+
+        self.points[address][0] = Point(ts=block.timestamp, blk=block.number)
+
+    # getters
+
+    def locked(self, user: str) -> LockedBalance:
+        return self.locks[user]
+
+    def point_history(self, user: str, epoch: int) -> Point:
+        return self.points[user].get(epoch, Point())
+
+    def get_last_user_point(self, user: str) -> Point:
+        return self.point_history(user, self.epoch[user])
+
+    def vote_key(self, account: str) -> str:
+        """
+        Key of the vote history of `account`, the contract derives an address
+        instead, see ``vltoken.storage.vote_key``.
+        """
+        return f"{account}:votes"
+
+    # checkpoints
+
+    def _checkpoint_user(
+        self, user: str, old_lock: LockedBalance, new_lock: LockedBalance, block: Block
+    ) -> List[Point]:
+        old_point = lock_to_point(old_lock, block)
+        new_point = lock_to_point(new_lock, block)
+
+        for ts, d_slope in lock_slope_changes(old_lock, new_lock, block):
+            self.slope_changes[self.address][ts] += d_slope
+            self.slope_changes[user][ts] += d_slope
+
+        self.epoch[user] += 1
+        self.points[user][self.epoch[user]] = new_point
+        return [old_point, new_point]
+
+    def _checkpoint_global(self, until: int, max_writes: int, block: Block) -> Point:
+        last_point = Point(ts=block.timestamp, blk=block.number)
+        epoch = self.epoch[self.address]
+        if epoch > 0:
+            last_point = self.point_history(self.address, epoch)
+        else:
+            self.recorded_week = round_to_week(block.timestamp)
+        last_checkpoint = last_point.ts
+
+        bias, slope = last_point.bias, last_point.slope
+        t_i = round_to_week(last_checkpoint)
+        blk = last_point.blk
+        for i in range(MAX_CHECKPOINT_WEEKS):
+            t_i += WEEK
+            d_slope = 0
+            if t_i > until:
+                t_i = until
+            else:
+                d_slope = self.slope_changes[self.address].get(t_i, 0)
+            bias -= slope * (t_i - last_checkpoint)
+            slope += d_slope
+            bias = max(0, bias)  # this can happen
+            slope = max(0, slope)  # this shouldn't happen
+            last_checkpoint = t_i
+            if t_i == until:
+                # the point at the start of a week is its weekly point
+                if self.recorded_week + WEEK == t_i:
+                    self.recorded_week = t_i
+                break
+            # weeks over the limit are applied, but left behind the returned point
+            if i < max_writes:
+                epoch += 1
+                self.points[self.address][epoch] = Point(bias, slope, t_i, blk)
+                self.week_epoch[self.address][t_i] = epoch
+                if self.recorded_week + WEEK == t_i:
+                    self.recorded_week = t_i
+
+        if until == block.timestamp:
+            blk = block.number
+
+        self.epoch[self.address] = epoch + 1
+        return Point(bias, slope, last_checkpoint, blk)
+
+    def record_weeks_behind(self, max_weeks: int) -> int:
+        max_epoch = self.epoch[self.address]
+        last_week = round_to_week(self.point_history(self.address, max_epoch).ts)
+        week = self.recorded_week
+        if week >= last_week:
+            return 0
+
+        epoch = self._find_epoch_by_timestamp(self.address, week, max_epoch)
+        point = self.point_history(self.address, epoch)
+        if point.ts < week:
+            if week in self.week_points:
+                point = self.week_points[week]
+            else:
+                point = self.replay_slope_changes(self.address, point, week)
+                slope = point.slope + self.slope_changes[self.address].get(week, 0)
+                point = replace(point, slope=slope, ts=week)
+
+        weeks = 0
+        while week < last_week and weeks < max_weeks:
+            week += WEEK
+            weeks += 1
+            if epoch < max_epoch:
+                if self.point_history(self.address, epoch + 1).ts <= week:
+                    epoch = self._find_epoch_by_timestamp(self.address, week, max_epoch)
+                    point = self.point_history(self.address, epoch)
+            if point.ts < week:
+                bias = max(0, point.bias - point.slope * (week - point.ts))
+                slope = point.slope + self.slope_changes[self.address].get(week, 0)
+                point = replace(point, bias=bias, slope=max(0, slope), ts=week)
+                self.week_points[week] = point
+
+        self.recorded_week = week
+        return weeks
+
+    def _store_global(self, point: Point, block: Block):
+        epoch = self.epoch[self.address]
+        self.points[self.address][epoch] = point
+        if point.ts != block.timestamp:
+            return
+        if self.block_checkpoints[-1][1] == block.number:
+            self.block_checkpoints.pop()
+        self.block_checkpoints.append((epoch, block.number, block.timestamp))
+
+    def _checkpoint(
+        self,
+        user: Optional[str],
+        old_lock: LockedBalance,
+        new_lock: LockedBalance,
+        block: Block,
+    ):
+        user_points = [Point(), Point()]
+        if user is not None:
+            user_points = self._checkpoint_user(user, old_lock, new_lock, block)
+
+        last_point = self._checkpoint_global(block.timestamp, MAX_CATCHUP_WEEKS, block)
+        if user is not None:
+            last_point = apply_user_points(last_point, user_points)
+        self._store_global(last_point, block)
+
+    def _checkpoint_votes(
+        self, key: str, old_lock: LockedBalance, new_lock: LockedBalance, block: Block
+    ):
+        point = Point(ts=block.timestamp, blk=block.number)
+        epoch = self.epoch[key]
+        if epoch > 0:
+            last_point = self.point_history(key, epoch)
+            point = self.replay_slope_changes(key, last_point, block.timestamp)
+            # a point at a week start includes the slope change of the week
+            if last_point.ts < block.timestamp and block.timestamp % WEEK == 0:
+                point = replace(
+                    point,
+                    slope=point.slope + self.slope_changes[key].get(block.timestamp, 0),
+                )
+
+        for ts, d_slope in lock_slope_changes(old_lock, new_lock, block):
+            self.slope_changes[key][ts] += d_slope
+
+        user_points = [lock_to_point(old_lock, block), lock_to_point(new_lock, block)]
+        point = apply_user_points(point, user_points)
+        epoch += 1
+        self.epoch[key] = epoch
+        self.points[key][epoch] = replace(point, ts=block.timestamp, blk=block.number)
+
+    def init_votes(self, account: str, key: str, block: Block):
+        if self.epoch[key] != 0:
+            return
+        lock = LockedBalance()
+        if account not in self.delegated:
+            lock = self.locks[account]
+        self._checkpoint_votes(key, LockedBalance(), lock, block)
+
+    def _checkpoint_delegate(
+        self, user: str, old_lock: LockedBalance, new_lock: LockedBalance, block: Block
+    ):
+        key = self.vote_key(self.delegated.get(user, user))
+        if self.epoch[key] != 0:
+            self._checkpoint_votes(key, old_lock, new_lock, block)
+
+    def _flush_fees(self, block: Block):
+        self.last_fee_flush = block.timestamp
+        fee = self.pending_fees
+        if fee == 0:
+            return
+        self.pending_fees = 0
+
+        lock_fee_address = self.collector if self.collector_active else self.treasury
+        old_lock = self.locks[lock_fee_address]
+        new_lock = LockedBalance(
+            amount=old_lock.amount + fee,
+            end=round_to_week(block.timestamp + MAX_LOCK_DURATION // 4),
+        )
+        self.locks[lock_fee_address] = new_lock
+        self._checkpoint(lock_fee_address, old_lock, new_lock, block)
+        self._checkpoint_delegate(lock_fee_address, old_lock, new_lock, block)
+
+    def _charge_fee(self, fee: int, block: Block):
+        self.pending_fees += fee
+        if self.last_fee_flush < round_to_week(block.timestamp):
+            self._flush_fees(block)
+
+    # actions
+
+    def checkpoint(self, block: Block):
+        weeks = self.record_weeks_behind(MAX_CHECKPOINT_WEEKS)
+        last_point = self._checkpoint_global(
+            block.timestamp, MAX_CHECKPOINT_WEEKS - weeks, block
+        )
+        self._store_global(last_point, block)
+
+    def checkpoint_partial(self, max_weeks: int, block: Block) -> int:
+        if max_weeks == 0:
+            raise Revert("must catch up at least one week")
+        weeks = min(max_weeks, MAX_CHECKPOINT_WEEKS)
+        weeks -= self.record_weeks_behind(weeks)
+        if weeks == 0:
+            return self.recorded_week
+
+        until = block.timestamp
+        epoch = self.epoch[self.address]
+        if epoch > 0:
+            last_ts = self.point_history(self.address, epoch).ts
+            until = min(round_to_week(last_ts) + weeks * WEEK, block.timestamp)
+
+        last_point = self._checkpoint_global(until, weeks, block)
+        self._store_global(last_point, block)
+        if until < block.timestamp:
+            self.week_epoch[self.address][until] = self.epoch[self.address]
+        return until
+
+    def checkpoint_user(self, user: str, block: Block) -> int:
+        if user == self.address:
+            raise Revert("not a user")
+        self._checkpoint(None, LockedBalance(), LockedBalance(), block)
+
+        epoch = self.epoch[user]
+        week = round_to_week(block.timestamp)
+        if epoch == 0:
+            return 0
+        point = self.point_history(user, epoch)
+        if point.ts >= week:
+            return epoch
+
+        point = self.replay_slope_changes(user, point, week)
+        slope = point.slope + self.slope_changes[user].get(week, 0)
+        epoch += 1
+        self.epoch[user] = epoch
+        self.points[user][epoch] = Point(point.bias, slope, week, block.number)
+        self.week_epoch[user][week] = epoch
+        return epoch
+
+    def modify_lock(
+        self,
+        sender: str,
+        amount: int,
+        unlock_time: int,
+        block: Block,
+        user: Optional[str] = None,
+    ) -> LockedBalance:
+        user = sender if user is None else user
+        old_lock = self.locks[user]
+        amount_add = amount * (100 - FEE) // 100
+        new_end = old_lock.end
+
+        unlock_week = 0
+        # only a user can modify their own unlock time
+        if sender == user and unlock_time != 0:
+            # locktime is rounded down to weeks
+            unlock_week = round_to_week(unlock_time)
+            if unlock_week <= block.timestamp:
+                raise Revert("unlock time must be in the future")
+            if (unlock_week - round_to_week(block.timestamp)) // WEEK >= MAX_N_WEEKS:
+                raise Revert("lock can't exceed 4 years")
+            if unlock_week - block.timestamp < MAX_LOCK_DURATION:
+                if unlock_week <= old_lock.end:
+                    raise Revert("can only increase lock duration")
+            elif unlock_week <= block.timestamp + MAX_LOCK_DURATION:
+                raise Revert("can only decrease to max duration")
+            new_end = unlock_week
+
+        # create lock
+        if old_lock.amount == 0 and old_lock.end == 0:
+            if sender != user:
+                raise Revert("you can only create a lock for yourself")
+            if amount < 10**18:
+                raise Revert("minimum amount is 1 TOKEN")
+            if unlock_week == 0:
+                raise Revert("must specify unlock time in the future")
+        # modify lock
+        elif old_lock.end <= block.timestamp:
+            raise Revert("lock expired")
+
+        new_lock = LockedBalance(amount=old_lock.amount + amount_add, end=new_end)
+        self.supply += amount
+        self.locks[user] = new_lock
+        self._checkpoint(user, old_lock, new_lock, block)
+        self._checkpoint_delegate(user, old_lock, new_lock, block)
+
+        if amount > 0:
+            self._charge_fee(amount - amount_add, block)
+        return new_lock
+
+    def modify_lock_many(
+        self, sender: str, users: Sequence[str], amounts: Sequence[int], block: Block
+    ):
+        if len(users) != len(amounts):
+            raise Revert("length mismatch")
+        if len(users) > MAX_BATCH_SIZE:
+            raise Revert("batch too large")
+        for user, amount in zip(users, amounts):
+            if amount == 0:
+                raise Revert("nothing to deposit")
+            if self.locks[user].end <= block.timestamp:
+                raise Revert("lock expired")
+
+        last_point = self._checkpoint_global(block.timestamp, MAX_CATCHUP_WEEKS, block)
+        total = 0
+        fee = 0
+        for user, amount in zip(users, amounts):
+            old_lock = self.locks[user]
+            amount_add = amount * (100 - FEE) // 100
+            new_lock = replace(old_lock, amount=old_lock.amount + amount_add)
+            self.locks[user] = new_lock
+            user_points = self._checkpoint_user(user, old_lock, new_lock, block)
+            last_point = apply_user_points(last_point, user_points)
+            self._checkpoint_delegate(user, old_lock, new_lock, block)
+            total += amount
+            fee += amount - amount_add
+        self._store_global(last_point, block)
+
+        self.supply += total
+        self._charge_fee(fee, block)
+
+    def flush_fees(self, block: Block):
+        self._flush_fees(block)
+
+    def removeCollector(self, sender: str, block: Block):
+        if sender != self.collector:
+            raise Revert("only collector")
+        if self.collector_active:
+            self._flush_fees(block)
+        self.collector_active = False
+
+    def withdraw(self, sender: str, block: Block) -> Withdrawn:
+        old_lock = self.locks[sender]
+        if old_lock.amount == 0:
+            raise Revert("create a lock first to withdraw")
+
+        penalty = 0
+        if old_lock.end > block.timestamp:
+            time_left = min(old_lock.end - block.timestamp, MAX_LOCK_DURATION)
+            penalty_ratio = min(
+                time_left * SCALE // MAX_LOCK_DURATION, MAX_PENALTY_RATIO
+            )
+            penalty = old_lock.amount * penalty_ratio // SCALE
+
+        zero_lock = LockedBalance()
+        self.locks[sender] = zero_lock
+        self.supply -= old_lock.amount
+        self._checkpoint(sender, old_lock, zero_lock, block)
+        self._checkpoint_delegate(sender, old_lock, zero_lock, block)
+        if penalty > 0:
+            self.pending_penalties += penalty
+            self.penalties[round_to_week(block.timestamp)] += penalty
+        return Withdrawn(amount=old_lock.amount - penalty, penalty=penalty)
+
+    def sweep_penalties(self) -> int:
+        amount = self.pending_penalties
+        self.pending_penalties = 0
+        return amount
+
+    def delegate(self, sender: str, to: Optional[str], block: Block):
+        if to == self.address:
+            raise Revert("can't delegate to the contract")
+        old_account = self.delegated.get(sender, sender)
+        new_account = sender if to is None else to
+        if new_account == old_account:
+            return
+
+        old_key = self.vote_key(old_account)
+        new_key = self.vote_key(new_account)
+        self.init_votes(old_account, old_key, block)
+        self.init_votes(new_account, new_key, block)
+
+        lock = self.locks[sender]
+        self._checkpoint_votes(old_key, lock, LockedBalance(), block)
+        if new_account == sender:
+            self.delegated.pop(sender, None)
+        else:
+            self.delegated[sender] = new_account
+        self._checkpoint_votes(new_key, LockedBalance(), lock, block)
+
+    # views
+
+    def find_epoch_by_block(self, user: str, height: int, max_epoch: int) -> int:
+        _min, _max = 0, max_epoch
+        while _min < _max:
+            _mid = (_min + _max + 1) // 2
+            if self.point_history(user, _mid).blk <= height:
+                _min = _mid
+            else:
+                _max = _mid - 1
+        return _min
+
+    def _find_epoch_by_timestamp(self, user: str, ts: int, max_epoch: int) -> int:
+        _min, _max = 0, max_epoch
+        while _min < _max:
+            _mid = (_min + _max + 1) // 2
+            if self.point_history(user, _mid).ts <= ts:
+                _min = _mid
+            else:
+                _max = _mid - 1
+        return _min
+
+    def find_epoch_by_timestamp(self, user: str, ts: int) -> int:
+        return self._find_epoch_by_timestamp(user, ts, self.epoch[user])
+
+    def find_week_epoch(self, user: str, ts: int, height: int, max_epoch: int) -> int:
+        epoch = self.week_epoch[user].get(round_to_week(ts), 0)
+        if epoch == 0 or self.point_history(user, epoch).blk > height:
+            return 0
+        if epoch < max_epoch:
+            next_point = self.point_history(user, epoch + 1)
+            if next_point.ts <= ts and next_point.blk <= height:
+                return 0
+        return epoch
+
+    def next_slope_change(self, user: str, ts: int, until: int) -> int:
+        """
+        Like the contract, only ``MAX_INDEX_WORDS`` words of the bitmap index are
+        scanned, a change further away is not found and `until` is returned.
+        """
+        week = ts // WEEK + 1
+        last_week = min(((week >> 8) + MAX_INDEX_WORDS) << 8, -(-until // WEEK))
+        weeks = [t // WEEK for t in self.slope_changes[user]]
+        found = [w for w in weeks if week <= w < last_week]
+        return min(min(found) * WEEK, until) if found else until
+
+    def replay_slope_changes(self, user: str, point: Point, ts: int) -> Point:
+        bias, slope, upoint_ts = point.bias, point.slope, point.ts
+        changes = self.slope_changes[user]
+        # jump between the weeks with a scheduled change, as many as the contract
+        t_i = round_to_week(upoint_ts)
+        for _ in range(MAX_N_WEEKS + 1):
+            t_i = self.next_slope_change(user, t_i, ts)
+            if t_i < upoint_ts:
+                raise Revert("timestamp before point")
+            bias -= slope * (t_i - upoint_ts)
+            if t_i == ts:
+                break
+            slope += changes[t_i]
+            upoint_ts = t_i
+        return replace(point, bias=max(0, bias), slope=slope, ts=upoint_ts)
+
+    def _balanceOf(self, user: str, ts: int, block: Block) -> int:
+        epoch = self.epoch[user]
+        if epoch == 0:
+            return 0
+        if ts != block.timestamp:
+            week_epoch = self.find_week_epoch(user, ts, block.number, epoch)
+            if week_epoch != 0:
+                epoch = week_epoch
+            else:
+                epoch = self._find_epoch_by_timestamp(user, ts, epoch)
+        upoint = self.point_history(user, epoch)
+        return self.replay_slope_changes(user, upoint, ts).bias
+
+    def balanceOf(self, user: str, block: Block, ts: Optional[int] = None) -> int:
+        return self._balanceOf(user, block.timestamp if ts is None else ts, block)
+
+    def balanceOfMany(
+        self, users: Sequence[str], block: Block, ts: Optional[int] = None
+    ) -> List[int]:
+        return [self.balanceOf(user, block, ts) for user in users]
+
+    def find_block_checkpoint(self, height: int) -> int:
+        blocks = [blk for _, blk, _ in self.block_checkpoints]
+        return max(bisect_right(blocks, height) - 1, 0)
+
+    def _block_time(self, index: int, height: int, block: Block) -> int:
+        _, blk_0, ts_0 = self.block_checkpoints[index]
+        blk_1, ts_1 = block.number, block.timestamp
+        if index < len(self.block_checkpoints) - 1:
+            _, blk_1, ts_1 = self.block_checkpoints[index + 1]
+        if blk_1 == blk_0:
+            return ts_0
+        if height < blk_0:
+            raise Revert("block before deployment")
+        return ts_0 + (ts_1 - ts_0) * (height - blk_0) // (blk_1 - blk_0)
+
+    def timestamp_at(self, height: int, block: Block) -> int:
+        if height > block.number:
+            raise Revert("block in the future")
+        return self._block_time(self.find_block_checkpoint(height), height, block)
+
+    def supply_at(self, index: int, ts: int) -> int:
+        epoch = self.block_checkpoints[index][0]
+        week_epoch = self.week_epoch[self.address].get(round_to_week(ts), 0)
+        if week_epoch > epoch:
+            if ts % WEEK == 0:
+                return self.point_history(self.address, week_epoch).bias
+            epoch = week_epoch
+        point = self.point_history(self.address, epoch)
+        return self.replay_slope_changes(self.address, point, ts).bias
+
+    def _getPriorVotes(
+        self, user: str, height: int, index: int, block_time: int
+    ) -> int:
+        if user == self.address:
+            return self.supply_at(index, block_time)
+        # the vote history replaces the lock history from its start
+        key = self.vote_key(user)
+        if self.epoch[key] == 0 or self.point_history(key, 1).blk > height:
+            key = user
+        uepoch = self.epoch[key]
+        week_epoch = self.find_week_epoch(key, block_time, height, uepoch)
+        if week_epoch != 0:
+            uepoch = week_epoch
+        else:
+            uepoch = self.find_epoch_by_block(key, height, uepoch)
+        upoint = self.point_history(key, uepoch)
+        return self.replay_slope_changes(key, upoint, block_time).bias
+
+    def getPriorVotes(self, user: str, height: int, block: Block) -> int:
+        return self.getPriorVotesMany([user], height, block)[0]
+
+    def getPriorVotesMany(
+        self, users: Sequence[str], height: int, block: Block
+    ) -> List[int]:
+        if height > block.number:
+            raise Revert("block in the future")
+        index = self.find_block_checkpoint(height)
+        block_time = self._block_time(index, height, block)
+        return [self._getPriorVotes(user, height, index, block_time) for user in users]
+
+    def totalSupply(self, block: Block, ts: Optional[int] = None) -> int:
+        ts = block.timestamp if ts is None else ts
+        epoch = self.week_epoch[self.address].get(ts, 0)
+        if ts % WEEK == 0 and epoch != 0:
+            return self.point_history(self.address, epoch).bias
+        if ts % WEEK == 0 and ts in self.week_points:
+            return self.week_points[ts].bias
+        return self._balanceOf(self.address, ts, block)
+
+    def totalSupplyAt(self, height: int, block: Block) -> int:
+        if height > block.number:
+            raise Revert("block in the future")
+        index = self.find_block_checkpoint(height)
+        return self.supply_at(index, self._block_time(index, height, block))
+
+
+def apply_user_points(last_point: Point, user_points: Sequence[Point]) -> Point:
+    """
+    Apply the change of a user point to the global point at t=now.
+    """
+    slope = last_point.slope + user_points[1].slope - user_points[0].slope
+    bias = last_point.bias + user_points[1].bias - user_points[0].bias
+    return replace(last_point, slope=max(0, slope), bias=max(0, bias))
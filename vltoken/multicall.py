@@ -0,0 +1,201 @@
+"""
+Batched asyncio reads of VoteLockToken views.
+
+View calls are aggregated with Multicall3 ``aggregate3``, up to
+``calls_per_batch`` per ``eth_call``. The ``eth_call`` of every batch are sent
+together as one JSON-RPC batch request, over a pool of keep-alive HTTP
+connections, so reading the locks of thousands of holders takes a single
+round trip instead of one per view call. Every call is allowed to fail inside
+the batch, a failed call raises ``CallError`` naming it.
+
+Calls are encoded with the fixed signatures of ``VIEWS`` rather than the ape
+contract, so the client only needs the RPC URL and the contract address.
+"""
+import asyncio
+import itertools
+from typing import Any, List, Optional, Sequence, Tuple
+
+import aiohttp
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+
+from vltoken.model import LockedBalance, Point
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"  # same on every chain
+AGGREGATE3 = function_signature_to_4byte_selector("aggregate3((address,bool,bytes)[])")
+
+# name -> (input types, output types)
+VIEWS = {
+    "locked": (["address"], ["(uint256,uint256)"]),
+    "epoch": (["address"], ["uint256"]),
+    "point_history": (["address", "uint256"], ["(int128,int128,uint256,uint256)"]),
+    "slope_changes": (["address", "uint256"], ["int128"]),
+    "balanceOf": (["address"], ["uint256"]),
+    "getPriorVotes": (["address", "uint256"], ["uint256"]),
+}
+
+Call = Tuple[str, Sequence[Any]]
+
+
+class RPCError(Exception):
+    """
+    Error returned by the node for a JSON-RPC request.
+    """
+
+
+class CallError(Exception):
+    """
+    View call of an aggregated batch that reverted.
+    """
+
+
+class VoteLockClient:
+    """
+    asyncio client of one VoteLockToken contract.
+
+    @param rpc_url HTTP endpoint of the node
+    @param vl_token Address of the VoteLockToken contract
+    @param multicall Address of the Multicall3 contract
+    @param calls_per_batch View calls aggregated in one ``eth_call``
+    @param batches_per_request ``eth_call`` sent in one JSON-RPC batch request
+    @param max_connections Keep-alive connections of the pool
+    """
+
+    def __init__(
+        self,
+        rpc_url: str,
+        vl_token: str,
+        multicall: str = MULTICALL3,
+        calls_per_batch: int = 500,
+        batches_per_request: int = 20,
+        max_connections: int = 4,
+    ):
+        self.rpc_url = rpc_url
+        self.vl_token = vl_token
+        self.multicall = multicall
+        self.calls_per_batch = calls_per_batch
+        self.batches_per_request = batches_per_request
+        self.max_connections = max_connections
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.round_trips = 0
+        self.ids = itertools.count()
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        self.session = aiohttp.ClientSession(connector=connector)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def request(self, calls: Sequence[Tuple[str, list]]) -> List[Any]:
+        """
+        Sends `calls` as one JSON-RPC batch request.
+
+        @param calls (method, params) of every request
+        @return Result of every request, in the order of `calls`
+        """
+        ids = [next(self.ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in zip(ids, calls)
+        ]
+        self.round_trips += 1
+        async with self.session.post(self.rpc_url, json=payload) as response:
+            response.raise_for_status()
+            replies = await response.json()
+
+        # a batch response can come in any order
+        by_id = {reply["id"]: reply for reply in replies}
+        results = []
+        for i in ids:
+            reply = by_id[i]
+            if "error" in reply:
+                raise RPCError(reply["error"])
+            results.append(reply["result"])
+        return results
+
+    async def aggregate(self, calls: Sequence[Call], block: Optional[int] = None):
+        """
+        Evaluates view calls of the contract at `block`, latest by default.
+
+        @param calls (view name, arguments) of every call, see ``VIEWS``
+        @return Decoded output of every call, in the order of `calls`
+        """
+        tag = "latest" if block is None else hex(block)
+        eth_calls = []
+        for start in range(0, len(calls), self.calls_per_batch):
+            batch = [
+                (self.vl_token, True, encode_call(name, args))
+                for name, args in calls[start : start + self.calls_per_batch]
+            ]
+            data = AGGREGATE3 + encode(["(address,bool,bytes)[]"], [batch])
+            eth_calls.append(
+                ("eth_call", [{"to": self.multicall, "data": "0x" + data.hex()}, tag])
+            )
+
+        requests = [
+            self.request(eth_calls[start : start + self.batches_per_request])
+            for start in range(0, len(eth_calls), self.batches_per_request)
+        ]
+        replies = itertools.chain.from_iterable(await asyncio.gather(*requests))
+
+        returned = []
+        for reply in replies:
+            (results,) = decode(["(bool,bytes)[]"], bytes.fromhex(reply[2:]))
+            returned.extend(results)
+
+        outputs = []
+        for (name, args), (success, data) in zip(calls, returned):
+            if not success:
+                raise CallError(f"{name}({', '.join(map(str, args))}) reverted")
+            outputs.append(decode_output(name, data))
+        return outputs
+
+    async def balances(self, users: Sequence[str], block: Optional[int] = None):
+        return await self.aggregate([("balanceOf", [u]) for u in users], block)
+
+    async def prior_votes(
+        self, users: Sequence[str], height: int, block: Optional[int] = None
+    ):
+        calls = [("getPriorVotes", [u, height]) for u in users]
+        return await self.aggregate(calls, block)
+
+    async def locks(self, users: Sequence[str], block: Optional[int] = None):
+        locks = await self.aggregate([("locked", [u]) for u in users], block)
+        return [LockedBalance(*lock) for lock in locks]
+
+    async def epochs(self, users: Sequence[str], block: Optional[int] = None):
+        return await self.aggregate([("epoch", [u]) for u in users], block)
+
+    async def points(
+        self,
+        users: Sequence[str],
+        epochs: Sequence[int],
+        block: Optional[int] = None,
+    ):
+        calls = [("point_history", [u, e]) for u, e in zip(users, epochs)]
+        return [Point(*point) for point in await self.aggregate(calls, block)]
+
+    async def slope_changes(
+        self, user: str, weeks: Sequence[int], block: Optional[int] = None
+    ):
+        calls = [("slope_changes", [user, week]) for week in weeks]
+        return await self.aggregate(calls, block)
+
+
+def encode_call(name: str, args: Sequence[Any]) -> bytes:
+    inputs, _ = VIEWS[name]
+    selector = function_signature_to_4byte_selector(f"{name}({','.join(inputs)})")
+    return selector + encode(inputs, list(args))
+
+
+def decode_output(name: str, data: bytes) -> Any:
+    _, outputs = VIEWS[name]
+    (value,) = decode(outputs, data)
+    return value
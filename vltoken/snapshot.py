@@ -0,0 +1,122 @@
+"""
+Voting power snapshots of every holder at a block, computed off-chain.
+
+The lock history of each holder is rebuilt from the indexed ``ModifyLock`` and
+``Withdraw`` logs and replayed through the reference model, which returns
+exactly what ``getPriorVotes`` returns. Holders are split in shards evaluated
+by a process pool, so no RPC call is made per holder.
+
+The collector and treasury fee locks emit no event, their power has to be read
+from the contract. So is the power of the accounts taking part in a delegation,
+it is the sum of the delegated locks instead of their own.
+
+The Merkle tree follows the OpenZeppelin ``StandardMerkleTree`` layout: leaves
+are ``keccak256(keccak256(abi.encode(address, uint256)))`` and pairs are hashed
+sorted, so proofs verify with ``MerkleProof.verify``.
+"""
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+from eth_abi import encode
+from eth_utils import keccak
+
+from vltoken.model import Block, LockedBalance, VoteLockModel
+
+LockEvent = Tuple[int, int, int, int]  # block, ts, amount, end
+
+
+def shard_power(
+    histories: Sequence[Tuple[str, List[LockEvent]]], height: int, block_time: int
+) -> List[Tuple[str, int]]:
+    """
+    @param histories Lock changes of each holder of the shard
+    @param height Block of the snapshot
+    @param block_time Timestamp of `height`, as returned by `timestamp_at`
+    @return (holder, voting power) of each holder
+    """
+    model = VoteLockModel("snapshot", "treasury", "collector", Block(0, 0))
+    power = []
+    for user, events in histories:
+        lock = LockedBalance()
+        for block, ts, amount, end in events:
+            new_lock = LockedBalance(amount, end)
+            model._checkpoint_user(user, lock, new_lock, Block(block, ts))
+            lock = new_lock
+        power.append((user, model._getPriorVotes(user, height, 0, block_time)))
+    return power
+
+
+def voting_power(
+    histories: Dict[str, List[LockEvent]],
+    height: int,
+    block_time: int,
+    workers: int = 1,
+) -> Dict[str, int]:
+    """
+    @return Voting power of every holder at `height`, in the order of `histories`
+    """
+    items = list(histories.items())
+    if workers <= 1 or not items:
+        return dict(shard_power(items, height, block_time))
+
+    size = -(-len(items) // workers)
+    shards = [items[i : i + size] for i in range(0, len(items), size)]
+    power: Dict[str, int] = {}
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(
+            shard_power, shards, [height] * len(shards), [block_time] * len(shards)
+        )
+        for shard in results:
+            power.update(shard)
+    return power
+
+
+def leaf(user: str, power: int) -> bytes:
+    return keccak(keccak(encode(["address", "uint256"], [user, power])))
+
+
+def hash_pair(a: bytes, b: bytes) -> bytes:
+    return keccak(min(a, b) + max(a, b))
+
+
+def merkle_root(power: Dict[str, int]) -> bytes:
+    """
+    @return Root of the tree of (holder, power) leaves, empty bytes without leaves
+    """
+    leaves = sorted(leaf(user, amount) for user, amount in power.items())
+    if not leaves:
+        return b""
+    # complete binary tree in an array, leaves stored from the end in reverse
+    tree = [b""] * (2 * len(leaves) - 1)
+    for i, node in enumerate(leaves):
+        tree[len(tree) - 1 - i] = node
+    for i in range(len(tree) - 1 - len(leaves), -1, -1):
+        tree[i] = hash_pair(tree[2 * i + 1], tree[2 * i + 2])
+    return tree[0]
+
+
+def write_snapshot(
+    path: str, height: int, block_time: int, power: Dict[str, int]
+) -> bytes:
+    """
+    Write ``<path>.csv`` and ``<path>.json`` with the non zero voting powers.
+
+    @return Merkle root of the snapshot
+    """
+    power = {user: amount for user, amount in power.items() if amount > 0}
+    root = merkle_root(power)
+    with open(f"{path}.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user", "power"])
+        writer.writerows(power.items())
+    with open(f"{path}.json", "w") as f:
+        snapshot = {
+            "block": height,
+            "timestamp": block_time,
+            "root": "0x" + root.hex(),
+            "power": {user: str(amount) for user, amount in power.items()},
+        }
+        json.dump(snapshot, f, indent=2)
+    return root
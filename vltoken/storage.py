@@ -0,0 +1,217 @@
+"""
+Stream the VoteLockToken history straight from contract storage.
+
+Vyper lays storage out in declaration order, ``SLOTS`` below, and stores
+``HashMap[k1][k2]`` at ``keccak256(keccak256(slot . k1) . k2)``. Slots are read
+with ``eth_getStorageAt`` in JSON-RPC batch requests of ``chunk_size`` records,
+the request of the next chunk is in flight while the current one is consumed.
+Records are yielded one by one, so memory stays flat whatever the length of
+the history.
+
+The weeks with a slope change are found from the ``slope_change_weeks``
+bitmaps, there is no need to probe every week key of ``slope_changes``.
+"""
+import asyncio
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
+
+from eth_utils import keccak
+
+from vltoken.model import MAX_N_WEEKS, WEEK, LockedBalance, Point
+from vltoken.multicall import VoteLockClient
+
+# must follow the storage declarations of VoteLockToken.vy
+SLOTS = {
+    "supply": 0,
+    "packed_locks": 1,
+    "epoch": 2,
+    "packed_points": 3,
+    "slope_changes": 4,
+    "slope_change_weeks": 5,
+    "week_epoch": 6,
+    "block_checkpoints": 7,
+    "last_block_checkpoint": 8,
+    "collector_active": 9,
+    "pending_fees": 10,
+    "last_fee_flush": 11,
+    "pending_penalties": 12,
+    "penalties": 13,
+    "delegated": 14,
+    "recorded_week": 15,
+    "week_points": 16,
+}
+MASK_64 = 2**64 - 1
+MASK_128 = 2**128 - 1
+
+Key = Union[str, int]
+
+
+def mapping_slot(slot: int, *keys: Key) -> int:
+    """
+    @param keys Addresses as hex strings, or integers
+    @return Slot of ``HashMap[keys[0]][keys[1]]...`` declared at `slot`
+    """
+    for key in keys:
+        key = int(key, 16) if isinstance(key, str) else key
+        data = slot.to_bytes(32, "big") + key.to_bytes(32, "big")
+        slot = int.from_bytes(keccak(data), "big")
+    return slot
+
+
+def vote_key(account: str) -> str:
+    """
+    @return Key of the vote history of `account`, as ``VoteLockToken.vote_key``
+    """
+    digest = keccak(bytes.fromhex(account[2:]) + b"votes")
+    return "0x" + digest[:20].hex()
+
+
+def to_signed(word: int) -> int:
+    return word - 2**256 if word >= 2**255 else word
+
+
+def unpack_point(bias_slope: int, ts_blk: int) -> Point:
+    return Point(
+        bias_slope & MASK_128, bias_slope >> 128, ts_blk & MASK_64, ts_blk >> 64
+    )
+
+
+def unpack_lock(packed: int) -> LockedBalance:
+    return LockedBalance(packed & MASK_128, packed >> 128)
+
+
+class StorageReader:
+    """
+    Reads the storage of the contract of `client`, sharing its connections.
+
+    @param client Client of the VoteLockToken contract
+    @param chunk_size Records read per JSON-RPC batch request
+    """
+
+    def __init__(self, client: VoteLockClient, chunk_size: int = 256):
+        self.client = client
+        self.chunk_size = chunk_size
+
+    async def pin(self, block: Optional[int]) -> int:
+        """
+        @return `block`, or the latest block so every read of a stream sees the
+            same state
+        """
+        if block is not None:
+            return block
+        (number,) = await self.client.request([("eth_blockNumber", [])])
+        return int(number, 16)
+
+    async def read(self, slots: List[int], block: int) -> List[int]:
+        address = self.client.vl_token
+        calls = [
+            ("eth_getStorageAt", [address, hex(slot), hex(block)]) for slot in slots
+        ]
+        return [int(word, 16) for word in await self.client.request(calls)]
+
+    async def stream(
+        self, chunks: Iterator[List[int]], block: int
+    ) -> AsyncIterator[List[int]]:
+        """
+        Reads chunks of slots, requesting the next chunk before yielding one.
+        """
+        pending = None
+        for slots in chunks:
+            request = asyncio.ensure_future(self.read(slots, block))
+            if pending is not None:
+                yield await pending
+            pending = request
+        if pending is not None:
+            yield await pending
+
+    async def epoch(self, user: str, block: Optional[int] = None) -> int:
+        block = await self.pin(block)
+        (epoch,) = await self.read([mapping_slot(SLOTS["epoch"], user)], block)
+        return epoch
+
+    async def recorded_week(self, block: Optional[int] = None) -> int:
+        block = await self.pin(block)
+        (week,) = await self.read([SLOTS["recorded_week"]], block)
+        return week
+
+    async def locks(self, users: List[str], block: Optional[int] = None):
+        block = await self.pin(block)
+        slots = [mapping_slot(SLOTS["packed_locks"], user) for user in users]
+        return [unpack_lock(packed) for packed in await self.read(slots, block)]
+
+    async def point(self, user: str, epoch: int, block: Optional[int] = None):
+        block = await self.pin(block)
+        slot = mapping_slot(SLOTS["packed_points"], user, epoch)
+        return unpack_point(*await self.read([slot, slot + 1], block))
+
+    async def points(
+        self,
+        user: str,
+        start: int = 0,
+        stop: Optional[int] = None,
+        block: Optional[int] = None,
+    ) -> AsyncIterator[Point]:
+        """
+        @notice Yield ``point_history(user, i)`` for i in [start, stop]
+        @param stop Last epoch, ``epoch(user)`` by default
+        """
+        block = await self.pin(block)
+        if stop is None:
+            stop = await self.epoch(user, block)
+
+        def chunks():
+            for first in range(start, stop + 1, self.chunk_size):
+                slots = []
+                for epoch in range(first, min(first + self.chunk_size, stop + 1)):
+                    slot = mapping_slot(SLOTS["packed_points"], user, epoch)
+                    slots += [slot, slot + 1]  # bias_slope, ts_blk
+                yield slots
+
+        async for words in self.stream(chunks(), block):
+            for i in range(0, len(words), 2):
+                yield unpack_point(words[i], words[i + 1])
+
+    async def slope_changes(
+        self,
+        user: str,
+        start: Optional[int] = None,
+        until: Optional[int] = None,
+        block: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, int]]:
+        """
+        @notice Yield (time, slope change) of every non zero slope change of `user`
+            in [start, until)
+        @dev
+            By default the range spans from the first point of `user` to
+            MAX_N_WEEKS weeks after the last one, the furthest a change is scheduled.
+        """
+        block = await self.pin(block)
+        if start is None or until is None:
+            epoch = await self.epoch(user, block)
+            # epoch 0 of a user is empty, epoch 0 of the contract is its deployment
+            first = await self.point(user, min(epoch, 1), block)
+            last = await self.point(user, epoch, block)
+            if start is None:
+                start = first.ts // WEEK * WEEK
+            if until is None:
+                until = last.ts // WEEK * WEEK + (MAX_N_WEEKS + 1) * WEEK
+
+        words = list(range((start // WEEK) >> 8, (((until - 1) // WEEK) >> 8) + 1))
+        slots = [mapping_slot(SLOTS["slope_change_weeks"], user, w) for w in words]
+        weeks = []
+        for word, bitmap in zip(words, await self.read(slots, block)):
+            weeks += [(word << 8) + bit for bit in range(256) if bitmap >> bit & 1]
+        times = [w * WEEK for w in weeks if start <= w * WEEK < until]
+
+        def chunks():
+            for i in range(0, len(times), self.chunk_size):
+                yield [
+                    mapping_slot(SLOTS["slope_changes"], user, ts)
+                    for ts in times[i : i + self.chunk_size]
+                ]
+
+        i = 0
+        async for values in self.stream(chunks(), block):
+            for value in values:
+                if value != 0:
+                    yield times[i], to_signed(value)
+                i += 1
@@ -0,0 +1,123 @@
+"""
+NumPy evaluation of voting power for many users at many timestamps.
+
+Replaying slope changes from a point ``p`` up to ``t`` is linear in ``t``::
+
+    bias(t) = p.bias - p.slope * (t - p.ts) - sum(d * (t - w))
+
+over the slope changes ``d`` scheduled at weeks ``round_to_week(p.ts) < w < t``.
+The sums are taken from per-user prefix sums, so a whole holder x timestamp
+matrix is evaluated with a few array operations. Integers are kept exact in
+``object`` arrays, as biases overflow int64.
+"""
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+from vltoken.model import WEEK, VoteLockModel
+
+USER_SHIFT = 2**40  # > any timestamp, keys users and times into one sorted int64
+
+
+@dataclass
+class HistoryArrays:
+    """
+    Flattened point histories and slope change schedules of a set of users.
+
+    Points and slope changes are sorted by user index, then by time.
+    """
+
+    point_user: np.ndarray  # int64
+    point_bias: np.ndarray  # object
+    point_slope: np.ndarray  # object
+    point_ts: np.ndarray  # int64
+    change_user: np.ndarray  # int64
+    change_ts: np.ndarray  # int64
+    change_slope: np.ndarray  # object
+
+    @classmethod
+    def from_model(cls, model: VoteLockModel, users: Sequence[str]) -> "HistoryArrays":
+        points = []
+        changes = []
+        for i, user in enumerate(users):
+            for epoch in range(1, model.epoch[user] + 1):
+                p = model.point_history(user, epoch)
+                points.append((i, p.bias, p.slope, p.ts))
+            for ts, d_slope in sorted(model.slope_changes[user].items()):
+                # only week aligned changes are ever replayed
+                if d_slope != 0 and ts % WEEK == 0:
+                    changes.append((i, ts, d_slope))
+        return cls.from_records(points, changes)
+
+    @classmethod
+    def from_records(cls, points, changes) -> "HistoryArrays":
+        """
+        Build from ``(user_index, bias, slope, ts)`` point records and
+        ``(user_index, week, d_slope)`` slope change records.
+        """
+        points = sorted(points, key=lambda r: (r[0], r[3]))
+        changes = sorted(changes, key=lambda r: (r[0], r[1]))
+        return cls(
+            point_user=np.array([r[0] for r in points], dtype=np.int64),
+            point_bias=np.array([r[1] for r in points], dtype=object),
+            point_slope=np.array([r[2] for r in points], dtype=object),
+            point_ts=np.array([r[3] for r in points], dtype=np.int64),
+            change_user=np.array([r[0] for r in changes], dtype=np.int64),
+            change_ts=np.array([r[1] for r in changes], dtype=np.int64),
+            change_slope=np.array([r[2] for r in changes], dtype=object),
+        )
+
+
+def voting_power(
+    history: HistoryArrays, n_users: int, timestamps: Sequence[int]
+) -> np.ndarray:
+    """
+    Voting power of every user at every timestamp.
+
+    @param history Point histories and slope changes of the users
+    @param n_users Number of users, rows of the result
+    @param timestamps Timestamps, columns of the result
+    @return ``(n_users, len(timestamps))`` object array of exact balances
+    """
+    t = np.asarray(timestamps, dtype=np.int64)[None, :]
+    users = np.arange(n_users, dtype=np.int64)[:, None]
+    if len(history.point_ts) == 0:
+        return np.zeros((n_users, t.shape[1]), dtype=object)
+
+    # latest point at or before t, like _find_epoch_by_timestamp
+    point_keys = history.point_user * USER_SHIFT + history.point_ts
+    idx = np.searchsorted(point_keys, users * USER_SHIFT + t, side="right") - 1
+    safe = np.maximum(idx, 0)
+    has_point = (idx >= 0) & (history.point_user[safe] == users)
+
+    # exact integer arithmetic from here on
+    ts0 = history.point_ts[safe]
+    dt = (t - ts0).astype(object)
+    bias = history.point_bias[safe] - history.point_slope[safe] * dt
+
+    # slope changes after the week of the point and strictly before t
+    change_keys = history.change_user * USER_SHIFT + history.change_ts
+    d1 = np.concatenate([[0], np.cumsum(history.change_slope)]).astype(object)
+    d2 = np.concatenate(
+        [[0], np.cumsum(history.change_slope * history.change_ts.astype(object))]
+    ).astype(object)
+    lo = np.searchsorted(
+        change_keys, users * USER_SHIFT + ts0 // WEEK * WEEK, side="right"
+    )
+    hi = np.searchsorted(change_keys, users * USER_SHIFT + t, side="left")
+    hi = np.maximum(hi, lo)
+    bias = bias - (t.astype(object) * (d1[hi] - d1[lo]) - (d2[hi] - d2[lo]))
+
+    power = np.where(has_point, np.maximum(bias, 0), 0)
+    return power.astype(object)
+
+
+def model_voting_power(
+    model: VoteLockModel, users: Sequence[str], timestamps: Sequence[int]
+) -> np.ndarray:
+    """
+    Holder x timestamp voting power matrix of a reference model.
+    """
+    history = HistoryArrays.from_model(model, users)
+    return voting_power(history, len(users), timestamps)